@@ -1,5 +1,9 @@
 from django.contrib import admin
-from app.models import Book, Author, BookAuthor, BookReview
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+
+from app.models import Book, Author, BookAuthor, BookReview, ViewQueryStats
+from config.admin_tools import LargeTableAdminMixin, PaginatedTabularInline
 
 
 # --- INLINES ---
@@ -8,22 +12,31 @@ class BookAuthorInline(admin.TabularInline):
 
     model = BookAuthor
     extra = 1
+    autocomplete_fields = ("author",)
+
 
+class BookReviewInline(PaginatedTabularInline):
+    """Позволяет просматривать и управлять рецензиями на странице Книги.
 
-class BookReviewInline(admin.TabularInline):
-    """Позволяет просматривать и управлять рецензиями на странице Книги."""
+    Показывает по одной странице рецензий, начиная с новых.
+    """
 
     model = BookReview
     readonly_fields = ("user", "stars_given")
     can_delete = False
     max_num = 0
+    ordering = ("-created_at",)
+
+    def get_queryset(self, request):
+        # BookReview.__str__ reads the book's title.
+        return super().get_queryset(request).select_related("user", "book")
 
 
 # --- ADMIN MODELS ---
 
 
 @admin.register(Book)
-class BookAdmin(admin.ModelAdmin):
+class BookAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     """Настройка отображения модели Книга."""
 
     list_display = ("title", "isbn", "why_read")
@@ -36,7 +49,7 @@ class BookAdmin(admin.ModelAdmin):
 
 
 @admin.register(Author)
-class AuthorAdmin(admin.ModelAdmin):
+class AuthorAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     """Настройка отображения модели Автор."""
 
     list_display = ("first_name", "last_name", "email")
@@ -45,10 +58,57 @@ class AuthorAdmin(admin.ModelAdmin):
 
 
 @admin.register(BookReview)
-class BookReviewAdmin(admin.ModelAdmin):
-    """Настройка отображения модели Рецензия."""
+class BookReviewAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    """Настройка отображения модели Рецензия.
+
+    Поиск идёт по точному имени пользователя или ISBN, чтобы попадать в
+    уникальные индексы, а не просматривать тексты всех рецензий.
+    """
 
-    list_display = ("book", "user", "stars_given")
+    list_display = ("book", "user", "stars_given", "created_at")
     list_filter = ("stars_given",)
     list_select_related = ("user", "book")
-    search_fields = ("content", "user__username", "book__title")
+    autocomplete_fields = ("user", "book")
+    search_fields = ("user__username", "book__isbn")
+    search_help_text = "Exact username or ISBN."
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        users = get_user_model().objects.filter(username=term).values("pk")
+        books = Book.objects.filter(isbn=term).values("pk")
+        return queryset.filter(Q(user__in=users) | Q(book__in=books)), False
+
+
+@admin.register(ViewQueryStats)
+class ViewQueryStatsAdmin(admin.ModelAdmin):
+    """Почасовая сводка SQL-запросов по представлениям (только чтение)."""
+
+    list_display = (
+        "view_name",
+        "window_start",
+        "requests",
+        "avg_queries",
+        "avg_db_time_ms",
+        "max_queries",
+        "n_plus_one_requests",
+    )
+    list_filter = ("view_name",)
+    date_hierarchy = "window_start"
+    ordering = ("-window_start", "-db_time_ms")
+    readonly_fields = [field.name for field in ViewQueryStats._meta.fields]
+
+    @admin.display(description="Avg queries")
+    def avg_queries(self, obj):
+        return round(obj.queries / obj.requests, 1) if obj.requests else 0
+
+    @admin.display(description="Avg DB ms")
+    def avg_db_time_ms(self, obj):
+        return round(obj.db_time_ms / obj.requests, 2) if obj.requests else 0
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
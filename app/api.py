@@ -0,0 +1,301 @@
+"""Versioned JSON API (``/api/v1/``) for the mobile app.
+
+Rows are read with ``values()`` and serialized straight from those dicts, so
+no model instances are built. Each resource names the fields a client may
+pick with ``?fields=``. Related data (authors, rating stats) is fetched with
+one extra query per page for the rows on it, which is what
+``prefetch_related`` would do for model instances. Lists use keyset (cursor)
+pagination, books can be read in batches with ``?ids=1,2,3``, and every
+read endpoint answers conditional GETs through ``app.conditional``. The one
+write endpoint lets staff bulk import reviews.
+"""
+
+import functools
+import json
+from dataclasses import dataclass, field
+from typing import Callable
+
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.db.models import Avg, Count, Max
+from django.http import JsonResponse
+from django.views.decorators.http import require_http_methods
+
+from app.bulk_reviews import import_reviews
+from app.conditional import conditional, etag_for
+from app.cursors import after, decode_cursor, encode_cursor
+from app.invalidation import CATALOG, REVIEWS, current_versions
+from app.models import Book, BookAuthor, BookReview, WishListItem
+from app.views import search_books
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+MAX_IDS = 100
+# Larger imports go through the import_reviews command.
+MAX_IMPORT_ROWS = 10000
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def api_view(methods=("GET", "HEAD")):
+    """Answer ``methods`` only and turn ``ApiError`` into a JSON error."""
+
+    def decorator(view):
+        @require_http_methods(methods)
+        @functools.wraps(view)
+        def inner(request, *args, **kwargs):
+            try:
+                return view(request, *args, **kwargs)
+            except ApiError as error:
+                return JsonResponse({"error": str(error)}, status=error.status)
+
+        return inner
+
+    return decorator
+
+
+@dataclass
+class Related:
+    """Fields read with one query for every row of a page."""
+
+    fields: tuple
+    # ``fetch(keys)`` returns ``{key: {field: value}}``.
+    fetch: Callable
+    defaults: dict
+
+
+@dataclass
+class Resource:
+    """The fields a client may request and how to read them."""
+
+    # Field name -> ``values()`` lookup.
+    lookups: dict
+    default: tuple
+    related: list = field(default_factory=list)
+    # The field that related rows are keyed on.
+    key: str = "id"
+    transforms: dict = field(default_factory=dict)
+
+    def requested(self, request):
+        raw = request.GET.get("fields")
+        if not raw:
+            return list(self.default)
+        names = [name.strip() for name in raw.split(",") if name.strip()]
+        known = self.lookups.keys() | {name for related in self.related for name in related.fields}
+        unknown = set(names) - known
+        if unknown:
+            raise ApiError(f"Unknown field(s): {', '.join(sorted(unknown))}.")
+        return [self.key, *dict.fromkeys(name for name in names if name != self.key)]
+
+    def rows(self, queryset, names, ordering=()):
+        """Return ``(raw rows, serialized rows)`` for ``queryset``."""
+        columns = {self.lookups[name] for name in names if name in self.lookups}
+        columns |= {lookup.lstrip("-") for lookup in ordering}
+        raw = list(queryset.values(*columns))
+        rows = []
+        for values in raw:
+            row = {}
+            for name in names:
+                if name in self.lookups:
+                    value = values[self.lookups[name]]
+                    transform = self.transforms.get(name)
+                    row[name] = transform(value) if transform else value
+            rows.append(row)
+
+        for related in self.related:
+            wanted = [name for name in related.fields if name in names]
+            if not wanted or not rows:
+                continue
+            found = related.fetch([row[self.key] for row in rows])
+            for row in rows:
+                values = found.get(row[self.key], related.defaults)
+                row.update({name: values[name] for name in wanted})
+        return raw, rows
+
+
+def book_authors(book_ids):
+    authors = {}
+    links = (
+        BookAuthor.objects.filter(book_id__in=book_ids)
+        .order_by("author__last_name", "author__first_name")
+        .values("book_id", "author_id", "author__first_name", "author__last_name")
+    )
+    for link in links:
+        authors.setdefault(link["book_id"], {"authors": []})["authors"].append(
+            {
+                "id": link["author_id"],
+                "first_name": link["author__first_name"],
+                "last_name": link["author__last_name"],
+            }
+        )
+    return authors
+
+
+def book_ratings(book_ids):
+    stats = (
+        BookReview.objects.filter(book_id__in=book_ids)
+        .values("book_id")
+        .annotate(average_rating=Avg("stars_given"), review_count=Count("id"))
+        .order_by()
+    )
+    return {row.pop("book_id"): row for row in stats}
+
+
+def media_url(name):
+    return default_storage.url(name) if name else None
+
+
+BOOK_LOOKUPS = {
+    "id": "id",
+    "title": "title",
+    "isbn": "isbn",
+    "description": "description",
+    "why_read": "why_read",
+    "cover": "cover_picture",
+    "updated_at": "updated_at",
+}
+BOOK_RELATED = [
+    Related(("authors",), book_authors, {"authors": []}),
+    Related(("average_rating", "review_count"), book_ratings, {"average_rating": None, "review_count": 0}),
+]
+
+BOOK_RESOURCE = Resource(
+    lookups=BOOK_LOOKUPS,
+    default=("id", "title", "isbn", "cover", "authors"),
+    related=BOOK_RELATED,
+    transforms={"cover": media_url},
+)
+REVIEW_RESOURCE = Resource(
+    lookups={
+        "id": "id",
+        "book": "book_id",
+        "user": "user__username",
+        "stars_given": "stars_given",
+        "content": "content",
+        "created_at": "created_at",
+    },
+    default=("id", "user", "stars_given", "content", "created_at"),
+)
+WISHLIST_RESOURCE = Resource(
+    lookups={
+        **{name: f"book__{lookup}" for name, lookup in BOOK_LOOKUPS.items() if name != "id"},
+        "id": "book_id",
+        "added_at": "added_at",
+    },
+    default=("id", "title", "isbn", "cover", "added_at"),
+    related=BOOK_RELATED,
+    transforms={"cover": media_url},
+)
+
+
+def page(request, resource, queryset, ordering):
+    """Serialize one cursor page of ``queryset`` as the response body."""
+    try:
+        limit = int(request.GET.get("limit", DEFAULT_LIMIT))
+    except ValueError:
+        raise ApiError("limit must be an integer.")
+    limit = max(1, min(limit, MAX_LIMIT))
+    cursor = request.GET.get("cursor")
+    if cursor:
+        try:
+            queryset = after(queryset, ordering, decode_cursor(cursor, len(ordering)))
+        except (TypeError, ValueError, ValidationError):
+            raise ApiError("Invalid cursor.")
+    queryset = queryset.order_by(*ordering)[: limit + 1]
+
+    raw, rows = resource.rows(queryset, resource.requested(request), ordering)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = raw[limit - 1]
+        next_cursor = encode_cursor([last[lookup.lstrip("-")] for lookup in ordering])
+    return {"results": rows, "next": next_cursor}
+
+
+def parse_ids(raw):
+    try:
+        ids = list(dict.fromkeys(int(value) for value in raw.split(",") if value.strip()))
+    except ValueError:
+        raise ApiError("ids must be a comma-separated list of integers.")
+    if not ids or len(ids) > MAX_IDS:
+        raise ApiError(f"ids takes between 1 and {MAX_IDS} ids.")
+    return ids
+
+
+def catalog_etag(request, *parts):
+    return etag_for(request, "api", *current_versions(CATALOG, REVIEWS).values(), *parts, request.GET.urlencode())
+
+
+def wishlist_etag(request):
+    if not request.user.is_authenticated:
+        return None
+    state = WishListItem.objects.filter(user=request.user).aggregate(Max("added_at"), Count("id"))
+    return catalog_etag(request, "wishlist", *state.values())
+
+
+@conditional(lambda request: catalog_etag(request, "books"))
+@api_view()
+def books(request):
+    """List or search books; ``?ids=`` reads up to ``MAX_IDS`` books at once."""
+    if "ids" in request.GET:
+        ids = parse_ids(request.GET["ids"])
+        _, rows = BOOK_RESOURCE.rows(Book.objects.filter(pk__in=ids), BOOK_RESOURCE.requested(request))
+        by_id = {row["id"]: row for row in rows}
+        return JsonResponse(
+            {
+                "results": [by_id[pk] for pk in ids if pk in by_id],
+                "missing": [pk for pk in ids if pk not in by_id],
+            }
+        )
+    queryset = search_books(request.GET.get("q", "").strip())
+    return JsonResponse(page(request, BOOK_RESOURCE, queryset, ("title", "id")))
+
+
+@conditional(lambda request, pk: catalog_etag(request, "book", pk))
+@api_view()
+def book_detail(request, pk):
+    _, rows = BOOK_RESOURCE.rows(Book.objects.filter(pk=pk), BOOK_RESOURCE.requested(request))
+    if not rows:
+        raise ApiError("Book not found.", status=404)
+    return JsonResponse(rows[0])
+
+
+@conditional(lambda request, pk: catalog_etag(request, "book_reviews", pk))
+@api_view()
+def book_reviews(request, pk):
+    if not Book.objects.filter(pk=pk).exists():
+        raise ApiError("Book not found.", status=404)
+    queryset = BookReview.objects.filter(book_id=pk)
+    return JsonResponse(page(request, REVIEW_RESOURCE, queryset, ("-created_at", "-id")))
+
+
+@conditional(wishlist_etag)
+@api_view()
+def wishlist(request):
+    if not request.user.is_authenticated:
+        raise ApiError("Authentication required.", status=401)
+    queryset = WishListItem.objects.filter(user=request.user)
+    return JsonResponse(page(request, WISHLIST_RESOURCE, queryset, ("-added_at", "-id")))
+
+
+@api_view(methods=("POST",))
+def reviews_import(request):
+    """Bulk import ``{"reviews": [...]}`` rows; see ``app.bulk_reviews``."""
+    if not request.user.is_authenticated:
+        raise ApiError("Authentication required.", status=401)
+    if not request.user.is_staff:
+        raise ApiError("Only staff can import reviews.", status=403)
+    try:
+        rows = json.loads(request.body)["reviews"]
+    except (ValueError, KeyError, TypeError):
+        raise ApiError('Expected a JSON body like {"reviews": [...]}.')
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        raise ApiError("reviews must be a list of objects.")
+    if len(rows) > MAX_IMPORT_ROWS:
+        raise ApiError(f"At most {MAX_IMPORT_ROWS} reviews per request.")
+    report = import_reviews(rows, dry_run="dry_run" in request.GET)
+    return JsonResponse(report.as_dict(), status=201 if report.created else 200)
@@ -0,0 +1,13 @@
+from django.urls import path
+
+from app import api
+
+app_name = "api"
+
+urlpatterns = [
+    path("books/", api.books, name="books"),
+    path("books/<int:pk>/", api.book_detail, name="book_detail"),
+    path("books/<int:pk>/reviews/", api.book_reviews, name="book_reviews"),
+    path("wishlist/", api.wishlist, name="wishlist"),
+    path("reviews/import/", api.reviews_import, name="reviews_import"),
+]
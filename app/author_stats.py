@@ -0,0 +1,86 @@
+"""Per-author aggregates kept next to the reviews they summarize.
+
+``AuthorStats`` holds each author's book count, review count and star total,
+so author pages never aggregate reviews at request time. Writing or deleting
+a review moves the rows of its book's authors by that one review with an
+``F()`` update. Changing who wrote a book, or a bulk import, recomputes the
+affected authors from their books' reviews with ``rebuild``.
+"""
+
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from app.models import Author, AuthorStats, BookAuthor, BookReview
+
+REBUILD_CHUNK = 200
+
+
+def book_author_ids(book_ids):
+    return set(BookAuthor.objects.filter(book_id__in=book_ids).values_list("author_id", flat=True))
+
+
+def apply_review_delta(book_id, reviews, stars):
+    """Add ``reviews`` reviews totalling ``stars`` stars to ``book_id``'s authors."""
+    author_ids = book_author_ids([book_id])
+    if not author_ids or not (reviews or stars):
+        return
+    updated = AuthorStats.objects.filter(author_id__in=author_ids).update(
+        review_count=F("review_count") + reviews,
+        rating_sum=F("rating_sum") + stars,
+        updated_at=timezone.now(),
+    )
+    if updated < len(author_ids):
+        # Authors without a row yet are computed in full, this review included.
+        existing = AuthorStats.objects.filter(author_id__in=author_ids).values_list("author_id", flat=True)
+        rebuild(author_ids - set(existing))
+
+
+def review_saved(review, previous):
+    """``previous`` is the review's stored ``book_id`` and ``stars_given``
+    before the save, or ``None`` if it was just created.
+    """
+    if previous is None:
+        apply_review_delta(review.book_id, 1, review.stars_given)
+    elif previous["book_id"] == review.book_id:
+        apply_review_delta(review.book_id, 0, review.stars_given - previous["stars_given"])
+    else:
+        apply_review_delta(previous["book_id"], -1, -previous["stars_given"])
+        apply_review_delta(review.book_id, 1, review.stars_given)
+
+
+def review_deleted(review):
+    apply_review_delta(review.book_id, -1, -review.stars_given)
+
+
+def rebuild(author_ids=None):
+    """Recompute the stats of ``author_ids``, or of every author."""
+    if author_ids is None:
+        author_ids = Author.objects.values_list("pk", flat=True).order_by("pk").iterator()
+    author_ids = list(author_ids)
+    for start in range(0, len(author_ids), REBUILD_CHUNK):
+        rebuild_chunk(author_ids[start:start + REBUILD_CHUNK])
+
+
+def rebuild_chunk(author_ids):
+    # Distinct pairs, so a book linked to an author twice counts once.
+    pairs = set(BookAuthor.objects.filter(author_id__in=author_ids).values_list("author_id", "book_id"))
+    totals = {
+        row["book_id"]: (row["reviews"], row["stars"])
+        for row in BookReview.objects.filter(book_id__in={book_id for _, book_id in pairs})
+        .values("book_id")
+        .annotate(reviews=Count("id"), stars=Sum("stars_given"))
+    }
+    existing = set(Author.objects.filter(pk__in=author_ids).values_list("pk", flat=True))
+    stats = {author_id: AuthorStats(author_id=author_id) for author_id in existing}
+    for author_id, book_id in pairs:
+        row = stats[author_id]
+        reviews, stars = totals.get(book_id, (0, 0))
+        row.book_count += 1
+        row.review_count += reviews
+        row.rating_sum += stars
+    AuthorStats.objects.bulk_create(
+        stats.values(),
+        update_conflicts=True,
+        unique_fields=["author"],
+        update_fields=["book_count", "review_count", "rating_sum", "updated_at"],
+    )
@@ -0,0 +1,10 @@
+from django.urls import path
+
+from app.views import AuthorDetailView, AuthorsView
+
+app_name = "authors"
+
+urlpatterns = [
+    path("", AuthorsView.as_view(), name="list"),
+    path("<int:pk>/", AuthorDetailView.as_view(), name="detail"),
+]
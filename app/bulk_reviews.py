@@ -0,0 +1,163 @@
+"""Bulk import of historical reviews.
+
+Rows are validated and inserted one batch at a time: one query resolves the
+users of a batch, one its books and one the reviews that already exist, and
+the rest go in with a single ``bulk_create``. ``bulk_create`` sends no
+``post_save``, so instead of the per-review receivers in ``app/signals.py``
+(touching the book, invalidating caches) the import sends one
+``reviews_bulk_created`` signal for every affected book at the end.
+"""
+
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from app.models import Book, BookReview
+from app.signals import reviews_bulk_created
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+@dataclass
+class ImportReport:
+    """What an import did; lines count data rows from 1."""
+
+    created: int = 0
+    # (line, username, isbn) of reviews that already existed or repeat an
+    # earlier row of the same import.
+    duplicates: list = field(default_factory=list)
+    # (line, message) of rows that were skipped.
+    errors: list = field(default_factory=list)
+    book_ids: set = field(default_factory=set)
+    user_ids: set = field(default_factory=set)
+
+    def as_dict(self):
+        return {
+            "created": self.created,
+            "books": len(self.book_ids),
+            "duplicates": [
+                {"line": line, "username": username, "isbn": isbn}
+                for line, username, isbn in self.duplicates
+            ],
+            "errors": [{"line": line, "message": message} for line, message in self.errors],
+        }
+
+
+def parse_created_at(value):
+    if not value:
+        return timezone.now()
+    try:
+        created_at = parse_datetime(str(value))
+    except ValueError:
+        # Well formed but impossible, e.g. February 30th.
+        created_at = None
+    if created_at is None:
+        raise ValidationError(f"Invalid created_at {value!r}.")
+    if timezone.is_naive(created_at):
+        created_at = timezone.make_aware(created_at)
+    return created_at
+
+
+def import_reviews(rows, batch_size=DEFAULT_BATCH_SIZE, dry_run=False):
+    """Import ``rows`` (dicts with username, isbn, stars_given, content and
+    an optional created_at) and return an ``ImportReport``.
+
+    ``rows`` is consumed lazily, so it can stream from a large file.
+    """
+    report = ImportReport()
+    seen = set()
+    numbered = enumerate(rows, start=1)
+    while batch := list(islice(numbered, batch_size)):
+        import_batch(batch, report, seen, dry_run)
+    if report.book_ids and not dry_run:
+        reviews_bulk_created.send(
+            sender=BookReview, book_ids=report.book_ids, user_ids=report.user_ids
+        )
+    return report
+
+
+def import_batch(batch, report, seen, dry_run):
+    def text(row, key):
+        return str(row.get(key) or "").strip()
+
+    users = dict(
+        get_user_model()
+        .objects.filter(username__in={text(row, "username") for _, row in batch})
+        .values_list("username", "id")
+    )
+    books = dict(
+        Book.objects.filter(isbn__in={text(row, "isbn") for _, row in batch}).values_list("isbn", "id")
+    )
+
+    candidates = []
+    for line, row in batch:
+        username, isbn = text(row, "username"), text(row, "isbn")
+        if username not in users:
+            report.errors.append((line, f"Unknown user {username!r}."))
+            continue
+        if isbn not in books:
+            report.errors.append((line, f"Unknown book {isbn!r}."))
+            continue
+        try:
+            review = BookReview(
+                user_id=users[username],
+                book_id=books[isbn],
+                content=text(row, "content"),
+                stars_given=row.get("stars_given"),
+                created_at=parse_created_at(row.get("created_at")),
+            )
+            # The foreign keys were just resolved and uniqueness is checked
+            # for the whole batch below.
+            review.full_clean(exclude=["user", "book"], validate_unique=False)
+        except ValidationError as error:
+            report.errors.append((line, " ".join(error.messages)))
+            continue
+        pair = (review.user_id, review.book_id)
+        if pair in seen:
+            report.duplicates.append((line, username, isbn))
+            continue
+        seen.add(pair)
+        candidates.append((line, username, isbn, review))
+
+    if not candidates:
+        return
+    existing = set(
+        BookReview.objects.filter(
+            user_id__in={review.user_id for *_, review in candidates},
+            book_id__in={review.book_id for *_, review in candidates},
+        ).values_list("user_id", "book_id")
+    )
+    new = []
+    for line, username, isbn, review in candidates:
+        if (review.user_id, review.book_id) in existing:
+            report.duplicates.append((line, username, isbn))
+        else:
+            new.append((line, username, isbn, review))
+
+    if not dry_run and new:
+        with transaction.atomic():
+            # ignore_conflicts skips reviews users wrote since the check
+            # above; the rows stored with our created_at are the ones inserted.
+            BookReview.objects.bulk_create([review for *_, review in new], ignore_conflicts=True)
+            stored = set(
+                BookReview.objects.filter(
+                    user_id__in={review.user_id for *_, review in new},
+                    book_id__in={review.book_id for *_, review in new},
+                ).values_list("user_id", "book_id", "created_at")
+            )
+        inserted = []
+        for line, username, isbn, review in new:
+            if (review.user_id, review.book_id, review.created_at) in stored:
+                inserted.append(review)
+            else:
+                report.duplicates.append((line, username, isbn))
+    else:
+        inserted = [review for *_, review in new]
+    report.created += len(inserted)
+    report.book_ids.update(review.book_id for review in inserted)
+    report.user_ids.update(review.user_id for review in inserted)
@@ -0,0 +1,75 @@
+"""Conditional GET (ETag / Last-Modified) for pages built from versioned data.
+
+Views describe their state with ``etag_for(request, *parts)``, where the
+parts are a version or timestamp read in one cheap query. The user-specific
+bits of the page (who is logged in) are folded in here, together with a hash
+of the templates so a deploy never answers 304 with old markup. ``conditional``
+wraps Django's ``condition()`` so the same state functions work for sync and
+async views.
+"""
+
+import functools
+import hashlib
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.apps import apps
+from django.conf import settings
+from django.contrib import messages
+from django.views.decorators.http import condition
+
+
+@functools.lru_cache(maxsize=None)
+def templates_version():
+    """Hash of every project template, computed once per process."""
+    directories = [Path(d) for engine in settings.TEMPLATES for d in engine["DIRS"]]
+    directories += [Path(app.path) / "templates" for app in apps.get_app_configs()]
+    digest = hashlib.md5(usedforsecurity=False)
+    for directory in directories:
+        for path in sorted(directory.rglob("*.html")):
+            digest.update(path.read_bytes())
+    return digest.hexdigest()[:12]
+
+
+def etag_for(request, *parts):
+    """Return a weak ETag for ``parts`` as seen by the current user.
+
+    Returns ``None``, which disables the 304 shortcut, while flash messages
+    are waiting to be shown on the next page.
+    """
+    if len(messages.get_messages(request)):
+        return None
+    user = request.user
+    parts = (*parts, user.pk if user.is_authenticated else "anonymous", templates_version())
+    digest = hashlib.md5(":".join(map(str, parts)).encode(), usedforsecurity=False).hexdigest()
+    return f'W/"{digest}"'
+
+
+def conditional(etag_func=None, last_modified_func=None):
+    """``condition()`` that also runs the state functions for async views."""
+
+    def decorator(view):
+        if not iscoroutinefunction(view):
+            return condition(etag_func, last_modified_func)(view)
+
+        # condition() calls its functions synchronously, so compute them in a
+        # thread first and hand the results over through the request.
+        conditional_view = condition(
+            etag_func and (lambda request, *args, **kwargs: request._conditional_state[0]),
+            last_modified_func and (lambda request, *args, **kwargs: request._conditional_state[1]),
+        )(view)
+
+        @functools.wraps(view)
+        async def inner(request, *args, **kwargs):
+            def state():
+                return (
+                    etag_func(request, *args, **kwargs) if etag_func else None,
+                    last_modified_func(request, *args, **kwargs) if last_modified_func else None,
+                )
+
+            request._conditional_state = await sync_to_async(state)()
+            return await conditional_view(request, *args, **kwargs)
+
+        return inner
+
+    return decorator
@@ -0,0 +1,44 @@
+"""Opaque cursors for keyset pagination.
+
+A cursor encodes the ordering values of the last row shown; ``after``
+turns them back into a filter on a unique ordering, so every page is an
+index range scan however deep it is.
+"""
+
+import base64
+import binascii
+import json
+
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values):
+    # ``isoformat`` keeps the microseconds DjangoJSONEncoder would drop.
+    data = json.dumps(values, default=lambda value: value.isoformat()).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def decode_cursor(token, size):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor("Invalid cursor.")
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursor("Invalid cursor.")
+    return values
+
+
+def after(queryset, ordering, values):
+    """Rows that come after ``values`` in ``ordering`` (a unique keyset)."""
+    condition = Q()
+    for i, lookup in enumerate(ordering):
+        name = lookup.lstrip("-")
+        step = Q(**{f"{name}__{'lt' if lookup.startswith('-') else 'gt'}": values[i]})
+        for previous, value in zip(ordering[:i], values):
+            step &= Q(**{previous.lstrip("-"): value})
+        condition |= step
+    return queryset.filter(condition)
@@ -0,0 +1,111 @@
+"""Rendered template fragments keyed on the rows they display.
+
+Every model instance has a version stamp in the shared cache, replaced
+whenever the row is saved or deleted (see ``app/signals.py``). A fragment's
+cache key is built from the stamps of every instance it depends on, so
+changing any of them makes the old fragment unreachable at once, with no
+TTL to wait out and no list of keys to delete.
+
+A page first fetches every stamp and then every fragment with one
+``get_many`` each; the template tags in ``app/templatetags/fragment_cache.py``
+do this for all the cards of a list before rendering it.
+
+Inside ``recording_stamps()`` every stamp fetched is also collected, so a
+cached page can be checked against the rows it showed (``app/page_cache.py``).
+"""
+
+import contextvars
+import hashlib
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models, transaction
+
+_recorded = contextvars.ContextVar("recorded_stamps", default=None)
+
+
+def stamp_key(instance):
+    meta = instance._meta.concrete_model._meta
+    return f"stamp:{meta.label_lower}:{instance.pk}"
+
+
+def new_stamp():
+    return uuid.uuid4().hex[:12]
+
+
+def bump(instance):
+    replace_stamp(stamp_key(instance))
+
+
+def replace_stamp(key):
+    """Set a new stamp under ``key`` now and again when the transaction commits.
+
+    The second stamp drops anything another request rendered from the old
+    data while the transaction was still open.
+    """
+    cache.set(key, new_stamp(), None)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: cache.set(key, new_stamp(), None))
+
+
+def get_stamps(instances):
+    """Return ``{stamp key: stamp}`` for ``instances`` in one round trip."""
+    return fetch_stamps({stamp_key(instance) for instance in instances})
+
+
+def fetch_stamps(keys):
+    """Return ``{key: stamp}``, creating the stamps that do not exist yet."""
+    keys = set(keys)
+    stamps = cache.get_many(keys)
+    for key in keys - stamps.keys():
+        # ``add`` never overwrites a stamp another worker just set.
+        cache.add(key, new_stamp(), None)
+        stamps[key] = cache.get(key)
+    recorded = _recorded.get()
+    if recorded is not None:
+        recorded.update(stamps)
+    return stamps
+
+
+@contextmanager
+def recording_stamps():
+    """Yield a dict that collects ``{key: stamp}`` of every stamp fetched."""
+    recorded = {}
+    token = _recorded.set(recorded)
+    try:
+        yield recorded
+    finally:
+        _recorded.reset(token)
+
+
+def fragment_key(name, dependencies, stamps):
+    parts = [name]
+    for dependency in dependencies:
+        if isinstance(dependency, models.Model):
+            key = stamp_key(dependency)
+            parts.append(f"{key}@{stamps[key]}")
+        else:
+            parts.append(str(dependency))
+    digest = hashlib.md5(":".join(parts).encode(), usedforsecurity=False).hexdigest()
+    return f"fragment:{name}:{digest}"
+
+
+def get_fragments(name, groups):
+    """Look up the fragments for several dependency groups at once.
+
+    Returns ``(stamps, found)`` where ``found`` maps fragment keys to HTML.
+    """
+    instances = [dep for group in groups for dep in group if isinstance(dep, models.Model)]
+    stamps = get_stamps(instances) if instances else {}
+    keys = [fragment_key(name, group, stamps) for group in groups]
+    return stamps, cache.get_many(keys)
+
+
+def get_fragment(key):
+    return cache.get(key)
+
+
+def set_fragment(key, html):
+    cache.set(key, html, settings.FRAGMENT_CACHE_TIMEOUT)
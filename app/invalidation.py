@@ -0,0 +1,119 @@
+"""Cross-worker invalidation for caches kept inside each process.
+
+Every namespace owns a row in ``CacheNamespace`` whose ``version`` is bumped
+whenever the data behind it changes. Each worker polls that (tiny) table at
+most once per ``CACHE_INVALIDATION_POLL_INTERVAL`` seconds and drops every
+local entry of a namespace whose version moved, so a write becomes visible in
+every process on every node within that delay without an external broker.
+"""
+
+import threading
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+CATALOG = "catalog"
+REVIEWS = "reviews"
+WISHLISTS = "wishlists"
+
+
+def publish(namespace):
+    """Invalidate ``namespace`` everywhere once the current transaction commits."""
+    transaction.on_commit(lambda: bump(namespace))
+
+
+def bump(namespace):
+    """Increment the stored version of ``namespace`` right away."""
+    from app.models import CacheNamespace
+
+    updated = CacheNamespace.objects.filter(name=namespace).update(
+        version=F("version") + 1, updated_at=timezone.now()
+    )
+    if not updated:
+        try:
+            with transaction.atomic():
+                CacheNamespace.objects.create(name=namespace, version=1)
+        except IntegrityError:
+            # Another worker created the row first.
+            CacheNamespace.objects.filter(name=namespace).update(
+                version=F("version") + 1, updated_at=timezone.now()
+            )
+    process_cache.invalidate(namespace)
+
+
+def current_versions(*namespaces):
+    """Return ``{namespace: version}`` read straight from the database."""
+    from app.models import CacheNamespace
+
+    found = dict(
+        CacheNamespace.objects.filter(name__in=namespaces).values_list(
+            "name", "version"
+        )
+    )
+    return {name: found.get(name, 0) for name in namespaces}
+
+
+class ProcessCache:
+    """A per-process cache whose namespaces are evicted by ``publish``."""
+
+    def __init__(self, poll_interval=None):
+        self._poll_interval = poll_interval
+        self._data = {}
+        self._versions = {}
+        self._next_poll = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def poll_interval(self):
+        if self._poll_interval is not None:
+            return self._poll_interval
+        return getattr(settings, "CACHE_INVALIDATION_POLL_INTERVAL", 2.0)
+
+    def get(self, namespace, key, default=None):
+        self.sync()
+        return self._data.get(namespace, {}).get(key, default)
+
+    def set(self, namespace, key, value):
+        with self._lock:
+            self._data.setdefault(namespace, {})[key] = value
+
+    def get_or_set(self, namespace, key, default):
+        """Return the cached value, computing it with ``default()`` on a miss."""
+        missing = object()
+        value = self.get(namespace, key, missing)
+        if value is missing:
+            value = default()
+            self.set(namespace, key, value)
+        return value
+
+    def invalidate(self, namespace):
+        with self._lock:
+            self._data.pop(namespace, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._versions.clear()
+            self._next_poll = 0.0
+
+    def sync(self, force=False):
+        """Apply invalidations published by other workers since the last poll."""
+        now = time.monotonic()
+        if not force and now < self._next_poll:
+            return
+        self._next_poll = now + self.poll_interval
+
+        from app.models import CacheNamespace
+
+        versions = dict(CacheNamespace.objects.values_list("name", "version"))
+        with self._lock:
+            for name, version in versions.items():
+                if self._versions.get(name) != version:
+                    self._data.pop(name, None)
+            self._versions = versions
+
+
+process_cache = ProcessCache()
@@ -0,0 +1,218 @@
+import json
+import math
+import platform
+import subprocess
+import time
+import tracemalloc
+from contextlib import ExitStack
+from importlib import import_module
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from app.management.commands.seed_bench import ISBN_PREFIX, USERNAME_PREFIX
+from app.models import Book, BookAuthor, BookReview
+from config.query_instrumentation import QueryRecorder
+from notifications.models import Notification
+from users.models import FriendshipRequest
+
+URLCONFS = ("app.urls", "app.author_urls", "users.urls", "notifications.urls")
+
+# How to call each route that needs arguments or is not a plain GET.
+# Values are (method, argument names, POST data); argument names refer to
+# the fixture objects picked in ``Command.fixtures``.
+ROUTES = {
+    "books:detail": ("get", ["book"], None),
+    "authors:detail": ("get", ["author"], None),
+    "books:add_review": ("post", ["book"], {"content": "Benchmark review", "stars_given": 4}),
+    "books:add_to_wishlist": ("post", ["book"], {}),
+    "books:remove_from_wishlist": ("post", ["book"], {}),
+    "books:wishlist_bulk": ("post", [], {"action": "add", "book": ["1", "2", "3"]}),
+    "users:send_friend_request": ("post", ["other_user"], {}),
+    "users:respond_friend_request": ("post", ["friend_request", "accept"], {}),
+    "users:user_profile": ("get", ["other_user"], None),
+    "users:profile_update": ("get", [], None),
+    "notifications:mark_all_as_read": ("post", [], {}),
+}
+# Routes that only make sense for another kind of user.
+AS_USER = {"users:teachers_dashboard": "teacher"}
+SKIP = {"users:logout": "ends the benchmark session"}
+
+
+def percentile(samples, q):
+    """Nearest-rank percentile of ``samples``, in milliseconds."""
+    samples = sorted(samples)
+    index = max(0, math.ceil(q / 100 * len(samples)) - 1)
+    return round(samples[index] * 1000, 3)
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def routes():
+    for module_name in URLCONFS:
+        module = import_module(module_name)
+        for pattern in module.urlpatterns:
+            yield f"{module.app_name}:{pattern.name}"
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive every URL of the books, users and notifications apps through the "
+        "test client and report latency percentiles, query counts and peak "
+        "memory as JSON. Run against a database filled by seed_bench."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--warmup", type=int, default=2)
+        parser.add_argument("--user", help="Username to log in as (default: the best-connected seeded user).")
+        parser.add_argument("--only", action="append", default=[], help="Only run URL names containing this text.")
+        parser.add_argument("--output", help="Write the JSON report to this file instead of stdout.")
+
+    def handle(self, *args, **options):
+        self.verbosity = options["verbosity"]
+        user = self.bench_user(options["user"])
+        fixtures = self.fixtures(user)
+        clients = {}
+        for role, role_user in (("user", user), ("teacher", fixtures.pop("teacher"))):
+            if role_user is not None:
+                clients[role] = Client(HTTP_HOST="localhost", raise_request_exception=False)
+                clients[role].force_login(role_user)
+
+        results, skipped = {}, {}
+        # Instrumentation would add its own overhead to every measurement, and
+        # the rate limits would turn repeated requests into 429s.
+        with override_settings(
+            SQL_INSTRUMENTATION_SAMPLE_RATE=0.0,
+            RATELIMIT_ENABLED=False,
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "localhost"],
+        ):
+            for name in routes():
+                if options["only"] and not any(text in name for text in options["only"]):
+                    continue
+                if name in SKIP:
+                    skipped[name] = SKIP[name]
+                    continue
+                method, arg_names, data = ROUTES.get(name, ("get", [], None))
+                args = [fixtures.get(arg, arg) for arg in arg_names]
+                client = clients.get(AS_USER.get(name, "user"))
+                if None in args or client is None:
+                    skipped[name] = "no data to build the request; run seed_bench first"
+                    continue
+                url = reverse(name, args=args)
+                results[name] = self.measure(client, method, url, data, options)
+                if self.verbosity > 1:
+                    self.stderr.write(f"{name}: p50={results[name]['p50_ms']}ms")
+
+        report = {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connections[DEFAULT_DB_ALIAS].vendor,
+            "debug": settings.DEBUG,
+            "user": user.username,
+            "iterations": options["iterations"],
+            "rows": {
+                "books": Book.objects.count(),
+                "reviews": BookReview.objects.count(),
+                "users": get_user_model().objects.count(),
+                "friendship_requests": FriendshipRequest.objects.count(),
+                "notifications": Notification.objects.count(),
+            },
+            "results": results,
+            "skipped": skipped,
+        }
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as report_file:
+                report_file.write(output + "\n")
+        else:
+            self.stdout.write(output)
+
+    def bench_user(self, username):
+        User = get_user_model()
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f"User {username!r} does not exist.")
+        # The first seeded users are the hubs of the friendship graph.
+        user = User.objects.filter(username__startswith=USERNAME_PREFIX).order_by("username").first()
+        user = user or User.objects.order_by("pk").first()
+        if user is None:
+            raise CommandError("No users to benchmark as; run seed_bench first.")
+        return user
+
+    def fixtures(self, user):
+        books = Book.objects.order_by("pk")
+        # Seeded books with the lowest numbers are the most reviewed.
+        book = books.filter(isbn__startswith=ISBN_PREFIX).order_by("isbn").first() or books.first()
+        other_user = get_user_model().objects.exclude(pk=user.pk).order_by("pk").first()
+        friend_request = FriendshipRequest.objects.filter(to_user=user).order_by("pk").first()
+        return {
+            "teacher": get_user_model().objects.filter(role="teacher").order_by("pk").first(),
+            "book": book and book.pk,
+            "author": BookAuthor.objects.filter(book=book).values_list("author_id", flat=True).first(),
+            "other_user": other_user and other_user.pk,
+            "friend_request": friend_request and friend_request.pk,
+        }
+
+    def measure(self, client, method, url, data, options):
+        send = getattr(client, method)
+
+        def request():
+            # Roll back every request so writes do not pile up between runs.
+            with transaction.atomic():
+                response = send(url, data) if data is not None else send(url)
+                transaction.set_rollback(True)
+            return response
+
+        for _ in range(options["warmup"]):
+            request()
+
+        timings, queries = [], []
+        for _ in range(options["iterations"]):
+            recorder = QueryRecorder()
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(recorder))
+                start = time.perf_counter()
+                response = request()
+                timings.append(time.perf_counter() - start)
+            queries.append(recorder.count)
+
+        # tracemalloc slows everything down, so memory gets its own run.
+        tracemalloc.start()
+        try:
+            request()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        return {
+            "method": method.upper(),
+            "url": url,
+            "status": response.status_code,
+            "p50_ms": percentile(timings, 50),
+            "p95_ms": percentile(timings, 95),
+            "p99_ms": percentile(timings, 99),
+            "mean_ms": round(sum(timings) / len(timings) * 1000, 3),
+            "queries": max(queries),
+            "peak_memory_kb": round(peak / 1024, 1),
+        }
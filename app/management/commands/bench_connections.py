@@ -0,0 +1,92 @@
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import Client
+from django.urls import reverse
+
+from app.models import Book
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {
+        "p50": statistics.median(samples) * 1000,
+        "p95": samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000,
+    }
+
+
+@contextmanager
+def without_reuse(connection):
+    """Temporarily disable persistent connections and pooling."""
+    connection.close()
+    settings_dict = connection.settings_dict
+    conn_max_age = settings_dict["CONN_MAX_AGE"]
+    pool = settings_dict["OPTIONS"].pop("pool", None)
+    settings_dict["CONN_MAX_AGE"] = 0
+    try:
+        yield
+    finally:
+        connection.close()
+        settings_dict["CONN_MAX_AGE"] = conn_max_age
+        if pool is not None:
+            settings_dict["OPTIONS"]["pool"] = pool
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the connection setup latency removed by connection reuse, "
+        "both for a bare connect and for the hot views."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+        parser.add_argument("--iterations", type=int, default=50)
+
+    def handle(self, *args, **options):
+        connection = connections[options["database"]]
+        iterations = options["iterations"]
+
+        def checkout():
+            start = time.perf_counter()
+            connection.ensure_connection()
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            elapsed = time.perf_counter() - start
+            connection.close_if_unusable_or_obsolete()
+            return elapsed
+
+        with without_reuse(connection):
+            fresh = [checkout() for _ in range(iterations)]
+        reused = [checkout() for _ in range(iterations)]
+        self.report("connect + SELECT 1", fresh, reused)
+
+        client = Client(HTTP_HOST="localhost")
+        urls = [reverse("books:list"), reverse("home_page")]
+        book = Book.objects.order_by("pk").first()
+        if book is not None:
+            urls.append(reverse("books:detail", args=[book.pk]))
+
+        for url in urls:
+            def fetch():
+                start = time.perf_counter()
+                client.get(url)
+                elapsed = time.perf_counter() - start
+                # The test client does not fire close_old_connections.
+                connection.close_if_unusable_or_obsolete()
+                return elapsed
+
+            with without_reuse(connection):
+                fresh = [fetch() for _ in range(iterations)]
+            reused = [fetch() for _ in range(iterations)]
+            self.report(f"GET {url}", fresh, reused)
+
+    def report(self, label, fresh, reused):
+        fresh, reused = summarize(fresh), summarize(reused)
+        self.stdout.write(
+            f"{label}: new connection p50={fresh['p50']:.2f}ms p95={fresh['p95']:.2f}ms, "
+            f"reused p50={reused['p50']:.2f}ms p95={reused['p95']:.2f}ms, "
+            f"saved {fresh['p50'] - reused['p50']:.2f}ms per request"
+        )
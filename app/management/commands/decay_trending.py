@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from app import trending
+
+
+class Command(BaseCommand):
+    help = (
+        "Drop trending scores that have decayed to nothing and rebase old "
+        "scores. Run it periodically, e.g. hourly from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Recompute every score from recent reviews and wishlist adds instead.",
+        )
+        parser.add_argument("--days", type=int, help="How far back --rebuild looks.")
+
+    def handle(self, *args, **options):
+        if options["rebuild"]:
+            trending.rebuild(options["days"])
+            self.stdout.write(self.style.SUCCESS("Trending scores rebuilt."))
+        else:
+            dropped = trending.decay()
+            self.stdout.write(self.style.SUCCESS(f"Dropped {dropped} decayed trending scores."))
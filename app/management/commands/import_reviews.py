@@ -0,0 +1,65 @@
+import csv
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.bulk_reviews import DEFAULT_BATCH_SIZE, import_reviews
+
+
+def read_csv(path):
+    with open(path, newline="", encoding="utf-8") as file:
+        yield from csv.DictReader(file)
+
+
+def read_jsonl(path):
+    with open(path, encoding="utf-8") as file:
+        for number, line in enumerate(file, start=1):
+            if line.strip():
+                try:
+                    row = json.loads(line)
+                except ValueError as error:
+                    raise CommandError(f"{path}:{number}: {error}")
+                if not isinstance(row, dict):
+                    raise CommandError(f"{path}:{number}: expected an object")
+                yield row
+
+
+READERS = {"csv": read_csv, "jsonl": read_jsonl}
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk import historical reviews from a CSV (with a header row) or JSON "
+        "lines file with username, isbn, stars_given, content and created_at."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=sorted(READERS), help="Defaults to the file extension.")
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument("--dry-run", action="store_true", help="Validate and report without inserting.")
+        parser.add_argument("--show", type=int, default=20, help="How many duplicates and errors to list.")
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        if not path.exists():
+            raise CommandError(f"No such file: {path}")
+        reader = READERS.get(options["format"] or path.suffix.lstrip(".").lower())
+        if reader is None:
+            raise CommandError("Cannot tell the format from the extension; pass --format.")
+
+        report = import_reviews(reader(path), options["batch_size"], options["dry_run"])
+
+        show = options["show"]
+        for line, username, isbn in report.duplicates[:show]:
+            self.stdout.write(f"line {line}: duplicate review by {username} of {isbn}")
+        for line, message in report.errors[:show]:
+            self.stdout.write(f"line {line}: {message}")
+        verb = "Would import" if options["dry_run"] else "Imported"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{verb} {report.created} reviews of {len(report.book_ids)} books; "
+                f"{len(report.duplicates)} duplicates, {len(report.errors)} errors."
+            )
+        )
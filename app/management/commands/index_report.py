@@ -0,0 +1,207 @@
+import re
+from dataclasses import dataclass, field
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections, models
+
+from app.models import Book, BookReview, WishListItem
+from app.views import search_books
+from notifications.models import Notification
+from users.models import FriendshipRequest
+
+# Plan lines that mean a table is read in full or rows are sorted after
+# being fetched, for SQLite (EXPLAIN QUERY PLAN) and PostgreSQL (EXPLAIN).
+SEQ_SCAN = {
+    "sqlite": re.compile(r"\bSCAN (?:TABLE )?(\w+)\b(?! USING)"),
+    "postgresql": re.compile(r"\bSeq Scan on (\w+)"),
+}
+SORT = {
+    "sqlite": re.compile(r"USE TEMP B-TREE FOR (?:ORDER BY|GROUP BY|DISTINCT)"),
+    "postgresql": re.compile(r"^\s*(?:->\s*)?(?:Incremental )?Sort\b|Sort Method: external", re.MULTILINE),
+}
+
+
+@dataclass
+class HotQuery:
+    """A query behind a view and the index that should serve it, if any."""
+
+    label: str
+    queryset: models.QuerySet
+    model: type = None
+    index_fields: tuple = ()
+    findings: list = field(default_factory=list)
+    plan: str = ""
+
+
+def analyze_plan(vendor, plan):
+    """Return ``["seq scan on <table>", "sort", ...]`` found in ``plan``."""
+    findings = []
+    scan, sort = SEQ_SCAN.get(vendor), SORT.get(vendor)
+    if scan:
+        findings += [f"seq scan on {table}" for table in scan.findall(plan)]
+    if sort and sort.search(plan):
+        findings.append("sort")
+    return findings
+
+
+def hot_queries(user, book):
+    """The querysets behind the project's busiest views."""
+    User = get_user_model()
+    return [
+        HotQuery("books:list", search_books("")[:20], Book, ("title",)),
+        HotQuery("books:list?q=", search_books(book.title[:4])[:20], Book),
+        HotQuery(
+            "books:detail reviews",
+            BookReview.objects.filter(book=book).order_by("-created_at"),
+            BookReview,
+            ("book", "-created_at"),
+        ),
+        HotQuery(
+            "home_page feed",
+            BookReview.objects.select_related("book", "user").order_by("-created_at")[:50],
+            BookReview,
+            ("-created_at",),
+        ),
+        HotQuery(
+            "books:wishlist",
+            WishListItem.objects.filter(user=user)
+            .select_related("book__wishlist_counter")
+            .order_by("-added_at", "-pk"),
+            WishListItem,
+            ("user", "-added_at"),
+        ),
+        HotQuery(
+            "notifications:list",
+            Notification.objects.filter(user=user).order_by("-created_at"),
+            Notification,
+            ("user", "-created_at"),
+        ),
+        HotQuery(
+            "notifications:unread_count",
+            Notification.objects.filter(user=user, is_read=False).order_by(),
+            Notification,
+            ("user", "is_read"),
+        ),
+        HotQuery(
+            "users:friend_requests",
+            FriendshipRequest.objects.filter(to_user=user, status=FriendshipRequest.STATUS_PENDING),
+            FriendshipRequest,
+            ("to_user", "status", "-created_at"),
+        ),
+        HotQuery("users:friends_list", user.friends(), User),
+        HotQuery(
+            "users:teachers_dashboard students",
+            User.objects.filter(role="student", school_class=user.school_class),
+            User,
+            ("role", "school_class"),
+        ),
+    ]
+
+
+def columns(model, fields):
+    return [model._meta.get_field(name.lstrip("-")).column for name in fields]
+
+
+def database_indexes(connection, model):
+    """Column lists of every index on ``model``'s table."""
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, model._meta.db_table)
+    return [c["columns"] for c in constraints.values() if c["index"] or c["unique"] or c["primary_key"]]
+
+
+def declared_index(model, fields):
+    """The index declared in ``model.Meta.indexes`` for ``fields``, if any."""
+    for index in model._meta.indexes:
+        if tuple(index.fields) == tuple(fields):
+            return index
+    return None
+
+
+def proposed_index(model, fields):
+    index = declared_index(model, fields)
+    if index is None:
+        index = models.Index(fields=list(fields))
+        index.set_name_with_model(model)
+    return index
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN the querysets behind the hot views, flag sequential scans and "
+        "sorts, and propose the indexes that would remove them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+        parser.add_argument("--analyze", action="store_true", help="Refresh planner statistics first.")
+        parser.add_argument("--sql", action="store_true", help="Print CREATE INDEX statements for missing indexes.")
+
+    def handle(self, *args, **options):
+        connection = connections[options["database"]]
+        vendor = connection.vendor
+        if options["analyze"]:
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+
+        # The busiest reader and the most reviewed book give realistic plans.
+        User = get_user_model()
+        user = (
+            User.objects.using(options["database"])
+            .annotate(notification_count=models.Count("notification"))
+            .order_by("-notification_count")
+            .first()
+        )
+        book = (
+            Book.objects.using(options["database"])
+            .annotate(review_count=models.Count("bookreview"))
+            .order_by("-review_count")
+            .first()
+        )
+        if user is None or book is None:
+            self.stderr.write("Needs at least one user and one book; run seed_bench first.")
+            return
+
+        missing = []
+        for query in hot_queries(user, book):
+            query.plan = query.queryset.using(options["database"]).explain()
+            query.findings = analyze_plan(vendor, query.plan)
+            status = "ok" if not query.findings else ", ".join(query.findings)
+            self.stdout.write(f"{query.label}: {status}")
+            if options["verbosity"] > 1:
+                self.stdout.write("    " + query.plan.replace("\n", "\n    "))
+
+            if not query.index_fields:
+                if query.findings:
+                    self.stdout.write("    no B-tree index helps this query")
+                continue
+            wanted = columns(query.model, query.index_fields)
+            exists = any(
+                found[: len(wanted)] == wanted for found in database_indexes(connection, query.model)
+            )
+            if exists:
+                continue
+            if declared_index(query.model, query.index_fields):
+                self.stdout.write(
+                    f"    index on {query.model.__name__}{query.index_fields} is declared "
+                    "but not in the database: run migrate"
+                )
+            else:
+                self.stdout.write(
+                    f"    propose: models.Index(fields={list(query.index_fields)!r}) "
+                    f"on {query.model.__name__}.Meta.indexes"
+                )
+            missing.append(query)
+
+        if options["sql"] and missing:
+            self.stdout.write("")
+            with connection.schema_editor(collect_sql=True) as editor:
+                for query in missing:
+                    editor.add_index(query.model, proposed_index(query.model, query.index_fields))
+            for statement in editor.collected_sql:
+                self.stdout.write(statement)
+
+        self.stdout.write(
+            self.style.SUCCESS("No missing indexes.") if not missing
+            else self.style.WARNING(f"{len(missing)} missing index(es).")
+        )
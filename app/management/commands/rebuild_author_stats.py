@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from app import author_stats
+from app.models import AuthorStats
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute per-author book and review aggregates from scratch, e.g. "
+        "after reviews or book authors were changed with bulk SQL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("author_ids", nargs="*", type=int, help="Only these authors (default: all).")
+
+    def handle(self, *args, **options):
+        author_stats.rebuild(options["author_ids"] or None)
+        self.stdout.write(self.style.SUCCESS(f"{AuthorStats.objects.count()} author stats rows up to date."))
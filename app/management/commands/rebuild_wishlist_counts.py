@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from app import wishlist
+from app.models import BookWishlistCounter
+
+
+class Command(BaseCommand):
+    help = "Recount how many users have each book on their wishlist."
+
+    def add_arguments(self, parser):
+        parser.add_argument("book_ids", nargs="*", type=int, help="Only these books (default: all).")
+
+    def handle(self, *args, **options):
+        wishlist.rebuild(options["book_ids"] or None)
+        self.stdout.write(self.style.SUCCESS(f"{BookWishlistCounter.objects.count()} wishlist counters up to date."))
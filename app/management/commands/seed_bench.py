@@ -0,0 +1,280 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from app import author_stats, invalidation, trending
+from app.models import Author, Book, BookAuthor, BookReview
+from notifications.models import Notification
+from users import leaderboards, reading_stats
+from users.models import FriendshipRequest
+
+USERNAME_PREFIX = "bench_"
+ISBN_PREFIX = "BENCH-"
+AUTHOR_EMAIL_DOMAIN = "@bench.example.com"
+
+DEFAULTS = {
+    "books": 200_000,
+    "authors": 50_000,
+    "users": 100_000,
+    "reviews": 5_000_000,
+    "notifications": 10_000_000,
+}
+
+WORDS = (
+    "shadow river garden winter silent empire journey secret letter island "
+    "storm memory city light forest war peace house night mountain ocean "
+    "child stranger road glass fire kingdom summer dream history song"
+).split()
+FIRST_NAMES = "Anna Boris Clara David Elena Farid Galina Ivan Jamila Karim Lola Marat Nadia Oleg Rustam Sofia Timur Zarina".split()
+LAST_NAMES = "Abdullaev Brown Chen Dostoevsky Ermakova Fischer Garcia Hughes Ivanova Karimov Lee Mirzaev Novak Orlov Petrova Rossi Smith Usmanova".split()
+NOTIFICATION_MESSAGES = (
+    '"{}" has been added to your wishlist.',
+    "{} sent you a friend request.",
+    "{} accepted your friend request.",
+    'New review on "{}".',
+)
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def skewed(rng, n, exponent=2.5):
+    """Pick an index in ``range(n)``; low indexes are far more popular."""
+    return int(n * rng.random() ** exponent)
+
+
+def sentence(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def random_past(rng, now, days=3 * 365):
+    return now - timedelta(seconds=rng.randrange(days * 24 * 3600))
+
+
+@contextmanager
+def explicit_timestamps(model, field_name):
+    """Let ``bulk_create`` keep the values given for an ``auto_now_add`` field."""
+    field = model._meta.get_field(field_name)
+    auto_now_add = field.auto_now_add
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = auto_now_add
+
+
+def preferential_attachment(rng, n, m):
+    """Yield the edges of a Barabási–Albert graph over ``range(n)``.
+
+    Each new node links to ``m`` distinct earlier nodes picked with
+    probability proportional to their degree, which gives the power-law
+    degree distribution of real social graphs.
+    """
+    endpoints = []
+    for node in range(n):
+        if node <= m:
+            targets = range(node)
+        else:
+            targets = set()
+            while len(targets) < m:
+                targets.add(rng.choice(endpoints))
+        for target in targets:
+            yield node, target
+            endpoints += (node, target)
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-generate a reproducible benchmark dataset: books, authors, users, "
+        "reviews, a power-law friendship graph and notifications."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument(
+            "--scale",
+            type=float,
+            default=1.0,
+            help="Multiply every default row count, e.g. 0.01 for a quick local dataset.",
+        )
+        for name, default in DEFAULTS.items():
+            parser.add_argument(f"--{name}", type=int, help=f"Number of {name} (default {default:,} x scale).")
+        parser.add_argument("--friends-per-user", type=int, default=5)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--reset", action="store_true", help="Delete earlier benchmark data first.")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        self.verbosity = options["verbosity"]
+        self.batch_size = options["batch_size"]
+        counts = {
+            name: options[name] if options[name] is not None else int(default * options["scale"])
+            for name, default in DEFAULTS.items()
+        }
+        if counts["users"] < 2 or counts["books"] < 1:
+            raise CommandError("At least 2 users and 1 book are required.")
+
+        if options["reset"]:
+            self.reset()
+        elif User.objects.filter(username__startswith=USERNAME_PREFIX).exists():
+            raise CommandError("Benchmark data already exists; use --reset to replace it.")
+
+        rng = random.Random(options["seed"])
+        now = timezone.now()
+        started = time.perf_counter()
+
+        self.insert(Author, "authors", (
+            Author(
+                first_name=rng.choice(FIRST_NAMES),
+                last_name=rng.choice(LAST_NAMES),
+                email=f"author{i}{AUTHOR_EMAIL_DOMAIN}",
+                bio=sentence(rng, 20),
+            )
+            for i in range(max(1, counts["authors"]))
+        ))
+        author_ids = list(
+            Author.objects.filter(email__endswith=AUTHOR_EMAIL_DOMAIN).order_by("pk").values_list("pk", flat=True)
+        )
+
+        self.insert(Book, "books", (
+            Book(
+                title=sentence(rng, rng.randint(1, 4)),
+                description=sentence(rng, 60),
+                isbn=f"{ISBN_PREFIX}{i:09d}",
+                why_read=sentence(rng, 15),
+            )
+            for i in range(counts["books"])
+        ))
+        book_ids = list(
+            Book.objects.filter(isbn__startswith=ISBN_PREFIX).order_by("isbn").values_list("pk", flat=True)
+        )
+
+        def book_authors():
+            for book_id in book_ids:
+                for author_id in {rng.choice(author_ids) for _ in range(1 if rng.random() < 0.85 else 2)}:
+                    yield BookAuthor(book_id=book_id, author_id=author_id)
+
+        self.insert(BookAuthor, "book authors", book_authors())
+
+        password = make_password("bench")
+        classes = [f"{grade}{letter}" for grade in range(1, 12) for letter in "ABCD"]
+        self.insert(User, "users", (
+            User(
+                username=f"{USERNAME_PREFIX}{i:07d}",
+                email=f"{USERNAME_PREFIX}{i:07d}@example.com",
+                password=password,
+                role=rng.choices(("student", "teacher", "parent"), (85, 10, 5))[0],
+                school_class=rng.choice(classes),
+                date_joined=random_past(rng, now),
+            )
+            for i in range(counts["users"])
+        ))
+        user_ids = list(
+            User.objects.filter(username__startswith=USERNAME_PREFIX).order_by("username").values_list("pk", flat=True)
+        )
+
+        def friendships():
+            statuses = (
+                FriendshipRequest.STATUS_ACCEPTED,
+                FriendshipRequest.STATUS_PENDING,
+                FriendshipRequest.STATUS_REJECTED,
+            )
+            for a, b in preferential_attachment(rng, len(user_ids), options["friends_per_user"]):
+                if rng.random() < 0.5:
+                    a, b = b, a
+                yield FriendshipRequest(
+                    from_user_id=user_ids[a],
+                    to_user_id=user_ids[b],
+                    status=rng.choices(statuses, (80, 15, 5))[0],
+                    created_at=random_past(rng, now),
+                )
+
+        self.insert(FriendshipRequest, "friendship requests", friendships())
+
+        def reviews():
+            # Per-user review counts follow a Pareto distribution (a few
+            # prolific reviewers), and popular books collect most reviews.
+            remaining = counts["reviews"]
+            mean = counts["reviews"] / len(user_ids)
+            most = max(1, len(book_ids) // 2)
+            for user_id in user_ids:
+                if remaining <= 0:
+                    return
+                wanted = min(remaining, most, max(1, round(mean * rng.paretovariate(2.0) / 2)))
+                books = set()
+                while len(books) < wanted:
+                    books.add(skewed(rng, len(book_ids)))
+                remaining -= wanted
+                for book in sorted(books):
+                    yield BookReview(
+                        user_id=user_id,
+                        book_id=book_ids[book],
+                        content=sentence(rng, rng.randint(5, 60)),
+                        stars_given=rng.choices((1, 2, 3, 4, 5), (5, 8, 17, 35, 35))[0],
+                        created_at=random_past(rng, now),
+                    )
+
+        self.insert(BookReview, "reviews", reviews())
+
+        def notifications():
+            for _ in range(counts["notifications"]):
+                message = rng.choice(NOTIFICATION_MESSAGES).format(sentence(rng, 2))
+                yield Notification(
+                    user_id=user_ids[skewed(rng, len(user_ids), 2.0)],
+                    message=message,
+                    is_read=rng.random() < 0.8,
+                    created_at=random_past(rng, now, days=180),
+                )
+
+        with explicit_timestamps(Notification, "created_at"):
+            self.insert(Notification, "notifications", notifications())
+
+        # bulk_create sends no signals, so fill the aggregates and invalidate
+        # cached pages explicitly.
+        author_stats.rebuild(author_ids)
+        reading_stats.rebuild(user_ids)
+        leaderboards.rebuild(user_ids)
+        trending.rebuild()
+        invalidation.bump(invalidation.CATALOG)
+        invalidation.bump(invalidation.REVIEWS)
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded benchmark data in {time.perf_counter() - started:.1f}s (seed {options['seed']})."
+        ))
+
+    def insert(self, model, label, objects):
+        total = 0
+        started = time.perf_counter()
+        for batch in batched(objects, self.batch_size):
+            model.objects.bulk_create(batch, batch_size=self.batch_size)
+            total += len(batch)
+            if self.verbosity > 1:
+                self.stdout.write(f"  {label}: {total:,}", ending="\r")
+        if self.verbosity:
+            self.stdout.write(f"{label}: {total:,} rows in {time.perf_counter() - started:.1f}s")
+        return total
+
+    def reset(self):
+        """Delete benchmark rows in chunks; cascades remove their reviews, requests and notifications."""
+        User = get_user_model()
+        for queryset in (
+            Notification.objects.filter(user__username__startswith=USERNAME_PREFIX),
+            BookReview.objects.filter(user__username__startswith=USERNAME_PREFIX),
+            FriendshipRequest.objects.filter(from_user__username__startswith=USERNAME_PREFIX),
+            User.objects.filter(username__startswith=USERNAME_PREFIX),
+            Book.objects.filter(isbn__startswith=ISBN_PREFIX),
+            Author.objects.filter(email__endswith=AUTHOR_EMAIL_DOMAIN),
+        ):
+            while pks := list(queryset.values_list("pk", flat=True)[: self.batch_size]):
+                queryset.model.objects.filter(pk__in=pks).delete()
+        if self.verbosity:
+            self.stdout.write("Removed earlier benchmark data.")
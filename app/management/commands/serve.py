@@ -0,0 +1,37 @@
+import os
+import shutil
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the production server: gunicorn with a preloaded, warmed-up "
+        "application, CPU/memory-sized workers and jittered worker recycling."
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--asgi", action="store_true", help="Serve config.asgi with uvicorn workers.")
+        parser.add_argument("--bind", help="Address to bind, e.g. 0.0.0.0:8000.")
+        parser.add_argument("--workers", type=int, help="Override the computed worker count.")
+        parser.add_argument("--threads", type=int, help="Override the threads per worker.")
+
+    def handle(self, *args, **options):
+        gunicorn = shutil.which("gunicorn")
+        if gunicorn is None:
+            raise CommandError("gunicorn is not installed.")
+
+        if options["asgi"]:
+            argv = ["gunicorn", "-c", "python:config.gunicorn_asgi", "config.asgi:application"]
+        else:
+            argv = ["gunicorn", "-c", "python:config.gunicorn", "config.wsgi:application"]
+        if options["bind"]:
+            argv += ["--bind", options["bind"]]
+        if options["workers"]:
+            argv += ["--workers", str(options["workers"])]
+        if options["threads"]:
+            argv += ["--threads", str(options["threads"])]
+
+        self.stdout.write(" ".join(argv))
+        os.execv(gunicorn, argv)
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.8 on 2026-10-19 10:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0010_wishlistitem'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CacheNamespace',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Cache Namespace',
+                'verbose_name_plural': 'Cache Namespaces',
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-19 10:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0011_cachenamespace'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ViewQueryStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('view_name', models.CharField(max_length=200)),
+                ('window_start', models.DateTimeField()),
+                ('requests', models.PositiveIntegerField(default=0)),
+                ('queries', models.PositiveBigIntegerField(default=0)),
+                ('db_time_ms', models.FloatField(default=0)),
+                ('max_queries', models.PositiveIntegerField(default=0)),
+                ('n_plus_one_requests', models.PositiveIntegerField(default=0)),
+                ('last_n_plus_one', models.TextField(blank=True)),
+            ],
+            options={
+                'verbose_name': 'View Query Stats',
+                'verbose_name_plural': 'View Query Stats',
+                'ordering': ['-window_start', '-db_time_ms'],
+                'unique_together': {('view_name', 'window_start')},
+            },
+        ),
+    ]
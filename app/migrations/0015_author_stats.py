@@ -0,0 +1,51 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill(apps, schema_editor):
+    # A standalone copy of app.author_stats.rebuild for the historical models.
+    Author = apps.get_model("app", "Author")
+    AuthorStats = apps.get_model("app", "AuthorStats")
+    BookAuthor = apps.get_model("app", "BookAuthor")
+    BookReview = apps.get_model("app", "BookReview")
+    totals = {
+        row["book_id"]: (row["reviews"], row["stars"])
+        for row in BookReview.objects.values("book_id").annotate(reviews=Count("id"), stars=Sum("stars_given"))
+    }
+    stats = {pk: AuthorStats(author_id=pk) for pk in Author.objects.values_list("pk", flat=True)}
+    for author_id, book_id in set(BookAuthor.objects.values_list("author_id", "book_id")):
+        row = stats[author_id]
+        reviews, stars = totals.get(book_id, (0, 0))
+        row.book_count += 1
+        row.review_count += reviews
+        row.rating_sum += stars
+    AuthorStats.objects.bulk_create(stats.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0014_catalog_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='app.author')),
+                ('book_count', models.IntegerField(default=0)),
+                ('review_count', models.IntegerField(default=0)),
+                ('rating_sum', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Author stats',
+                'verbose_name_plural': 'Author stats',
+                'indexes': [models.Index(fields=['-review_count'], name='author_stats_reviews_idx')],
+            },
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
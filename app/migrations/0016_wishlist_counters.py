@@ -0,0 +1,44 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:11
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill(apps, schema_editor):
+    BookWishlistCounter = apps.get_model("app", "BookWishlistCounter")
+    WishListItem = apps.get_model("app", "WishListItem")
+    rows = WishListItem.objects.values("book_id").annotate(count=Count("id")).order_by()
+    BookWishlistCounter.objects.bulk_create(
+        (BookWishlistCounter(book_id=row["book_id"], count=row["count"]) for row in rows.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0015_author_stats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookWishlistCounter',
+            fields=[
+                ('book', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='wishlist_counter', serialize=False, to='app.book')),
+                ('count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Book wishlist counter',
+                'verbose_name_plural': 'Book wishlist counters',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='wishlistitem',
+            index=models.Index(fields=['user', '-added_at'], name='wishlist_user_added_idx'),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
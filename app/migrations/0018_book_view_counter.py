@@ -0,0 +1,26 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0017_trending'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookViewCounter',
+            fields=[
+                ('book', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='view_counter', serialize=False, to='app.book')),
+                ('count', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Book view counter',
+                'verbose_name_plural': 'Book view counters',
+            },
+        ),
+    ]
@@ -15,10 +15,12 @@ class Book(models.Model):
         default="book_covers/default_cover.png",
     )
     why_read = models.TextField(max_length=500, help_text="Why did you read this book?", blank=False)
-    
+    updated_at = models.DateTimeField(auto_now=True)
+
     class Meta:
         verbose_name = "Book"
         verbose_name_plural = "Books"
+        indexes = [models.Index(fields=["title"], name="book_title_idx")]
 
     def __str__(self) -> str:
         return f"{self.title} ({self.isbn})"
@@ -29,6 +31,7 @@ class Author(models.Model):
     last_name = models.CharField(max_length=100)
     email = models.EmailField(blank=True, null=True)
     bio = models.TextField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = "Author"
@@ -39,9 +42,32 @@ class Author(models.Model):
         return f"{self.first_name} {self.last_name}"
 
 
+class AuthorStats(models.Model):
+    """Aggregates for author pages, kept current by ``app.author_stats``."""
+
+    author = models.OneToOneField(Author, on_delete=models.CASCADE, primary_key=True, related_name="stats")
+    book_count = models.IntegerField(default=0)
+    review_count = models.IntegerField(default=0)
+    rating_sum = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Author stats"
+        verbose_name_plural = "Author stats"
+        indexes = [models.Index(fields=["-review_count"], name="author_stats_reviews_idx")]
+
+    def __str__(self) -> str:
+        return f"Stats for author {self.author_id}"
+
+    @property
+    def average_rating(self):
+        return self.rating_sum / self.review_count if self.review_count else None
+
+
 class BookAuthor(models.Model):
     book = models.ForeignKey(Book, on_delete=models.CASCADE)
     author = models.ForeignKey(Author, on_delete=models.CASCADE)
+    updated_at = models.DateTimeField(auto_now=True)
 
 
 class BookReview(models.Model):
@@ -55,6 +81,10 @@ class BookReview(models.Model):
 
     class Meta:
         unique_together = ("user", "book")
+        indexes = [
+            models.Index(fields=["book", "-created_at"], name="review_book_created_idx"),
+            models.Index(fields=["-created_at"], name="review_created_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"Review {self.user.username} to {self.book.title}"
@@ -68,6 +98,102 @@ class WishListItem(models.Model):
         unique_together = ("user", "book")
         verbose_name = "Wish List Item"
         verbose_name_plural = "Wish List Items"
+        indexes = [models.Index(fields=["user", "-added_at"], name="wishlist_user_added_idx")]
 
     def __str__(self) -> str:
         return f"{self.user.username} --> {self.book.title}"
+
+
+class BookWishlistCounter(models.Model):
+    """How many users have a book on their wishlist, kept by ``app.wishlist``."""
+
+    book = models.OneToOneField(Book, on_delete=models.CASCADE, primary_key=True, related_name="wishlist_counter")
+    count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Book wishlist counter"
+        verbose_name_plural = "Book wishlist counters"
+
+    def __str__(self) -> str:
+        return f"{self.book_id}: {self.count}"
+
+
+class BookViewCounter(models.Model):
+    """How often a book's page has been viewed, written behind by ``app.page_views``."""
+
+    book = models.OneToOneField(Book, on_delete=models.CASCADE, primary_key=True, related_name="view_counter")
+    count = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Book view counter"
+        verbose_name_plural = "Book view counters"
+
+    def __str__(self) -> str:
+        return f"{self.book_id}: {self.count}"
+
+
+class TrendingScore(models.Model):
+    """A book's time-decayed activity score in one scope, kept by ``app.trending``.
+
+    ``score`` is relative to ``TrendingLandmark.at``; only the order of scores
+    within a scope means anything.
+    """
+
+    scope = models.CharField(max_length=30)
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name="+")
+    score = models.FloatField(default=0)
+
+    class Meta:
+        unique_together = ("scope", "book")
+        indexes = [models.Index(fields=["scope", "-score"], name="trending_scope_score_idx")]
+
+    def __str__(self) -> str:
+        return f"{self.scope}: {self.book_id} ({self.score:.3g})"
+
+
+class TrendingLandmark(models.Model):
+    """The single point in time every ``TrendingScore`` is relative to."""
+
+    at = models.DateTimeField()
+
+    def __str__(self) -> str:
+        return self.at.isoformat()
+
+
+class CacheNamespace(models.Model):
+    """Version stamp for a group of cached data shared by every worker."""
+
+    name = models.CharField(max_length=100, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Cache Namespace"
+        verbose_name_plural = "Cache Namespaces"
+
+    def __str__(self) -> str:
+        return f"{self.name} (v{self.version})"
+
+
+class ViewQueryStats(models.Model):
+    """Hourly SQL summary for one view, collected from sampled requests."""
+
+    view_name = models.CharField(max_length=200)
+    window_start = models.DateTimeField()
+    requests = models.PositiveIntegerField(default=0)
+    queries = models.PositiveBigIntegerField(default=0)
+    db_time_ms = models.FloatField(default=0)
+    max_queries = models.PositiveIntegerField(default=0)
+    n_plus_one_requests = models.PositiveIntegerField(default=0)
+    last_n_plus_one = models.TextField(blank=True)
+
+    class Meta:
+        unique_together = ("view_name", "window_start")
+        ordering = ["-window_start", "-db_time_ms"]
+        verbose_name = "View Query Stats"
+        verbose_name_plural = "View Query Stats"
+
+    def __str__(self) -> str:
+        return f"{self.view_name} @ {self.window_start:%Y-%m-%d %H:00}"
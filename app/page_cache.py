@@ -0,0 +1,237 @@
+"""Full-page cache for the public pages, shared by every visitor.
+
+The landing page, the book list and the book pages look the same to everyone
+except for a few small parts: the navigation, flash messages, the wishlist
+button and the review form. A view wrapped in ``cache_page_shell`` is rendered
+once as an anonymous visitor, with each of those parts left as a placeholder
+by ``{% user_fragment %}``, and that shell is kept in the shared cache. Every
+response, cached or not, then fills the placeholders with fragments rendered
+for the current user, so logged-in readers reuse the anonymous shell too.
+
+Shells are keyed on the path, the normalized query string, a stamp per
+namespace the page shows and the templates version. ``invalidate`` (called
+from ``app/signals.py``) replaces a namespace's stamp, which retires every
+shell built from the old data at once. A shell also keeps the stamps of the
+rows its cached fragments showed, e.g. the books on a list page, and is only
+served while they are unchanged, so a wishlist click on one book retires the
+pages showing that book and nothing else.
+
+Responses for anonymous visitors are ``public`` with ``s-maxage`` so a proxy
+can serve them too; anything rendered for a user, or carrying flash messages
+or a new CSRF cookie, is ``private``. Both vary on ``Cookie``.
+"""
+
+import functools
+import hashlib
+import re
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Optional
+from urllib.parse import urlencode
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.utils.cache import patch_cache_control, patch_vary_headers
+
+from app import fragments
+from app.conditional import templates_version
+
+# Query parameters that only say where a visitor came from.
+IGNORED_PARAMS = re.compile(r"^(?:utm_\w+|fbclid|gclid)$")
+PLACEHOLDER = re.compile(r"<!--user-fragment:(\w+)((?:;\w+=[\w-]*)*)-->")
+SAFE_VALUE = re.compile(r"^[\w-]*$")
+
+
+@dataclass
+class Fragment:
+    """A per-user part of a cached page."""
+
+    template_name: str
+    # ``get_context(request, **kwargs)`` supplies what the template needs
+    # beyond the tag's keyword arguments and the context processors.
+    get_context: Optional[Callable] = None
+
+
+FRAGMENTS = {}
+
+
+def register_fragment(name, template_name, get_context=None):
+    FRAGMENTS[name] = Fragment(template_name, get_context)
+
+
+register_fragment("nav", "fragments/nav.html")
+register_fragment("messages", "fragments/messages.html")
+register_fragment("notification_script", "fragments/notification_script.html")
+
+
+def placeholder(name, kwargs):
+    params = []
+    for key, value in kwargs.items():
+        value = str(value)
+        if not SAFE_VALUE.match(value):
+            raise ValueError(f"Fragment argument {key}={value!r} cannot go in a placeholder.")
+        params.append(f";{key}={value}")
+    return f"<!--user-fragment:{name}{''.join(params)}-->"
+
+
+def render_fragment(request, name, kwargs):
+    fragment = FRAGMENTS[name]
+    context = dict(kwargs)
+    if fragment.get_context:
+        context.update(fragment.get_context(request, **kwargs))
+    return render_to_string(fragment.template_name, context, request=request)
+
+
+def fill(request, html):
+    """Replace every placeholder in ``html`` with its fragment for ``request``."""
+
+    def replace(match):
+        kwargs = dict(param.split("=", 1) for param in match[2].split(";")[1:])
+        return render_fragment(request, match[1], kwargs)
+
+    return PLACEHOLDER.sub(replace, html)
+
+
+def stamp_key(namespace):
+    return f"stamp:page:{namespace}"
+
+
+def invalidate(namespace):
+    """Retire every cached page that depends on ``namespace``."""
+    fragments.replace_stamp(stamp_key(namespace))
+
+
+def stamp(namespace):
+    """The current stamp of ``namespace``; ``invalidate`` replaces it."""
+    key = stamp_key(namespace)
+    return fragments.fetch_stamps([key])[key]
+
+
+def normalized_query(request):
+    """The query string with sorted keys and no empty or tracking parameters."""
+    params = sorted(
+        (key, value)
+        for key, values in request.GET.lists()
+        if not IGNORED_PARAMS.match(key)
+        for value in values
+        if value
+    )
+    return urlencode(params)
+
+
+def page_key(request, namespaces):
+    stamps = fragments.fetch_stamps(stamp_key(namespace) for namespace in namespaces)
+    parts = [
+        request.path,
+        normalized_query(request),
+        *(stamps[stamp_key(namespace)] for namespace in namespaces),
+        templates_version(),
+    ]
+    digest = hashlib.md5("\n".join(parts).encode(), usedforsecurity=False).hexdigest()
+    return f"page:{digest}"
+
+
+@contextmanager
+def rendering_shell(request):
+    """Render the view as an anonymous visitor, leaving placeholders behind."""
+    anonymous = AnonymousUser()
+
+    async def auser():
+        return anonymous
+
+    saved = {name: request.__dict__[name] for name in ("user", "auser") if name in request.__dict__}
+    request.user, request.auser, request.page_shell = anonymous, auser, True
+    try:
+        yield
+    finally:
+        del request.user, request.auser, request.page_shell
+        request.__dict__.update(saved)
+
+
+def extract_shell(request, key, response, stamps):
+    """Return the shell in ``response`` and cache it if it can be shared."""
+    if response.status_code != 200 or response.streaming:
+        return None
+    shell = {
+        "content": response.content.decode(response.charset),
+        "content_type": response["Content-Type"],
+        "stamps": stamps,
+    }
+    # A shell that set a cookie or used the CSRF token belongs to one visitor.
+    if not response.cookies and not request.META.get("CSRF_COOKIE_NEEDS_UPDATE"):
+        cache.set(key, shell, settings.PAGE_CACHE_TIMEOUT)
+    return shell
+
+
+def respond(request, shell, hit):
+    shared = not request.user.is_authenticated and not len(messages.get_messages(request))
+    response = HttpResponse(fill(request, shell["content"]), content_type=shell["content_type"])
+    if shared and not request.META.get("CSRF_COOKIE_NEEDS_UPDATE"):
+        patch_cache_control(response, public=True, max_age=0, s_maxage=settings.PAGE_CACHE_PROXY_MAX_AGE)
+    else:
+        patch_cache_control(response, private=True, max_age=0)
+    patch_vary_headers(response, ["Cookie"])
+    response["X-Page-Cache"] = "hit" if hit else "miss"
+    return response
+
+
+def cache_page_shell(*namespaces):
+    """Serve the view from the shared page cache, filling in user fragments.
+
+    ``namespaces`` (see ``app.invalidation``) name the data the page shows;
+    rows shown through cached fragments need no namespace.
+    """
+
+    def lookup(request):
+        key = page_key(request, namespaces)
+        shell = cache.get(key)
+        if shell is not None and shell.get("stamps") and fragments.fetch_stamps(shell["stamps"]) != shell["stamps"]:
+            # A row the page shows changed since it was cached.
+            shell = None
+        return key, shell
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+
+            @functools.wraps(view)
+            async def inner(request, *args, **kwargs):
+                if request.method not in ("GET", "HEAD"):
+                    return await view(request, *args, **kwargs)
+                key, shell = await sync_to_async(lookup)(request)
+                hit = shell is not None
+                if not hit:
+                    with rendering_shell(request), fragments.recording_stamps() as stamps:
+                        response = await view(request, *args, **kwargs)
+                        if hasattr(response, "render"):
+                            await sync_to_async(response.render)()
+                    shell = await sync_to_async(extract_shell)(request, key, response, stamps)
+                    if shell is None:
+                        return response
+                return await sync_to_async(respond)(request, shell, hit)
+
+        else:
+
+            @functools.wraps(view)
+            def inner(request, *args, **kwargs):
+                if request.method not in ("GET", "HEAD"):
+                    return view(request, *args, **kwargs)
+                key, shell = lookup(request)
+                hit = shell is not None
+                if not hit:
+                    with rendering_shell(request), fragments.recording_stamps() as stamps:
+                        response = view(request, *args, **kwargs)
+                        if hasattr(response, "render"):
+                            response.render()
+                    shell = extract_shell(request, key, response, stamps)
+                    if shell is None:
+                        return response
+                return respond(request, shell, hit)
+
+        return inner
+
+    return decorator
@@ -0,0 +1,68 @@
+"""Book page views, counted through a write-behind buffer.
+
+Each view of a book page adds one to ``book_views`` under
+``(book_id, school_class)``. A flush adds the totals to ``BookViewCounter``
+and records them as "view" events in ``app.trending``, for the viewer's class
+as well as globally. See ``config.write_behind`` for when flushes happen and
+what can be lost.
+"""
+
+import functools
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.utils import timezone
+
+from app import trending
+from app.models import BookViewCounter
+from config.write_behind import WriteBehindCounter, increment
+
+
+def write_book_views(pending):
+    per_book = Counter()
+    for (book_id, _), count in pending.items():
+        per_book[book_id] += count
+    existing = increment(BookViewCounter, per_book)
+    now = timezone.now()
+    trending.record_many(
+        (book_id, "view", school_class, now, count)
+        for (book_id, school_class), count in pending.items()
+        if book_id in existing
+    )
+
+
+book_views = WriteBehindCounter("book view", write_book_views)
+
+
+# Revalidations are views too; errors and redirects are not.
+COUNTED_STATUSES = {200, 304}
+
+
+def counts_book_views(view):
+    """Count a view of book ``pk`` for every page served or revalidated.
+
+    Goes outside ``conditional`` and ``cache_page_shell`` so that cached
+    responses are counted too.
+    """
+    if iscoroutinefunction(view):
+
+        @functools.wraps(view)
+        async def inner(request, *args, **kwargs):
+            response = await view(request, *args, **kwargs)
+            if response.status_code in COUNTED_STATUSES:
+                user = await request.auser()
+                if book_views.add((kwargs["pk"], getattr(user, "school_class", ""))):
+                    await sync_to_async(book_views.flush)()
+            return response
+
+        return inner
+
+    @functools.wraps(view)
+    def inner(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if response.status_code in COUNTED_STATUSES:
+            if book_views.add((kwargs["pk"], getattr(request.user, "school_class", ""))):
+                book_views.flush()
+        return response
+
+    return inner
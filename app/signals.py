@@ -0,0 +1,154 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from app import author_stats, fragments, page_cache, trending, wishlist
+from app.invalidation import CATALOG, REVIEWS, WISHLISTS, publish
+from app.models import Author, Book, BookAuthor, BookReview, WishListItem
+from users import leaderboards, reading_stats
+
+# Sent by ``app.bulk_reviews`` after reviews were inserted with bulk_create,
+# which skips post_save, with ``book_ids`` and ``user_ids`` of the new rows.
+reviews_bulk_created = Signal()
+
+
+@receiver([post_save, post_delete], sender=Book)
+@receiver([post_save, post_delete], sender=Author)
+@receiver([post_save, post_delete], sender=BookAuthor)
+def invalidate_catalog(sender, **kwargs):
+    publish(CATALOG)
+    page_cache.invalidate(CATALOG)
+
+
+@receiver([post_save, post_delete], sender=BookReview)
+def invalidate_reviews(sender, **kwargs):
+    publish(REVIEWS)
+    page_cache.invalidate(REVIEWS)
+
+
+@receiver([post_save, post_delete], sender=Book)
+@receiver([post_save, post_delete], sender=BookReview)
+@receiver([post_save, post_delete], sender=settings.AUTH_USER_MODEL)
+def bump_fragment_stamp(sender, instance, update_fields=None, **kwargs):
+    # Logging in only touches last_login, which no fragment shows.
+    if update_fields and set(update_fields) <= {"last_login"}:
+        return
+    fragments.bump(instance)
+
+
+@receiver([post_save, post_delete], sender=BookReview)
+@receiver([post_save, post_delete], sender=BookAuthor)
+def touch_book(sender, instance, **kwargs):
+    # The book page shows its reviews and authors, so they revalidate it.
+    Book.objects.filter(pk=instance.book_id).update(updated_at=timezone.now())
+
+
+# Stored values that author stats, reading stats and leaderboards need to know
+# a save has overwritten.
+TRACKED_FIELDS = {
+    BookReview: ("book_id", "user_id", "stars_given", "created_at"),
+    BookAuthor: ("author_id",),
+}
+
+
+@receiver(pre_save, sender=BookReview)
+@receiver(pre_save, sender=BookAuthor)
+def remember_tracked_fields(sender, instance, update_fields=None, **kwargs):
+    fields = TRACKED_FIELDS[sender]
+    instance._stored = None
+    if instance.pk is None or instance._state.adding:
+        return
+    names = set(fields) | {field.removesuffix("_id") for field in fields}
+    if update_fields is not None and not names & set(update_fields):
+        # The stored values are not being written, so they stay as they are.
+        instance._stored = {field: getattr(instance, field) for field in fields}
+        return
+    instance._stored = sender.objects.filter(pk=instance.pk).values(*fields).first()
+
+
+@receiver(post_save, sender=BookReview)
+def count_saved_review(sender, instance, created, **kwargs):
+    author_stats.review_saved(instance, None if created else instance._stored)
+    reading_stats.review_saved(instance, None if created else instance._stored)
+    leaderboards.review_saved(instance, None if created else instance._stored)
+
+
+@receiver(post_delete, sender=BookReview)
+def count_deleted_review(sender, instance, **kwargs):
+    author_stats.review_deleted(instance)
+    reading_stats.review_deleted(instance)
+    leaderboards.review_deleted(instance)
+
+
+@receiver(post_save, sender=BookAuthor)
+def recount_authors(sender, instance, **kwargs):
+    author_ids = {instance.author_id}
+    if instance._stored:
+        author_ids.add(instance._stored["author_id"])
+    author_stats.rebuild(author_ids)
+
+
+@receiver(post_delete, sender=BookAuthor)
+def recount_author_after_unlink(sender, instance, **kwargs):
+    # Deleting the author itself cascades here before the author row is gone;
+    # recounting at commit keeps the rebuild from recreating its stats.
+    transaction.on_commit(lambda: author_stats.rebuild([instance.author_id]))
+
+
+@receiver(post_save, sender=WishListItem)
+def count_wishlisted_book(sender, instance, created, **kwargs):
+    if created:
+        wishlist.item_changed(instance, 1)
+
+
+@receiver(post_delete, sender=WishListItem)
+def uncount_wishlisted_book(sender, instance, origin=None, **kwargs):
+    # When the user is being deleted their reading stats go with them, and
+    # recording the removal would recreate a row for a user about to vanish.
+    user_deleted = getattr(origin, "model", type(origin)) is get_user_model()
+    wishlist.item_changed(instance, -1, user_stats=not user_deleted)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def move_leaderboard_entries(sender, instance, created, update_fields=None, **kwargs):
+    if created or (update_fields and not {"role", "school_class"} & set(update_fields)):
+        return
+    leaderboards.user_saved(instance)
+
+
+# Events that move a book up the trending rankings.
+TRENDING_KINDS = {BookReview: "review", WishListItem: "wishlist"}
+
+
+@receiver(post_save, sender=BookReview)
+@receiver(post_save, sender=WishListItem)
+def record_trending_event(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        trending.record(instance.book_id, TRENDING_KINDS[sender], instance.user)
+
+
+@receiver(wishlist.counts_changed)
+def invalidate_wishlist_counts(sender, book_ids, **kwargs):
+    # Book cards and book pages show the counter. Cached pages check the
+    # stamps of the books they show, so only those are retired; the
+    # namespace still moves the catalog's ETag.
+    for book_id in book_ids:
+        fragments.bump(Book(pk=book_id))
+    publish(WISHLISTS)
+
+
+@receiver(reviews_bulk_created)
+def refresh_reviewed_books(sender, book_ids, user_ids, **kwargs):
+    # What the per-review receivers above do, once per import.
+    book_ids = sorted(book_ids)
+    now = timezone.now()
+    for start in range(0, len(book_ids), 1000):
+        Book.objects.filter(pk__in=book_ids[start:start + 1000]).update(updated_at=now)
+    author_stats.rebuild(author_stats.book_author_ids(book_ids))
+    reading_stats.rebuild(user_ids)
+    leaderboards.rebuild(user_ids)
+    publish(REVIEWS)
+    page_cache.invalidate(REVIEWS)
@@ -0,0 +1,39 @@
+"""Filters for showing counts from ``config.paginator``.
+
+Usage::
+
+    {% load counts %}
+    {{ paginator|result_count }}       {# "27 results" or "about 1.2M results" #}
+    {{ 1234567|compact_number }}       {# "1.2M" #}
+"""
+
+from django import template
+
+register = template.Library()
+
+SUFFIXES = ((1_000_000_000, "B"), (1_000_000, "M"), (1_000, "K"))
+
+
+@register.filter
+def compact_number(value):
+    """``1234567`` -> ``"1.2M"``; numbers below a thousand are unchanged."""
+    value = int(value)
+    for index, (size, suffix) in enumerate(SUFFIXES):
+        if abs(value) >= size:
+            number = f"{value / size:.1f}"
+            if abs(float(number)) >= 1000 and index:
+                # 999_950 rounds to "1000.0K"; that is "1M".
+                size, suffix = SUFFIXES[index - 1]
+                number = f"{value / size:.1f}"
+            return f"{number.removesuffix('.0')}{suffix}"
+    return str(value)
+
+
+@register.filter
+def result_count(paginator, noun="result"):
+    """``"27 results"``, or ``"about 1.2M results"`` for an estimated count."""
+    count = paginator.count
+    label = noun if count == 1 else f"{noun}s"
+    if getattr(paginator, "is_estimated", False):
+        return f"about {compact_number(count)} {label}"
+    return f"{count} {label}"
@@ -0,0 +1,90 @@
+"""Template tags for dependency-keyed fragment caching (see ``app.fragments``).
+
+Usage::
+
+    {% load fragment_cache %}
+    {% prefetch_fragments "home_review" book_reviews "book" "user" %}
+    {% for review in book_reviews %}
+        {% cachefragment "home_review" review review.book review.user %}
+            ...
+        {% endcachefragment %}
+    {% endfor %}
+
+``prefetch_fragments`` looks up the fragment of every item in one batch; its
+extra arguments name the related objects each fragment also depends on and
+must match the dependencies given to ``cachefragment``. Without a prefetch,
+``cachefragment`` still works but looks fragments up one by one.
+"""
+
+from django import template
+from django.db import models
+
+from app import fragments
+
+register = template.Library()
+
+STATE = "fragment_cache"
+
+
+def dependency_group(item, attributes):
+    return [item, *(getattr(item, attribute) for attribute in attributes)]
+
+
+def state(context):
+    return context.render_context.setdefault(STATE, {"stamps": {}, "found": {}, "looked_up": set()})
+
+
+@register.simple_tag(takes_context=True)
+def prefetch_fragments(context, name, items, *attributes):
+    groups = [dependency_group(item, attributes) for item in items]
+    if not groups:
+        return ""
+    stamps, found = fragments.get_fragments(name, groups)
+    current = state(context)
+    current["stamps"].update(stamps)
+    current["found"].update(found)
+    current["looked_up"].update(fragments.fragment_key(name, group, stamps) for group in groups)
+    return ""
+
+
+class CacheFragmentNode(template.Node):
+    def __init__(self, nodelist, name, dependencies):
+        self.nodelist = nodelist
+        self.name = name
+        self.dependencies = dependencies
+
+    def render(self, context):
+        name = self.name.resolve(context)
+        dependencies = [dependency.resolve(context) for dependency in self.dependencies]
+        current = state(context)
+
+        instances = [dep for dep in dependencies if isinstance(dep, models.Model)]
+        stamps = current["stamps"]
+        if any(fragments.stamp_key(instance) not in stamps for instance in instances):
+            stamps.update(fragments.get_stamps(instances))
+        key = fragments.fragment_key(name, dependencies, stamps)
+
+        html = current["found"].get(key)
+        if html is None and key not in current["looked_up"]:
+            html = fragments.get_fragment(key)
+        if html is None:
+            html = self.nodelist.render(context)
+            fragments.set_fragment(key, html)
+        return html
+
+
+@register.tag
+def cachefragment(parser, token):
+    """Cache the enclosed block under ``name`` and the stamps of its dependencies."""
+    bits = token.split_contents()
+    if len(bits) < 3:
+        raise template.TemplateSyntaxError(
+            f"'{bits[0]}' takes a fragment name and at least one dependency."
+        )
+    nodelist = parser.parse(("endcachefragment",))
+    parser.delete_first_token()
+    return CacheFragmentNode(
+        nodelist,
+        parser.compile_filter(bits[1]),
+        [parser.compile_filter(bit) for bit in bits[2:]],
+    )
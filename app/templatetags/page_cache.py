@@ -0,0 +1,28 @@
+"""The per-user parts of pages served by ``app.page_cache``.
+
+Usage::
+
+    {% load page_cache %}
+    {% user_fragment "wishlist_button" book_pk=book.pk %}
+
+While a shared page shell is rendered the tag leaves a placeholder that is
+filled for each visitor; everywhere else it includes the fragment's template
+with the current context, like ``{% include %}``.
+"""
+
+from django import template
+from django.utils.safestring import mark_safe
+
+from app import page_cache
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def user_fragment(context, name, **kwargs):
+    fragment = page_cache.FRAGMENTS[name]
+    request = context.get("request")
+    if getattr(request, "page_shell", False):
+        return mark_safe(page_cache.placeholder(name, kwargs))
+    with context.push(**kwargs):
+        return context.template.engine.get_template(fragment.template_name).render(context)
@@ -0,0 +1,182 @@
+"""Query budgets for every page.
+
+``setUpTestData`` seeds more related rows than any budget below, so a view
+that goes back to querying once per book, review, request or notification
+fails here instead of in production. The budgets include the session and
+user lookups of the authenticated client and the ETag version lookup, and
+start from an empty cache.
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from app.models import Author, Book, BookAuthor, BookReview, WishListItem
+from notifications.models import Notification
+from users.models import FriendshipRequest
+
+User = get_user_model()
+
+ROWS = 15
+
+
+# Page views are flushed on their own schedule, which is not part of a budget.
+@override_settings(SQL_INSTRUMENTATION_SAMPLE_RATE=0.0, WRITE_BEHIND_FLUSH_INTERVAL=3600.0)
+class QueryBudgetTests(TestCase):
+    """Test that the number of queries per view does not grow with the data."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(
+            username="teacher", password="pass12345", role="teacher", school_class="5A"
+        )
+        cls.user = User.objects.create_user(
+            username="reader", password="pass12345", role="student", school_class="5A"
+        )
+        cls.people = [
+            User.objects.create_user(
+                username=f"student{i}", password="pass12345", role="student", school_class="5A"
+            )
+            for i in range(ROWS)
+        ]
+        cls.books = [
+            Book.objects.create(
+                title=f"Budget Book {i}",
+                description="A book about query budgets",
+                isbn=f"978100000{i:04d}",
+                why_read="Because",
+            )
+            for i in range(ROWS)
+        ]
+        cls.authors = authors = [Author.objects.create(first_name="Ann", last_name=f"Writer{i}") for i in range(ROWS)]
+        for i, book in enumerate(cls.books):
+            BookAuthor.objects.create(book=book, author=authors[i])
+            BookAuthor.objects.create(book=book, author=authors[(i + 1) % ROWS])
+            WishListItem.objects.create(user=cls.user, book=book)
+            for j, person in enumerate(cls.people):
+                if (i + j) % 3 == 0:
+                    BookReview.objects.create(
+                        user=person, book=book, content="Great read", stars_given=1 + (i + j) % 5
+                    )
+                    WishListItem.objects.create(user=person, book=book)
+        cls.book = cls.books[0]
+
+        statuses = (
+            FriendshipRequest.STATUS_ACCEPTED,
+            FriendshipRequest.STATUS_PENDING,
+            FriendshipRequest.STATUS_REJECTED,
+        )
+        for i, person in enumerate(cls.people):
+            if i % 2:
+                FriendshipRequest.objects.create(from_user=cls.user, to_user=person, status=statuses[i % 3])
+            else:
+                FriendshipRequest.objects.create(from_user=person, to_user=cls.user, status=statuses[i % 3])
+        for i in range(ROWS):
+            Notification.objects.create(user=cls.user, message=f"Notification {i}", is_read=i % 2 == 0)
+
+    def setUp(self):
+        # Budgets measure a cold render; nothing cached by an earlier test counts.
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def assertMaxQueries(self, budget, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        executed = len(queries)
+        self.assertLessEqual(
+            executed,
+            budget,
+            f"{url} ran {executed} queries (budget {budget}):\n"
+            + "\n".join(query["sql"] for query in queries.captured_queries),
+        )
+        return response
+
+    def test_books_list(self):
+        """Test the catalog page budget."""
+        # The trending landmark and scores, cached for TRENDING_CACHE_TIMEOUT.
+        self.assertMaxQueries(7, reverse("books:list"))
+
+    def test_books_search(self):
+        """Test the catalog search budget."""
+        self.assertMaxQueries(7, reverse("books:list") + "?q=Writer")
+
+    def test_book_detail(self):
+        """Test the book detail budget."""
+        self.assertMaxQueries(7, reverse("books:detail", args=[self.book.pk]))
+
+    def test_book_detail_anonymous(self):
+        """Test the book detail budget for anonymous visitors."""
+        self.client.logout()
+        self.assertMaxQueries(4, reverse("books:detail", args=[self.book.pk]))
+
+    def test_home_page(self):
+        """Test the review feed budget."""
+        self.assertMaxQueries(3, reverse("home_page"))
+
+    def test_wishlist(self):
+        """Test the wishlist budget."""
+        self.assertMaxQueries(5, reverse("books:wishlist"))
+
+    def test_people(self):
+        """Test the people directory budget."""
+        self.assertMaxQueries(5, reverse("users:people"))
+
+    def test_friends_list(self):
+        """Test the friends list budget."""
+        self.assertMaxQueries(3, reverse("users:friends_list"))
+
+    def test_friend_requests(self):
+        """Test the friend requests budget."""
+        self.assertMaxQueries(4, reverse("users:friend_requests"))
+
+    def test_profile(self):
+        """Test the own profile budget."""
+        self.assertMaxQueries(5, reverse("users:profile"))
+
+    def test_user_profile(self):
+        """Test another user's profile budget."""
+        # Reading stats: the user's months and their friend count.
+        self.assertMaxQueries(8, reverse("users:user_profile", args=[self.people[0].pk]))
+
+    def test_leaderboard(self):
+        """Test the grade leaderboard budget."""
+        self.assertMaxQueries(5, reverse("users:leaderboard") + "?scope=grade&metric=stars")
+
+    def test_teachers_dashboard(self):
+        """Test the teacher dashboard budget."""
+        self.client.force_login(self.teacher)
+        self.assertMaxQueries(3, reverse("users:teachers_dashboard"))
+
+    def test_notifications_list(self):
+        """Test the notifications list budget."""
+        self.assertMaxQueries(4, reverse("notifications:notifications_list"))
+
+    def test_authors_list(self):
+        """Test the author index budget."""
+        self.assertMaxQueries(5, reverse("authors:list") + "?sort=popular")
+
+    def test_author_detail(self):
+        """Test the author page budget."""
+        self.assertMaxQueries(5, reverse("authors:detail", args=[self.authors[0].pk]))
+
+    def test_unread_notifications_count(self):
+        """Test the unread counter budget."""
+        self.assertMaxQueries(3, reverse("notifications:unread_notifications_count"))
+
+    def test_api_books(self):
+        """Test the JSON book list budget with every related field."""
+        self.assertMaxQueries(
+            6, reverse("api:books") + "?fields=title,authors,average_rating,review_count&limit=100"
+        )
+
+    def test_api_book_reviews(self):
+        """Test the JSON review list budget."""
+        self.assertMaxQueries(5, reverse("api:book_reviews", args=[self.book.pk]))
+
+    def test_api_wishlist(self):
+        """Test the JSON wishlist budget."""
+        self.assertMaxQueries(6, reverse("api:wishlist") + "?limit=100")
@@ -1,10 +1,45 @@
-from django.test import TestCase, Client
+from django.test import TestCase, Client, RequestFactory, override_settings
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.exceptions import ValidationError
-from app.models import Book, Author, BookAuthor, BookReview
+from django.contrib.auth.models import AnonymousUser
+from django.utils.functional import SimpleLazyObject
+from app.views import SEARCH_RATE_LIMIT, AsyncBookDetailView, AsyncBooksView, BooksView
+from config.ratelimit import CacheStore, LocalStore, RateLimit, client_ip, local_store, parse_rate, sliding_window, token_bucket
+from config.paginator import EstimatedCountPaginator, plan_estimate
+from notifications.models import Notification
+from app.models import Book, Author, AuthorStats, BookAuthor, BookReview, BookViewCounter, BookWishlistCounter, CacheNamespace, TrendingLandmark, TrendingScore, ViewQueryStats, WishListItem
 from app.forms import BookDetailReviewForm
+from django.http import Http404
+from config.launcher import check_shared_cache, default_workers, warm_up
+from config.db_router import PIN_COOKIE, ReplicaLagMonitor, ReplicaRouter, reset_pin
+from app.invalidation import CATALOG, REVIEWS, ProcessCache, current_versions
+from django.db import connection
+from django.db.models import QuerySet
+from django.core.management import CommandError, call_command
+from io import StringIO
+import csv
+from datetime import timedelta
+from django.conf import settings
+import json
+import tempfile
+from pathlib import Path
+from app.bulk_reviews import import_reviews
+from app.wishlist import remove_books
+from app import trending
+from config.write_behind import WriteBehindCounter, flush_all, flush_due, counters as write_behind_counters
+from users.models import LeaderboardEntry, ProfileViewCounter, ReadingMonth
+from django.utils import timezone
+from config.query_instrumentation import QueryRecorder, QueryStatsBuffer, fingerprint
+from app.management.commands.index_report import analyze_plan
+from django.core.cache import cache
+from django.template import Context, Template
+from app.templatetags.counts import compact_number
+from unittest import mock
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.contrib.messages.storage.cookie import CookieStorage
 
 User = get_user_model()
 
@@ -618,3 +653,1540 @@ class AddBookReviewViewTests(TestCase):
         response = self.client.get(reverse("books:detail", args=[self.book.pk]))
         self.assertContains(response, review.user.username)
         self.assertContains(response, "Excellent read")
+
+
+# ==================== Cache Invalidation Tests ====================
+class CacheInvalidationTests(TestCase):
+    """Test cases for the cross-worker cache invalidation bus."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.user = User.objects.create_user(username="reader", password="testpass123")
+        self.book = Book.objects.create(
+            title="Cached Book", description="Cached", isbn="978-0-4444-4444-4"
+        )
+
+    def test_book_save_bumps_catalog_version(self):
+        """Test that saving a book publishes a catalog invalidation on commit."""
+        before = current_versions(CATALOG)[CATALOG]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book.title = "Renamed"
+            self.book.save()
+        self.assertEqual(current_versions(CATALOG)[CATALOG], before + 1)
+
+    def test_review_save_bumps_reviews_version(self):
+        """Test that writing a review publishes a reviews invalidation."""
+        with self.captureOnCommitCallbacks(execute=True):
+            BookReview.objects.create(
+                user=self.user, book=self.book, content="Nice", stars_given=4
+            )
+        self.assertEqual(CacheNamespace.objects.get(name=REVIEWS).version, 1)
+
+    def test_unknown_namespace_version_is_zero(self):
+        """Test that namespaces never published report version 0."""
+        self.assertEqual(current_versions("missing"), {"missing": 0})
+
+    def test_other_worker_publish_evicts_entries(self):
+        """Test that a worker drops entries invalidated by another worker."""
+        worker_a = ProcessCache(poll_interval=0)
+        worker_b = ProcessCache(poll_interval=0)
+        worker_a.sync()
+        worker_a.set(CATALOG, "key", "stale")
+        self.assertEqual(worker_a.get(CATALOG, "key"), "stale")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Book.objects.create(title="New", description="New", isbn="978-0-4444-4444-5")
+        worker_b.sync()
+
+        self.assertIsNone(worker_a.get(CATALOG, "key"))
+
+    def test_poll_interval_bounds_queries(self):
+        """Test that lookups within the poll interval do not hit the database."""
+        worker = ProcessCache(poll_interval=60)
+        worker.sync()
+        worker.set(REVIEWS, "key", "value")
+        with self.assertNumQueries(0):
+            self.assertEqual(worker.get(REVIEWS, "key"), "value")
+
+    def test_get_or_set_computes_once(self):
+        """Test that get_or_set only calls the factory on a miss."""
+        worker = ProcessCache(poll_interval=60)
+        calls = []
+        for _ in range(3):
+            worker.get_or_set(CATALOG, "key", lambda: calls.append(1) or "value")
+        self.assertEqual(len(calls), 1)
+
+
+# ==================== Replica Router Tests ====================
+class FakeLagMonitor(ReplicaLagMonitor):
+    """Lag monitor returning canned readings instead of querying replicas."""
+
+    def __init__(self, lags, max_lag=2.0):
+        super().__init__(check_interval=60, max_lag=max_lag)
+        self.lags = lags
+
+    def measure(self, alias):
+        return self.lags[alias]
+
+
+class ReplicaRouterTests(TestCase):
+    """Test cases for read-replica routing and primary pinning."""
+
+    def setUp(self):
+        """Set up a router with two replicas."""
+        reset_pin()
+        self.monitor = FakeLagMonitor({"replica_0": 0.1, "replica_1": 0.2})
+        self.router = ReplicaRouter(replicas=["replica_0", "replica_1"], monitor=self.monitor)
+
+    def tearDown(self):
+        reset_pin()
+
+    def test_reads_go_to_replicas(self):
+        """Test that reads are sent to one of the replicas."""
+        self.assertIn(self.router.db_for_read(Book), ["replica_0", "replica_1"])
+
+    def test_writes_go_to_primary(self):
+        """Test that writes always use the default database."""
+        self.assertEqual(self.router.db_for_write(Book), "default")
+
+    def test_reads_after_write_are_pinned(self):
+        """Test that reads following a write in the same request hit the primary."""
+        self.router.db_for_write(Book)
+        self.assertEqual(self.router.db_for_read(Book), "default")
+
+    def test_lagging_replica_is_skipped(self):
+        """Test that a replica over the lag limit stops receiving reads."""
+        self.monitor.lags["replica_0"] = 30.0
+        for _ in range(10):
+            self.assertEqual(self.router.db_for_read(Book), "replica_1")
+
+    def test_all_replicas_lagging_falls_back_to_primary(self):
+        """Test that reads use the primary when no replica is healthy."""
+        self.monitor.lags.update(replica_0=30.0, replica_1=float("inf"))
+        self.assertEqual(self.router.db_for_read(Book), "default")
+
+    def test_lag_readings_are_cached(self):
+        """Test that lag is measured once per check interval."""
+        calls = []
+        self.monitor.measure = lambda alias: calls.append(alias) or 0.0
+        for _ in range(5):
+            self.monitor.lag("replica_0")
+        self.assertEqual(calls, ["replica_0"])
+
+    def test_no_replicas_reads_from_primary(self):
+        """Test that without replicas everything stays on the primary."""
+        self.assertEqual(ReplicaRouter(replicas=[]).db_for_read(Book), "default")
+
+    def test_only_primary_is_migrated(self):
+        """Test that migrations are applied to the primary only."""
+        self.assertTrue(self.router.allow_migrate("default", "app"))
+        self.assertFalse(self.router.allow_migrate("replica_0", "app"))
+
+
+class ReplicaPinningMiddlewareTests(TestCase):
+    """Test cases for the cookie that pins a client to the primary."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.user = User.objects.create_user(username="writer", password="testpass123")
+        self.book = Book.objects.create(
+            title="Pinned Book", description="Pinned", isbn="978-0-5555-5555-5"
+        )
+        self.client.login(username="writer", password="testpass123")
+
+    def test_write_sets_pin_cookie(self):
+        """Test that a request which writes pins the client to the primary."""
+        response = self.client.post(
+            reverse("books:add_review", args=[self.book.pk]),
+            data={"content": "Good", "stars_given": 4},
+        )
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+    def test_read_does_not_set_pin_cookie(self):
+        """Test that a read-only request leaves the client unpinned."""
+        response = self.client.get(reverse("books:detail", args=[self.book.pk]))
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+
+# ==================== Connection Pool Metrics Tests ====================
+class DbPoolStatsViewTests(TestCase):
+    """Test cases for the connection reuse metrics endpoint."""
+
+    def test_requires_staff(self):
+        """Test that non-staff users are redirected to the admin login."""
+        User.objects.create_user(username="plain", password="testpass123")
+        self.client.login(username="plain", password="testpass123")
+        response = self.client.get(reverse("db_pool_stats"))
+        self.assertEqual(response.status_code, 302)
+
+    def test_reports_default_database(self):
+        """Test that staff users get metrics for the default database."""
+        User.objects.create_user(username="staff", password="testpass123", is_staff=True)
+        self.client.login(username="staff", password="testpass123")
+        response = self.client.get(reverse("db_pool_stats"))
+        self.assertEqual(response.status_code, 200)
+        stats = response.json()["default"]
+        self.assertEqual(stats["mode"], "persistent")
+        self.assertIn("connections_opened", stats)
+
+
+# ==================== Async View Tests ====================
+class AsyncViewTests(TestCase):
+    """Test cases for the async catalog views served under ASGI."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.factory = RequestFactory()
+        self.user = User.objects.create_user(username="async", password="testpass123")
+        self.book = Book.objects.create(
+            title="Async Book", description="Awaited", isbn="978-0-6666-6666-6"
+        )
+        for i in range(4):
+            Book.objects.create(
+                title=f"Other {i}", description="Other", isbn=f"978-0-6666-6666-{i}"
+            )
+
+    def request(self, path, user=None):
+        request = self.factory.get(path)
+        request.user = user or AnonymousUser()
+
+        async def auser():
+            return request.user
+
+        request.auser = auser
+        return request
+
+    async def test_books_list_paginates(self):
+        """Test that the async list view returns the requested page."""
+        response = await AsyncBooksView.as_view()(self.request("/books/?page=3"))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Other 3")
+        self.assertNotContains(response, "Async Book")
+
+    async def test_books_list_search(self):
+        """Test that the async list view applies the search query."""
+        response = await AsyncBooksView.as_view()(self.request("/books/?q=Async"))
+        self.assertContains(response, "Async Book")
+        self.assertNotContains(response, "Other 0")
+
+    async def test_logged_in_search_resolves_user_asynchronously(self):
+        """Test that the search rate limit does not load a lazy user inside the event loop."""
+        request = self.factory.get("/books/?q=Async")
+        request.user = SimpleLazyObject(lambda: User.objects.get(pk=self.user.pk))
+
+        async def auser():
+            return await User.objects.aget(pk=self.user.pk)
+
+        request.auser = auser
+        response = await AsyncBooksView.as_view()(request)
+        self.assertContains(response, "Async Book")
+        self.assertEqual(request.user.pk, self.user.pk)
+
+    async def test_books_list_invalid_page(self):
+        """Test that an out-of-range page returns 404."""
+        with self.assertRaises(Http404):
+            await AsyncBooksView.as_view()(self.request("/books/?page=999"))
+
+    async def test_book_detail(self):
+        """Test that the async detail view renders the book and its reviews."""
+        await BookReview.objects.acreate(
+            user=self.user, book=self.book, content="Concurrent read", stars_given=5
+        )
+        response = await AsyncBookDetailView.as_view()(
+            self.request(f"/books/{self.book.pk}/", user=self.user), pk=self.book.pk
+        )
+        self.assertContains(response, "Async Book")
+        self.assertContains(response, "Concurrent read")
+
+    async def test_book_detail_missing(self):
+        """Test that a missing book returns 404."""
+        with self.assertRaises(Http404):
+            await AsyncBookDetailView.as_view()(self.request("/books/9999/"), pk=9999)
+
+
+# ==================== Launcher Tests ====================
+class LauncherTests(TestCase):
+    """Test cases for production worker sizing and warmup."""
+
+    def test_workers_scale_with_cpus(self):
+        """Test that workers follow 2 * CPUs + 1 when memory is plentiful."""
+        self.assertEqual(default_workers(cpus=4, memory_mb=64000, worker_memory_mb=150), 9)
+
+    def test_workers_capped_by_memory(self):
+        """Test that workers are capped by the per-worker memory budget."""
+        self.assertEqual(default_workers(cpus=16, memory_mb=600, worker_memory_mb=150), 4)
+
+    def test_at_least_one_worker(self):
+        """Test that a tiny memory budget still starts one worker."""
+        self.assertEqual(default_workers(cpus=2, memory_mb=50, worker_memory_mb=150), 1)
+
+    def test_several_workers_need_a_shared_cache(self):
+        """Test that more than one worker is refused on a per-process cache."""
+        check_shared_cache(1)
+        with self.assertRaises(RuntimeError):
+            check_shared_cache(2)
+        redis = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": "redis://"}}
+        with override_settings(CACHES=redis):
+            check_shared_cache(4)
+
+    def test_warm_up_loads_urls_and_templates(self):
+        """Test that warmup resolves URLs and compiles the project templates."""
+        stats = warm_up()
+        self.assertGreater(stats["url_names"], 0)
+        self.assertGreater(stats["templates"], 0)
+
+
+# ==================== Query Instrumentation Tests ====================
+class QueryInstrumentationTests(TestCase):
+    """Test cases for sampled SQL instrumentation and N+1 detection."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.books = [
+            Book.objects.create(
+                title=f"Instrumented {i}",
+                description="Description",
+                isbn=f"97800000001{i:02d}",
+                why_read="Because",
+            )
+            for i in range(6)
+        ]
+
+    def test_fingerprint_ignores_values(self):
+        """Test that queries differing only in literals share a fingerprint."""
+        self.assertEqual(
+            fingerprint("SELECT * FROM book WHERE id = 1 AND title = 'a'"),
+            fingerprint("SELECT  * FROM book WHERE id = 42 AND title = 'b''c'"),
+        )
+        self.assertEqual(
+            fingerprint("SELECT * FROM book WHERE id IN (1, 2)"),
+            fingerprint("SELECT * FROM book WHERE id IN (3)"),
+        )
+
+    def test_recorder_detects_repeated_queries(self):
+        """Test that a query run once per row is reported as N+1."""
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            for book in self.books:
+                Book.objects.get(pk=book.pk)
+        self.assertEqual(recorder.count, len(self.books))
+        self.assertEqual(list(recorder.n_plus_one(threshold=5).values()), [len(self.books)])
+        self.assertEqual(recorder.n_plus_one(threshold=10), {})
+
+    @override_settings(SQL_INSTRUMENTATION_SAMPLE_RATE=1.0)
+    def test_middleware_adds_server_timing(self):
+        """Test that sampled requests report database time in Server-Timing."""
+        response = self.client.get(reverse("books:list"))
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response["Server-Timing"], r'^db;dur=[\d.]+;desc="\d+ queries"')
+
+    @override_settings(SQL_INSTRUMENTATION_SAMPLE_RATE=0.0)
+    def test_unsampled_requests_are_untouched(self):
+        """Test that requests outside the sample carry no Server-Timing header."""
+        response = self.client.get(reverse("books:list"))
+        self.assertNotIn("Server-Timing", response)
+
+    def test_flush_accumulates_view_stats(self):
+        """Test that flushing the buffer adds to the hourly per-view row."""
+        buffer = QueryStatsBuffer()
+        for queries in (3, 7):
+            recorder = QueryRecorder()
+            recorder.count = queries
+            recorder.duration = 0.002
+            buffer.add("books:list", recorder, {})
+            buffer.flush()
+
+        stats = ViewQueryStats.objects.get(view_name="books:list")
+        self.assertEqual(stats.requests, 2)
+        self.assertEqual(stats.queries, 10)
+        self.assertEqual(stats.max_queries, 7)
+        self.assertAlmostEqual(stats.db_time_ms, 4.0)
+
+
+# ==================== Benchmark Command Tests ====================
+class BenchCommandTests(TestCase):
+    """Test cases for the seed_bench and bench management commands."""
+
+    def seed(self, **options):
+        counts = {"books": 30, "authors": 5, "users": 12, "reviews": 60, "notifications": 40}
+        counts.update(options)
+        call_command("seed_bench", stdout=StringIO(), verbosity=0, **counts)
+
+    def test_seed_is_reproducible(self):
+        """Test that the same seed produces the same dataset."""
+        self.seed()
+        first = list(BookReview.objects.order_by("user__username", "book__isbn").values_list("book__isbn", "stars_given"))
+        self.seed(reset=True)
+        second = list(BookReview.objects.order_by("user__username", "book__isbn").values_list("book__isbn", "stars_given"))
+        self.assertEqual(first, second)
+        self.assertEqual(Book.objects.count(), 30)
+        self.assertLessEqual(len(first), 60)
+
+    def test_seed_fills_the_rollups(self):
+        """Test that seeding rebuilds the reading stats and leaderboards of the bench users."""
+        self.seed()
+        reviews = BookReview.objects.filter(user__username__startswith="bench_").count()
+        self.assertEqual(sum(ReadingMonth.objects.values_list("reviews", flat=True)), reviews)
+        student_reviews = BookReview.objects.filter(user__role="student").count()
+        self.assertEqual(
+            sum(LeaderboardEntry.objects.filter(period="all").values_list("reviews", flat=True)), student_reviews
+        )
+
+    def test_bench_reports_every_url(self):
+        """Test that bench measures each app URL and emits JSON."""
+        self.seed()
+        out = StringIO()
+        call_command("bench", iterations=2, warmup=0, stdout=out, stderr=StringIO())
+        report = json.loads(out.getvalue())
+        self.assertIn("books:list", report["results"])
+        self.assertIn("notifications:unread_notifications_count", report["results"])
+        self.assertIn("users:logout", report["skipped"])
+        result = report["results"]["books:detail"]
+        self.assertEqual(result["status"], 200)
+        self.assertLessEqual(result["p50_ms"], result["p99_ms"])
+        self.assertGreater(result["queries"], 0)
+
+
+# ==================== Index Report Tests ====================
+class IndexReportTests(TestCase):
+    """Test cases for the EXPLAIN-based index_report command."""
+
+    def test_sqlite_plan_flags_scans_and_sorts(self):
+        """Test that SQLite full scans and temp B-tree sorts are flagged."""
+        plan = "4 0 0 SCAN app_book\n20 0 0 USE TEMP B-TREE FOR ORDER BY"
+        self.assertEqual(analyze_plan("sqlite", plan), ["seq scan on app_book", "sort"])
+
+    def test_sqlite_index_scans_are_not_flagged(self):
+        """Test that index searches and ordered index scans pass."""
+        plan = (
+            "3 0 0 SEARCH app_bookreview USING INDEX review_book_created_idx (book_id=?)\n"
+            "7 0 0 SCAN app_book USING INDEX book_title_idx"
+        )
+        self.assertEqual(analyze_plan("sqlite", plan), [])
+
+    def test_postgres_plan_flags_scans_and_sorts(self):
+        """Test that PostgreSQL Seq Scan and Sort nodes are flagged."""
+        plan = (
+            "Limit  (cost=10.1..10.2 rows=20 width=8)\n"
+            "  ->  Sort  (cost=10.1..10.5 rows=200 width=8)\n"
+            "        Sort Key: title\n"
+            "        ->  Seq Scan on app_book  (cost=0.00..5.00 rows=200 width=8)"
+        )
+        self.assertEqual(analyze_plan("postgresql", plan), ["seq scan on app_book", "sort"])
+
+    def test_report_finds_declared_indexes(self):
+        """Test that the migrated test database has every proposed index."""
+        User.objects.create_user(username="reader", password="pass12345", school_class="5A")
+        Book.objects.create(title="Indexed", description="d", isbn="9781000000999", why_read="w")
+        out = StringIO()
+        call_command("index_report", stdout=out)
+        self.assertIn("books:detail reviews: ok", out.getvalue())
+        self.assertIn("books:wishlist: ok", out.getvalue())
+        self.assertIn("No missing indexes.", out.getvalue())
+
+
+# ==================== Fragment Cache Tests ====================
+class FragmentCacheTests(TestCase):
+    """Test cases for dependency-keyed template fragment caching."""
+
+    TEMPLATE = Template(
+        "{% load fragment_cache %}"
+        '{% prefetch_fragments "card" books %}'
+        '{% for book in books %}{% cachefragment "card" book %}[{{ book.title }}]{% endcachefragment %}{% endfor %}'
+    )
+
+    def setUp(self):
+        cache.clear()
+        self.books = [
+            Book.objects.create(
+                title=f"Cached {i}", description="d", isbn=f"978200000000{i}", why_read="w"
+            )
+            for i in range(3)
+        ]
+
+    def render(self):
+        return self.TEMPLATE.render(Context({"books": self.books}))
+
+    def test_fragments_are_reused(self):
+        """Test that a second render serves the cached fragments."""
+        self.assertEqual(self.render(), "[Cached 0][Cached 1][Cached 2]")
+        self.books[0].title = "Unsaved"
+        self.assertEqual(self.render(), "[Cached 0][Cached 1][Cached 2]")
+
+    def test_save_invalidates_only_that_fragment(self):
+        """Test that saving a row re-renders just its fragment."""
+        self.render()
+        self.books[1].title = "Renamed"
+        self.books[1].save()
+        self.books[2].title = "Unsaved"
+        self.assertEqual(self.render(), "[Cached 0][Renamed][Cached 2]")
+
+    def test_prefetch_avoids_per_fragment_lookups(self):
+        """Test that prefetched fragments are not fetched one by one."""
+        self.render()
+        with mock.patch("app.fragments.get_fragment") as get_fragment:
+            self.render()
+        get_fragment.assert_not_called()
+
+    def test_home_feed_updates_when_review_changes(self):
+        """Test that the home feed shows an edited review right away."""
+        user = User.objects.create_user(username="critic", password="pass12345", school_class="5A")
+        review = BookReview.objects.create(user=user, book=self.books[0], content="First take", stars_given=3)
+        self.assertContains(self.client.get(reverse("home_page")), "First take")
+        review.content = "Second take"
+        review.save()
+        self.assertContains(self.client.get(reverse("home_page")), "Second take")
+
+
+# ==================== Conditional GET Tests ====================
+class ConditionalGetTests(TestCase):
+    """Test cases for ETag / Last-Modified handling on catalog pages."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="etag", password="testpass123")
+        self.book = Book.objects.create(
+            title="Cacheable", description="d", isbn="9783000000001", why_read="w"
+        )
+
+    def revalidate(self, url, response):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+
+    def test_unchanged_catalog_returns_304(self):
+        """Test that an unchanged catalog page is answered with 304."""
+        url = reverse("books:list")
+        response = self.client.get(url)
+        self.assertTrue(response["ETag"].startswith('W/"'))
+        self.assertEqual(self.revalidate(url, response).status_code, 304)
+
+    def test_catalog_change_invalidates_etag(self):
+        """Test that editing a book changes the catalog ETag."""
+        url = reverse("books:list")
+        response = self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book.title = "Renamed"
+            self.book.save()
+        self.assertEqual(self.revalidate(url, response).status_code, 200)
+
+    def test_detail_revalidates_after_review(self):
+        """Test that a new review changes the book page ETag and Last-Modified."""
+        url = reverse("books:detail", args=[self.book.pk])
+        response = self.client.get(url)
+        self.assertIn("Last-Modified", response)
+        self.assertEqual(self.revalidate(url, response).status_code, 304)
+        BookReview.objects.create(user=self.user, book=self.book, content="New", stars_given=4)
+        self.assertEqual(self.revalidate(url, response).status_code, 200)
+
+    def test_etag_depends_on_user(self):
+        """Test that logging in changes the ETag of the same page."""
+        url = reverse("books:detail", args=[self.book.pk])
+        anonymous = self.client.get(url)
+        self.client.force_login(self.user)
+        self.assertEqual(self.revalidate(url, anonymous).status_code, 200)
+
+    def test_missing_book_is_404(self):
+        """Test that a missing book still returns 404."""
+        response = self.client.get(reverse("books:detail", args=[9999]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_landing_page_returns_304(self):
+        """Test that the landing page supports revalidation."""
+        response = self.client.get(reverse("landing_page"))
+        self.assertEqual(self.revalidate(reverse("landing_page"), response).status_code, 304)
+
+    async def test_async_detail_returns_304(self):
+        """Test that the async detail view honours If-None-Match."""
+        view = AsyncBookDetailView.as_view()
+
+        def request(**headers):
+            request = RequestFactory().get(f"/books/{self.book.pk}/", **headers)
+            request.user = AnonymousUser()
+
+            async def auser():
+                return request.user
+
+            request.auser = auser
+            return request
+
+        response = await view(request(), pk=self.book.pk)
+        response = await view(request(HTTP_IF_NONE_MATCH=response["ETag"]), pk=self.book.pk)
+        self.assertEqual(response.status_code, 304)
+
+
+# ==================== Page Cache Tests ====================
+
+
+class PageCacheTests(TestCase):
+    """Test cases for the shared page cache of the public pages."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="shell", password="testpass123")
+        self.book = Book.objects.create(
+            title="Shared Shell", description="d", isbn="9783100000001", why_read="w"
+        )
+        self.detail_url = reverse("books:detail", args=[self.book.pk])
+
+    def test_anonymous_page_is_cached_and_public(self):
+        """Test that a second anonymous request is served from the cache with proxy headers."""
+        url = reverse("books:list")
+        self.assertEqual(self.client.get(url)["X-Page-Cache"], "miss")
+        response = self.client.get(url)
+        self.assertEqual(response["X-Page-Cache"], "hit")
+        self.assertContains(response, "Shared Shell")
+        self.assertIn("public", response["Cache-Control"])
+        self.assertIn("s-maxage=", response["Cache-Control"])
+        self.assertIn("Cookie", response["Vary"])
+
+    def test_query_string_is_normalized(self):
+        """Test that parameter order, empty values and tracking parameters share one entry."""
+        self.client.get(reverse("books:list") + "?q=Shared&page=1")
+        response = self.client.get(reverse("books:list") + "?utm_source=mail&page=1&q=Shared&sort=")
+        self.assertEqual(response["X-Page-Cache"], "hit")
+
+    def test_catalog_change_invalidates_page(self):
+        """Test that saving a book retires the cached list page."""
+        url = reverse("books:list")
+        self.client.get(url)
+        self.book.title = "Renamed Shell"
+        self.book.save()
+        response = self.client.get(url)
+        self.assertEqual(response["X-Page-Cache"], "miss")
+        self.assertContains(response, "Renamed Shell")
+
+    def test_new_review_invalidates_detail_page(self):
+        """Test that a new review appears on a cached book page."""
+        self.client.get(self.detail_url)
+        BookReview.objects.create(user=self.user, book=self.book, content="Fresh take", stars_given=5)
+        self.assertContains(self.client.get(self.detail_url), "Fresh take")
+
+    def test_wishlist_change_retires_only_pages_showing_the_book(self):
+        """Test that a wishlist add retires the pages of that book, not every page."""
+        other = Book.objects.create(title="Other Shell", description="d", isbn="9783100000002", why_read="w")
+        other_url = reverse("books:detail", args=[other.pk])
+        list_url = reverse("books:list") + "?q=Shared"
+        for url in (self.detail_url, other_url, list_url):
+            self.client.get(url)
+        WishListItem.objects.create(user=self.user, book=self.book)
+        self.assertEqual(self.client.get(other_url)["X-Page-Cache"], "hit")
+        response = self.client.get(self.detail_url)
+        self.assertEqual(response["X-Page-Cache"], "miss")
+        self.assertContains(response, "1 reader wants to read this")
+        response = self.client.get(list_url)
+        self.assertEqual(response["X-Page-Cache"], "miss")
+        self.assertContains(response, "1 reader wants to read this")
+
+    def test_authenticated_user_gets_shell_with_own_fragments(self):
+        """Test that a logged-in reader reuses the anonymous shell with their own parts."""
+        WishListItem.objects.create(user=self.user, book=self.book)
+        anonymous = self.client.get(self.detail_url)
+        self.assertNotContains(anonymous, "Remove from wishlist")
+        self.assertNotContains(anonymous, "csrfmiddlewaretoken")
+        self.assertNotIn("csrftoken", anonymous.cookies)
+
+        self.client.force_login(self.user)
+        response = self.client.get(self.detail_url)
+        self.assertEqual(response["X-Page-Cache"], "hit")
+        self.assertContains(response, "Remove from wishlist")
+        self.assertContains(response, "Logout")
+        self.assertContains(response, "csrfmiddlewaretoken")
+        self.assertIn("private", response["Cache-Control"])
+
+        self.client.logout()
+        self.assertNotContains(self.client.get(self.detail_url), "Logout")
+
+    def test_flash_messages_are_private(self):
+        """Test that pending messages are shown and keep the response out of proxies."""
+        self.client.get(reverse("books:list"))
+        request = RequestFactory().get(reverse("books:list"))
+        request.user = AnonymousUser()
+        request._messages = CookieStorage(request)
+        messages.info(request, "Saved for later")
+        response = BooksView.as_view()(request)
+        self.assertEqual(response["X-Page-Cache"], "hit")
+        self.assertContains(response, "Saved for later")
+        self.assertIn("private", response["Cache-Control"])
+
+    def test_uncached_pages_render_fragments_inline(self):
+        """Test that pages outside the page cache still show the navigation."""
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("books:wishlist"))
+        self.assertNotIn("X-Page-Cache", response)
+        self.assertContains(response, "Logout")
+        self.assertNotContains(response, "user-fragment")
+
+    async def test_async_view_uses_page_cache(self):
+        """Test that the async list view shares the page cache."""
+        view = AsyncBooksView.as_view()
+
+        def request():
+            request = RequestFactory().get("/books/")
+            request.user = AnonymousUser()
+
+            async def auser():
+                return request.user
+
+            request.auser = auser
+            return request
+
+        self.assertEqual((await view(request()))["X-Page-Cache"], "miss")
+        response = await view(request())
+        self.assertEqual(response["X-Page-Cache"], "hit")
+        self.assertIn(b"Shared Shell", response.content)
+
+
+# ==================== JSON API Tests ====================
+
+
+class JsonApiTests(TestCase):
+    """Test cases for the versioned JSON API."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="api", password="testpass123")
+        self.author = Author.objects.create(first_name="Api", last_name="Writer")
+        self.books = []
+        for i in range(5):
+            book = Book.objects.create(
+                title=f"Api Book {i % 2}", description="d", isbn=f"978320000000{i}", why_read="w"
+            )
+            BookAuthor.objects.create(book=book, author=self.author)
+            self.books.append(book)
+
+    def get(self, url, **params):
+        response = self.client.get(url, params)
+        return response, response.json()
+
+    def collect(self, url, **params):
+        """Follow ``next`` cursors and return every id seen."""
+        ids, cursor = [], None
+        while True:
+            extra = {"cursor": cursor} if cursor else {}
+            _, data = self.get(url, **params, **extra)
+            ids += [row["id"] for row in data["results"]]
+            cursor = data["next"]
+            if not cursor:
+                return ids
+
+    def test_cursor_pagination_visits_every_book_once(self):
+        """Test that following cursors returns each book exactly once despite equal titles."""
+        ids = self.collect(reverse("api:books"), limit=2)
+        self.assertEqual(sorted(ids), sorted(book.pk for book in self.books))
+
+    def test_sparse_fieldsets(self):
+        """Test that only the requested fields are returned, with related data."""
+        _, data = self.get(reverse("api:book_detail", args=[self.books[0].pk]), fields="title,authors,review_count")
+        self.assertEqual(set(data), {"id", "title", "authors", "review_count"})
+        self.assertEqual(data["authors"][0]["last_name"], "Writer")
+        self.assertEqual(data["review_count"], 0)
+
+    def test_unknown_field_is_400(self):
+        """Test that an unknown field is rejected with a JSON error."""
+        response, data = self.get(reverse("api:books"), fields="title,secret")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("secret", data["error"])
+
+    def test_invalid_cursor_is_400(self):
+        """Test that a tampered cursor is rejected instead of failing the query."""
+        for cursor in ("not-base64!", "WyJ4IiwgIngiXQ"):
+            response, _ = self.get(reverse("api:books"), cursor=cursor)
+            self.assertEqual(response.status_code, 400)
+
+    def test_batch_read_by_ids(self):
+        """Test that ?ids= returns the books in the requested order and lists missing ids."""
+        ids = [self.books[2].pk, 99999, self.books[0].pk]
+        _, data = self.get(reverse("api:books"), ids=",".join(map(str, ids)))
+        self.assertEqual([row["id"] for row in data["results"]], [ids[0], ids[2]])
+        self.assertEqual(data["missing"], [99999])
+
+    def test_batch_read_query_count(self):
+        """Test that a batch read costs the same number of queries for any number of ids."""
+        url = reverse("api:books") + "?ids=" + ",".join(str(book.pk) for book in self.books)
+        # ETag versions, books and authors.
+        with self.assertNumQueries(3):
+            self.client.get(url)
+
+    def test_reviews_are_paginated_newest_first(self):
+        """Test that reviews with the same timestamp are neither skipped nor repeated."""
+        created = timezone.now()
+        users = [User.objects.create_user(username=f"reviewer{i}", password="x") for i in range(5)]
+        for user in users:
+            BookReview.objects.create(user=user, book=self.books[0], content="c", stars_given=3, created_at=created)
+        ids = self.collect(reverse("api:book_reviews", args=[self.books[0].pk]), limit=2)
+        self.assertEqual(ids, sorted(ids, reverse=True))
+        self.assertEqual(len(set(ids)), 5)
+
+    def test_missing_book_is_404(self):
+        """Test that unknown books return a JSON 404."""
+        response, data = self.get(reverse("api:book_detail", args=[99999]))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(data["error"], "Book not found.")
+
+    def test_wishlist_requires_authentication(self):
+        """Test that the wishlist answers 401 instead of redirecting to the login page."""
+        response, _ = self.get(reverse("api:wishlist"))
+        self.assertEqual(response.status_code, 401)
+
+    def test_wishlist_lists_own_books(self):
+        """Test that the wishlist returns the user's books with the time they were added."""
+        WishListItem.objects.create(user=self.user, book=self.books[1])
+        self.client.force_login(self.user)
+        _, data = self.get(reverse("api:wishlist"), fields="title,added_at")
+        self.assertEqual([row["id"] for row in data["results"]], [self.books[1].pk])
+        self.assertIn("added_at", data["results"][0])
+
+    def test_conditional_get(self):
+        """Test that an unchanged list answers 304 and a catalog change does not."""
+        url = reverse("api:books")
+        response = self.client.get(url)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.books[0].title = "Changed"
+            self.books[0].save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 200)
+
+    def test_post_not_allowed(self):
+        """Test that the read-only API rejects POST."""
+        self.assertEqual(self.client.post(reverse("api:books")).status_code, 405)
+
+
+# ==================== Bulk Review Import Tests ====================
+
+
+class BulkReviewImportTests(TestCase):
+    """Test cases for bulk review ingestion."""
+
+    def setUp(self):
+        self.users = [User.objects.create_user(username=f"migrated{i}", password="x") for i in range(3)]
+        self.books = [
+            Book.objects.create(title=f"Imported {i}", description="d", isbn=f"978330000000{i}", why_read="w")
+            for i in range(2)
+        ]
+        BookReview.objects.create(user=self.users[0], book=self.books[0], content="Existing", stars_given=4)
+
+    def row(self, user, book, **extra):
+        return {"username": user.username, "isbn": book.isbn, "stars_given": 5, "content": "Loved it", **extra}
+
+    def test_import_reports_duplicates_and_errors(self):
+        """Test that existing and repeated reviews are duplicates and bad rows are errors."""
+        rows = [
+            self.row(self.users[0], self.books[0]),
+            self.row(self.users[1], self.books[0], created_at="2020-05-01T10:00:00"),
+            self.row(self.users[1], self.books[0]),
+            self.row(self.users[2], self.books[1], stars_given=9),
+            {"username": "nobody", "isbn": self.books[1].isbn, "stars_given": 3, "content": "x"},
+        ]
+        report = import_reviews(rows, batch_size=2)
+        self.assertEqual(report.created, 1)
+        self.assertEqual([line for line, *_ in report.duplicates], [1, 3])
+        self.assertEqual([line for line, _ in report.errors], [4, 5])
+        review = BookReview.objects.get(user=self.users[1], book=self.books[0])
+        self.assertEqual(review.created_at.year, 2020)
+
+    def test_queries_do_not_grow_with_rows(self):
+        """Test that a batch costs a fixed number of queries however many rows it holds."""
+        rows = [self.row(user, book) for user in self.users[1:] for book in self.books]
+        # Users, books, existing reviews, the insert and a read of what it
+        # stored with their savepoint and release, then touching the books, looking up their authors, and
+        # recomputing the reviewers' reading stats (two reads and a replace in
+        # a transaction) and leaderboards (the students, two reads per window
+        # and a replace) once.
+        with self.assertNumQueries(26):
+            report = import_reviews(rows)
+        self.assertEqual(report.created, 4)
+
+    def test_impossible_dates_are_row_errors(self):
+        """Test that a well-formed but impossible created_at is reported, not raised."""
+        report = import_reviews([self.row(self.users[1], self.books[1], created_at="2024-02-30T10:00:00")])
+        self.assertEqual(report.created, 0)
+        self.assertEqual(report.errors, [(1, "Invalid created_at '2024-02-30T10:00:00'.")])
+
+    def test_reviews_written_meanwhile_are_duplicates(self):
+        """Test that rows skipped by the insert are reported as duplicates, not created."""
+        def write_first(reviews, **kwargs):
+            BookReview.objects.create(user=self.users[1], book=self.books[1], content="Mine", stars_given=3)
+            return original(reviews, **kwargs)
+
+        original = BookReview.objects.bulk_create
+        rows = [self.row(self.users[1], self.books[1]), self.row(self.users[2], self.books[1])]
+        with mock.patch.object(BookReview.objects, "bulk_create", side_effect=write_first):
+            report = import_reviews(rows)
+        self.assertEqual(report.created, 1)
+        self.assertEqual([line for line, *_ in report.duplicates], [1])
+        self.assertEqual(BookReview.objects.get(user=self.users[1], book=self.books[1]).content, "Mine")
+
+    def test_import_refreshes_books_once(self):
+        """Test that affected books are touched and the review caches invalidated after the import."""
+        before = Book.objects.get(pk=self.books[1].pk).updated_at
+        version = current_versions(REVIEWS)[REVIEWS]
+        with self.captureOnCommitCallbacks(execute=True):
+            import_reviews([self.row(self.users[1], self.books[1])])
+        self.assertGreater(Book.objects.get(pk=self.books[1].pk).updated_at, before)
+        self.assertEqual(current_versions(REVIEWS)[REVIEWS], version + 1)
+
+    def test_dry_run_inserts_nothing(self):
+        """Test that a dry run reports without writing."""
+        report = import_reviews([self.row(self.users[1], self.books[1])], dry_run=True)
+        self.assertEqual(report.created, 1)
+        self.assertFalse(BookReview.objects.filter(user=self.users[1]).exists())
+
+    def test_import_command_reads_csv(self):
+        """Test that the management command imports a CSV file."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = Path(directory.name) / "reviews.csv"
+        with open(path, "w", newline="") as file:
+            writer = csv.DictWriter(file, ["username", "isbn", "stars_given", "content", "created_at"])
+            writer.writeheader()
+            writer.writerow(self.row(self.users[2], self.books[1], created_at=""))
+            writer.writerow(self.row(self.users[0], self.books[0], created_at=""))
+        out = StringIO()
+        call_command("import_reviews", str(path), stdout=out)
+        self.assertIn("Imported 1 reviews of 1 books; 1 duplicates, 0 errors.", out.getvalue())
+        self.assertIn("line 2: duplicate review", out.getvalue())
+
+    def test_import_command_rejects_json_lines_that_are_not_objects(self):
+        """Test that a JSON lines row that is not an object fails with its line number."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = Path(directory.name) / "reviews.jsonl"
+        path.write_text(json.dumps(self.row(self.users[2], self.books[1])) + "\n[1, 2]\n")
+        with self.assertRaisesMessage(CommandError, f"{path}:2: expected an object"):
+            call_command("import_reviews", str(path), stdout=StringIO())
+
+    def test_endpoint_is_staff_only(self):
+        """Test that only staff can use the import endpoint."""
+        url = reverse("api:reviews_import")
+        body = json.dumps({"reviews": [self.row(self.users[1], self.books[1])]})
+        self.client.force_login(self.users[2])
+        self.assertEqual(self.client.post(url, body, content_type="application/json").status_code, 403)
+
+        staff = User.objects.create_user(username="importer", password="x", is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.post(url, body, content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["created"], 1)
+
+    def test_endpoint_rejects_malformed_body(self):
+        """Test that a body without a reviews list is a 400."""
+        staff = User.objects.create_user(username="importer", password="x", is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.post(reverse("api:reviews_import"), "[]", content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+
+# ==================== Rate Limit Tests ====================
+
+
+class RateLimitTests(TestCase):
+    """Test cases for per-view rate limiting."""
+
+    def setUp(self):
+        cache.clear()
+        local_store.clear()
+        self.factory = RequestFactory()
+        self.user = User.objects.create_user(username="limited", password="testpass123")
+        self.book = Book.objects.create(title="Limited", description="d", isbn="9783500000001", why_read="w")
+
+    def request(self, user=None, ip="10.0.0.1"):
+        request = self.factory.get("/", REMOTE_ADDR=ip)
+        request.user = user or AnonymousUser()
+        return request
+
+    def test_parse_rate(self):
+        """Test that rates accept a unit and an optional multiplier."""
+        self.assertEqual(parse_rate("30/m"), (30, 60))
+        self.assertEqual(parse_rate("100/15m"), (100, 900))
+        with self.assertRaises(ValueError):
+            parse_rate("30 per minute")
+
+    def test_sliding_window_blocks_after_limit(self):
+        """Test that the sliding window allows ``limit`` requests and then asks to wait."""
+        limit = RateLimit("test_window", "3/m")
+        waits = [limit.retry_after(self.request()) for _ in range(4)]
+        self.assertEqual(waits[:3], [0, 0, 0])
+        self.assertGreater(waits[3], 0)
+
+    def test_sliding_window_counts_previous_window(self):
+        """Test that requests from the end of the previous window still count."""
+        store = LocalStore()
+        for _ in range(4):
+            sliding_window(store, "k", 4, 60, 59.0)
+        # One second into the next window almost all of the previous one overlaps.
+        self.assertGreater(sliding_window(store, "k", 4, 60, 61.0), 0)
+        # Near the end of it, little does.
+        self.assertEqual(sliding_window(store, "k", 4, 60, 118.0), 0)
+
+    def test_token_bucket_refills(self):
+        """Test that the token bucket allows a burst and refills over time."""
+        store = LocalStore()
+        self.assertEqual([token_bucket(store, "k", 2, 60, 0.0) for _ in range(2)], [0, 0])
+        self.assertEqual(token_bucket(store, "k", 2, 60, 1.0), 29)
+        self.assertEqual(token_bucket(store, "k", 2, 60, 31.0), 0)
+
+    def test_limits_are_per_client(self):
+        """Test that users and IP addresses have separate budgets."""
+        limit = RateLimit("test_clients", "1/m")
+        self.assertEqual(limit.retry_after(self.request(ip="10.0.0.1")), 0)
+        self.assertEqual(limit.retry_after(self.request(ip="10.0.0.2")), 0)
+        self.assertEqual(limit.retry_after(self.request(user=self.user, ip="10.0.0.1")), 0)
+        self.assertGreater(limit.retry_after(self.request(ip="10.0.0.1")), 0)
+
+    def test_client_ip_behind_trusted_proxies(self):
+        """Test that the client IP is read from the hop the trusted proxies added."""
+        request = self.factory.get("/", REMOTE_ADDR="10.0.0.254", HTTP_X_FORWARDED_FOR="6.6.6.6, 203.0.113.7, 10.0.0.1")
+        self.assertEqual(client_ip(request), "10.0.0.254")
+        with override_settings(RATELIMIT_TRUSTED_PROXIES=2):
+            self.assertEqual(client_ip(request), "203.0.113.7")
+        with override_settings(RATELIMIT_TRUSTED_PROXIES=5):
+            self.assertEqual(client_ip(request), "10.0.0.254")
+
+    def test_falls_back_to_local_store(self):
+        """Test that the limiter keeps counting in-process when the cache fails."""
+        limit = RateLimit("test_fallback", "1/m")
+        with mock.patch.object(CacheStore, "incr", side_effect=ConnectionError), self.assertLogs(
+            "config.ratelimit", "WARNING"
+        ):
+            self.assertEqual(limit.retry_after(self.request()), 0)
+            self.assertGreater(limit.retry_after(self.request()), 0)
+
+    async def test_async_view_counts_without_blocking_cache_calls(self):
+        """Test that an async view is limited through the cache's async methods."""
+        def request():
+            request = self.factory.get("/books/", {"q": "Lim"}, REMOTE_ADDR="10.0.0.9")
+            request.user = AnonymousUser()
+
+            async def auser():
+                return request.user
+
+            request.auser = auser
+            return request
+
+        view = AsyncBooksView.as_view()
+        with mock.patch.object(SEARCH_RATE_LIMIT, "limit", 2), mock.patch.object(
+            CacheStore, "incr"
+        ) as incr, mock.patch.object(CacheStore, "get") as get:
+            statuses = [(await view(request())).status_code for _ in range(3)]
+        self.assertEqual(statuses, [200, 200, 429])
+        incr.assert_not_called()
+        get.assert_not_called()
+
+    def test_search_is_limited_but_browsing_is_not(self):
+        """Test that only catalog searches count against the search budget."""
+        with mock.patch.object(SEARCH_RATE_LIMIT, "limit", 2):
+            for _ in range(3):
+                self.assertEqual(self.client.get(reverse("books:list")).status_code, 200)
+            statuses = [self.client.get(reverse("books:list"), {"q": "Lim"}).status_code for _ in range(3)]
+        self.assertEqual(statuses, [200, 200, 429])
+
+    def test_wishlist_spam_gets_429_with_retry_after(self):
+        """Test that rapid wishlist changes are refused with Retry-After."""
+        self.client.force_login(self.user)
+        url = reverse("books:add_to_wishlist", args=[self.book.pk])
+        responses = [self.client.post(url) for _ in range(11)]
+        self.assertEqual({response.status_code for response in responses[:10]}, {302})
+        self.assertEqual(responses[10].status_code, 429)
+        self.assertIn("Retry-After", responses[10])
+        # Only the first add put the book on the wishlist.
+        self.assertEqual(Notification.objects.get(user=self.user).count, 1)
+
+    @override_settings(RATELIMIT_ENABLED=False)
+    def test_can_be_disabled(self):
+        """Test that RATELIMIT_ENABLED turns every limit off."""
+        limit = RateLimit("test_disabled", "1/m")
+        self.assertEqual([limit.retry_after(self.request()) for _ in range(3)], [0, 0, 0])
+
+
+# ==================== Admin Performance Tests ====================
+
+
+class AdminPerformanceTests(TestCase):
+    """Test cases for the admin on large tables."""
+
+    def setUp(self):
+        self.staff = User.objects.create_superuser(username="admin", password="testpass123", email="a@example.com")
+        self.client.login(username="admin", password="testpass123")
+        self.book = Book.objects.create(title="Busy", description="d", isbn="9783600000001", why_read="w")
+        self.other = Book.objects.create(title="Quiet", description="d", isbn="9783600000002", why_read="w")
+        readers = User.objects.bulk_create(
+            User(username=f"reader{i}", school_class="5A") for i in range(25)
+        )
+        BookReview.objects.bulk_create(
+            BookReview(user=reader, book=self.book, content="ok", stars_given=4) for reader in readers
+        )
+        BookReview.objects.create(user=readers[0], book=self.other, content="fine", stars_given=3)
+
+    def test_review_inline_is_paginated(self):
+        """Test that the book change form shows one page of reviews."""
+        url = reverse("admin:app_book_change", args=[self.book.pk])
+        response = self.client.get(url)
+        formset = response.context["inline_admin_formsets"][1].formset
+        self.assertEqual(len(formset.forms), 20)
+        self.assertContains(response, "bookreview_page=2")
+        response = self.client.get(url, {"bookreview_page": 2, "_changelist_filters": "q=Busy"})
+        self.assertEqual(len(response.context["inline_admin_formsets"][1].formset.forms), 5)
+        self.assertContains(response, "?bookreview_page=1&amp;_changelist_filters=q%3DBusy")
+
+    def test_review_inline_does_not_refetch_books(self):
+        """Test that inline rows do not load their book one query at a time."""
+        with self.assertNoLogs("config.query_instrumentation", "WARNING"):
+            self.client.get(reverse("admin:app_book_change", args=[self.book.pk]))
+
+    def test_review_search_matches_exact_username_or_isbn(self):
+        """Test that review search matches usernames and ISBNs exactly."""
+        url = reverse("admin:app_bookreview_changelist")
+        response = self.client.get(url, {"q": "reader0"})
+        self.assertEqual(response.context["cl"].result_count, 2)
+        response = self.client.get(url, {"q": "9783600000002"})
+        self.assertEqual(response.context["cl"].result_count, 1)
+        response = self.client.get(url, {"q": "reader"})
+        self.assertEqual(response.context["cl"].result_count, 0)
+
+    def test_changelist_skips_full_count(self):
+        """Test that changelists use the estimating paginator without a full count."""
+        response = self.client.get(reverse("admin:app_bookreview_changelist"), {"stars_given": 4})
+        cl = response.context["cl"]
+        self.assertIsInstance(cl.paginator, EstimatedCountPaginator)
+        self.assertIsNone(cl.full_result_count)
+
+    def test_estimate_used_above_threshold(self):
+        """Test that the planner estimate replaces COUNT(*) on big unfiltered tables."""
+        with mock.patch("config.paginator.table_estimate", return_value=2_000_000):
+            with override_settings(PAGINATOR_ESTIMATE_THRESHOLD=1000):
+                paginator = EstimatedCountPaginator(BookReview.objects.order_by("pk"), 100)
+                self.assertEqual(paginator.count, 2_000_000)
+                self.assertTrue(paginator.is_estimated)
+            with override_settings(PAGINATOR_ESTIMATE_THRESHOLD=5_000_000):
+                paginator = EstimatedCountPaginator(BookReview.objects.order_by("pk"), 100)
+                self.assertEqual(paginator.count, 26)
+                self.assertFalse(paginator.is_estimated)
+
+
+# ==================== Estimated Count Tests ====================
+
+
+class EstimatedCountTests(TestCase):
+    """Test cases for estimated and cached paginator counts."""
+
+    def setUp(self):
+        cache.clear()
+        for i in range(3):
+            Book.objects.create(title=f"Counted {i}", description="d", isbn=f"978370000000{i}", why_read="w")
+
+    def test_filtered_estimate_used_above_threshold(self):
+        """Test that the plan estimate is used for filtered querysets above the threshold."""
+        queryset = Book.objects.filter(title__icontains="counted").order_by("pk")
+        with mock.patch("config.paginator.plan_estimate", return_value=1_234_567):
+            with override_settings(PAGINATOR_ESTIMATE_THRESHOLD=1000):
+                paginator = EstimatedCountPaginator(queryset, 10)
+                self.assertEqual(paginator.count, 1_234_567)
+            with override_settings(PAGINATOR_ESTIMATE_THRESHOLD=2_000_000):
+                self.assertEqual(EstimatedCountPaginator(queryset, 10).count, 3)
+
+    def test_plan_estimate_reads_both_explain_shapes(self):
+        """Test that the plan estimate parses EXPLAIN output as psycopg 2 and 3 return it."""
+        queryset = Book.objects.filter(title__icontains="counted")
+        plan = {"Plan": {"Node Type": "Seq Scan", "Plan Rows": 4321}}
+        for explained in (json.dumps(plan), json.dumps([plan])):
+            with mock.patch.object(connection, "vendor", "postgresql"), mock.patch.object(
+                QuerySet, "explain", return_value=explained
+            ):
+                self.assertEqual(plan_estimate(queryset), 4321)
+
+    def test_cached_count_keyed_by_version(self):
+        """Test that cached counts are reused until their version changes."""
+        queryset = Book.objects.order_by("pk")
+        self.assertEqual(EstimatedCountPaginator(queryset, 10, cache_timeout=60, cache_version="a").count, 3)
+        Book.objects.create(title="Counted 3", description="d", isbn="9783700000003", why_read="w")
+        with self.assertNumQueries(0):
+            self.assertEqual(EstimatedCountPaginator(queryset, 10, cache_timeout=60, cache_version="a").count, 3)
+        self.assertEqual(EstimatedCountPaginator(queryset, 10, cache_timeout=60, cache_version="b").count, 4)
+
+    def test_compact_number_moves_to_the_next_unit_when_rounding_up(self):
+        """Test that values rounding to a thousand of one unit use the next unit."""
+        self.assertEqual(compact_number(999), "999")
+        self.assertEqual(compact_number(999_949), "999.9K")
+        self.assertEqual(compact_number(999_950), "1M")
+        self.assertEqual(compact_number(999_950_000), "1B")
+        self.assertEqual(compact_number(1_234_567), "1.2M")
+
+    def test_result_count_filter(self):
+        """Test that result_count shows exact counts plainly and estimates approximately."""
+        template = Template("{% load counts %}{{ paginator|result_count }}")
+        paginator = EstimatedCountPaginator(Book.objects.order_by("pk"), 10)
+        self.assertEqual(template.render(Context({"paginator": paginator})), "3 results")
+        paginator = EstimatedCountPaginator(Book.objects.order_by("pk"), 10)
+        paginator.is_estimated = True
+        paginator.count = 1_234_567
+        self.assertEqual(template.render(Context({"paginator": paginator})), "about 1.2M results")
+
+    def test_books_list_shows_count_and_cache_follows_catalog(self):
+        """Test that the catalog shows its result count and recounts after a catalog change."""
+        response = self.client.get(reverse("books:list"))
+        self.assertContains(response, "3 results")
+        Book.objects.create(title="Counted 3", description="d", isbn="9783700000003", why_read="w")
+        response = self.client.get(reverse("books:list"))
+        self.assertContains(response, "4 results")
+
+    def test_notifications_list_is_paginated(self):
+        """Test that the notifications list shows one page at a time."""
+        user = User.objects.create_user(username="notified", password="testpass123")
+        Notification.objects.bulk_create(Notification(user=user, message=f"n{i}") for i in range(25))
+        self.client.login(username="notified", password="testpass123")
+        response = self.client.get(reverse("notifications:notifications_list"))
+        self.assertEqual(len(response.context["notifications"]), 20)
+        self.assertContains(response, "25 notifications")
+
+
+# ==================== Author Stats Tests ====================
+
+
+class AuthorStatsTests(TestCase):
+    """Test cases for the precomputed author aggregates and author pages."""
+
+    def setUp(self):
+        cache.clear()
+        self.author = Author.objects.create(first_name="Leo", last_name="Tolstoy")
+        self.coauthor = Author.objects.create(first_name="Sofia", last_name="Tolstaya")
+        self.books = [
+            Book.objects.create(title=f"Volume {i}", description="d", isbn=f"978380000000{i}", why_read="w")
+            for i in range(3)
+        ]
+        for book in self.books:
+            BookAuthor.objects.create(book=book, author=self.author)
+        BookAuthor.objects.create(book=self.books[0], author=self.coauthor)
+        self.readers = [User.objects.create_user(username=f"fan{i}", password="testpass123") for i in range(3)]
+
+    def assertStats(self, author, books, reviews, stars):
+        stats = AuthorStats.objects.get(author=author)
+        self.assertEqual((stats.book_count, stats.review_count, stats.rating_sum), (books, reviews, stars))
+
+    def test_reviews_update_stats_incrementally(self):
+        """Test that creating, editing and deleting reviews adjusts author stats."""
+        review = BookReview.objects.create(user=self.readers[0], book=self.books[0], content="x", stars_given=5)
+        BookReview.objects.create(user=self.readers[1], book=self.books[1], content="x", stars_given=3)
+        self.assertStats(self.author, 3, 2, 8)
+        self.assertStats(self.coauthor, 1, 1, 5)
+        review.stars_given = 1
+        review.save()
+        self.assertStats(self.author, 3, 2, 4)
+        review.delete()
+        self.assertStats(self.author, 3, 1, 3)
+        self.assertStats(self.coauthor, 1, 0, 0)
+
+    def test_book_author_changes_and_rebuild(self):
+        """Test that relinking books recounts authors and rebuild matches."""
+        BookReview.objects.create(user=self.readers[0], book=self.books[2], content="x", stars_given=4)
+        link = BookAuthor.objects.get(book=self.books[2], author=self.author)
+        link.author = self.coauthor
+        link.save()
+        self.assertStats(self.author, 2, 0, 0)
+        self.assertStats(self.coauthor, 2, 1, 4)
+        AuthorStats.objects.all().delete()
+        call_command("rebuild_author_stats", stdout=StringIO())
+        self.assertStats(self.author, 2, 0, 0)
+        self.assertStats(self.coauthor, 2, 1, 4)
+        with self.captureOnCommitCallbacks(execute=True):
+            link.delete()
+        self.assertStats(self.coauthor, 1, 0, 0)
+
+    def test_bulk_import_rebuilds_stats(self):
+        """Test that bulk imported reviews reach the author stats."""
+        rows = [
+            {"username": reader.username, "isbn": self.books[0].isbn, "stars_given": 2, "content": "ok"}
+            for reader in self.readers
+        ]
+        import_reviews(rows)
+        self.assertStats(self.author, 3, 3, 6)
+        self.assertStats(self.coauthor, 1, 3, 6)
+
+    def test_author_pages(self):
+        """Test that the author index and page show stats and a cursor-paginated bibliography."""
+        BookReview.objects.create(user=self.readers[0], book=self.books[0], content="x", stars_given=4)
+        response = self.client.get(reverse("authors:list"), {"sort": "popular"})
+        self.assertContains(response, "Leo Tolstoy")
+        self.assertContains(response, "3 books")
+
+        with mock.patch("app.views.AuthorDetailView.books_per_page", 2):
+            url = reverse("authors:detail", args=[self.author.pk])
+            response = self.client.get(url)
+            self.assertEqual([book.title for book in response.context["books"]], ["Volume 0", "Volume 1"])
+            self.assertContains(response, "4.0 average")
+            response = self.client.get(url, {"after": response.context["next_cursor"]})
+            self.assertEqual([book.title for book in response.context["books"]], ["Volume 2"])
+            self.assertIsNone(response.context["next_cursor"])
+            self.assertEqual(self.client.get(url, {"after": "garbage"}).status_code, 404)
+
+
+# ==================== Wishlist Tests ====================
+
+
+class WishlistTests(TestCase):
+    """Test cases for wishlist management and the per-book counters."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="wisher", password="testpass123")
+        self.other = User.objects.create_user(username="other", password="testpass123")
+        self.books = [
+            Book.objects.create(title=f"Wanted {i}", description="d", isbn=f"978390000000{i}", why_read="w")
+            for i in range(4)
+        ]
+        self.client.login(username="wisher", password="testpass123")
+
+    def count(self, book):
+        counter = BookWishlistCounter.objects.filter(book=book).first()
+        return counter.count if counter else 0
+
+    def test_single_add_and_remove_require_post(self):
+        """Test that wishlist changes are POST only and move the counter."""
+        book = self.books[0]
+        self.assertEqual(self.client.get(reverse("books:add_to_wishlist", args=[book.pk])).status_code, 405)
+        self.client.post(reverse("books:add_to_wishlist", args=[book.pk]))
+        self.client.post(reverse("books:add_to_wishlist", args=[book.pk]))
+        WishListItem.objects.create(user=self.other, book=book)
+        self.assertEqual(self.count(book), 2)
+        self.client.post(reverse("books:remove_from_wishlist", args=[book.pk]))
+        self.assertEqual(self.count(book), 1)
+
+    def test_bulk_add_and_remove(self):
+        """Test that bulk changes skip duplicates and update counters in a fixed number of queries."""
+        WishListItem.objects.create(user=self.user, book=self.books[0])
+        url = reverse("books:wishlist_bulk")
+        self.client.post(url, {"action": "add", "book": [book.pk for book in self.books] + [999999]})
+        self.assertEqual(WishListItem.objects.filter(user=self.user).count(), 4)
+        self.assertEqual([self.count(book) for book in self.books], [1, 1, 1, 1])
+
+        # Books, the savepoint, the items, their delete, one counter update,
+        # the reading stats row and its update, one leaderboard update and the
+        # release, however many books are removed.
+        with self.assertNumQueries(9):
+            removed = remove_books(self.user, [book.pk for book in self.books[:3]])
+        self.assertEqual(len(removed), 3)
+        self.assertEqual([self.count(book) for book in self.books], [0, 0, 0, 1])
+        response = self.client.post(url, {"action": "drop", "book": [self.books[3].pk]})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.count(self.books[3]), 1)
+
+    def test_deleting_book_or_user_keeps_counters_consistent(self):
+        """Test that cascades decrement counters without recreating deleted rows."""
+        WishListItem.objects.create(user=self.user, book=self.books[0])
+        WishListItem.objects.create(user=self.other, book=self.books[0])
+        self.books[0].delete()
+        self.assertFalse(BookWishlistCounter.objects.exists())
+        WishListItem.objects.create(user=self.other, book=self.books[1])
+        self.other.delete()
+        self.assertEqual(self.count(self.books[1]), 0)
+
+    def test_wishlist_page_is_ordered_and_paginated(self):
+        """Test that the wishlist lists newest items first with their authors."""
+        author = Author.objects.create(first_name="Ann", last_name="Author")
+        BookAuthor.objects.create(book=self.books[0], author=author)
+        for book in self.books:
+            WishListItem.objects.create(user=self.user, book=book)
+        with mock.patch("app.views.WishlistView.paginate_by", 3):
+            response = self.client.get(reverse("books:wishlist"))
+        self.assertEqual([item.book for item in response.context["items"]], self.books[:0:-1])
+        self.assertTrue(response.context["is_paginated"])
+        self.assertContains(response, "4 books")
+
+    def test_cards_show_counter_and_rebuild(self):
+        """Test that cards show the counter and rebuild repairs drift."""
+        WishListItem.objects.create(user=self.other, book=self.books[0])
+        self.assertContains(self.client.get(reverse("books:detail", args=[self.books[0].pk])), "1 reader wants to read this")
+        BookWishlistCounter.objects.update(count=7)
+        call_command("rebuild_wishlist_counts", stdout=StringIO())
+        self.assertEqual(self.count(self.books[0]), 1)
+        WishListItem.objects.create(user=self.user, book=self.books[0])
+        self.assertContains(self.client.get(reverse("books:list")), "2 readers want to read this")
+
+
+# ==================== Trending Tests ====================
+
+
+class TrendingTests(TestCase):
+    """Test cases for the time-decayed trending rankings."""
+
+    def setUp(self):
+        cache.clear()
+        self.reader = User.objects.create_user(username="reader", password="testpass123", school_class="10A")
+        self.books = [
+            Book.objects.create(title=f"Trend {i}", description="d", isbn=f"978391000000{i}", why_read="w")
+            for i in range(3)
+        ]
+
+    def ranked(self, scope=trending.GLOBAL):
+        return list(TrendingScore.objects.filter(scope=scope).order_by("-score").values_list("book_id", flat=True))
+
+    def test_recent_events_outrank_older_ones(self):
+        """Test that an event one half-life old counts half as much as a fresh one."""
+        now = timezone.now()
+        half_life = timedelta(hours=settings.TRENDING_HALF_LIFE_HOURS)
+        trending.record(self.books[0].pk, "review", at=now - half_life)
+        trending.record(self.books[0].pk, "review", at=now - half_life)
+        trending.record(self.books[1].pk, "review", at=now)
+        trending.record(self.books[1].pk, "view", at=now)
+        scores = dict(TrendingScore.objects.values_list("book_id", "score"))
+        base = trending.weight_at(1, now, trending.landmark())
+        self.assertAlmostEqual(scores[self.books[0].pk] / base, 5.0)
+        self.assertAlmostEqual(scores[self.books[1].pk] / base, 5.5)
+        self.assertEqual(self.ranked(), [self.books[1].pk, self.books[0].pk])
+
+    def test_events_count_in_the_users_class(self):
+        """Test that reviews and wishlist adds feed the global and class rankings."""
+        BookReview.objects.create(user=self.reader, book=self.books[2], content="Good", stars_given=4)
+        WishListItem.objects.create(user=self.reader, book=self.books[1])
+        self.assertEqual(self.ranked(trending.class_scope("10A")), [self.books[2].pk, self.books[1].pk])
+        self.assertEqual(self.ranked(), [self.books[2].pk, self.books[1].pk])
+        scope, ranking = trending.top_for(self.reader)
+        self.assertEqual(scope, "class:10A")
+        self.assertEqual([book["id"] for book in ranking["books"]], [self.books[2].pk, self.books[1].pk])
+        other = User.objects.create_user(username="other", password="testpass123", school_class="9B")
+        self.assertEqual(trending.top_for(other)[0], trending.GLOBAL)
+
+    @override_settings(TRENDING_REBASE_DAYS=1)
+    def test_decay_rebases_and_prunes_without_reordering(self):
+        """Test that rebasing keeps the order and drops negligible scores."""
+        now = timezone.now()
+        trending.record(self.books[0].pk, "review", at=now)
+        trending.record(self.books[1].pk, "wishlist", at=now)
+        trending.record(self.books[2].pk, "view", at=now - timedelta(days=60))
+        later = trending.landmark() + timedelta(days=1)
+        before = self.ranked()[:2]
+        with self.captureOnCommitCallbacks(execute=True):
+            dropped = trending.decay(now=later)
+        self.assertEqual(dropped, 1)
+        self.assertEqual(self.ranked(), before)
+        self.assertEqual(trending.landmark(), later)
+        self.assertLess(TrendingScore.objects.order_by("-score").first().score, 5.0)
+
+    def test_writes_use_a_landmark_moved_by_another_process(self):
+        """Test that events are weighted against the stored landmark, not a stale cached copy."""
+        stale = trending.landmark()
+        TrendingLandmark.objects.update(at=stale + timedelta(days=30))
+        self.assertEqual(cache.get(trending.LANDMARK_KEY), stale)
+        now = timezone.now()
+        trending.record(self.books[0].pk, "review", at=now)
+        score = TrendingScore.objects.get(scope=trending.GLOBAL, book=self.books[0]).score
+        self.assertAlmostEqual(score, trending.weight_at(5.0, now, stale + timedelta(days=30)))
+
+    def test_top_is_cached_and_shown(self):
+        """Test that the ranking is served from the cache on the landing and book pages."""
+        trending.record(self.books[0].pk, "review")
+        self.assertEqual(trending.top()["books"][0]["title"], "Trend 0")
+        trending.record(self.books[1].pk, "review", count=3)
+        with self.assertNumQueries(0):
+            self.assertEqual(trending.top()["books"][0]["title"], "Trend 0")
+        self.assertContains(self.client.get(reverse("landing_page")), "Trending this week")
+        self.assertContains(self.client.get(reverse("books:list")), "Trend 0")
+
+    def test_rebuild_command_recomputes_scores(self):
+        """Test that decay_trending --rebuild recomputes scores from stored events."""
+        BookReview.objects.create(user=self.reader, book=self.books[0], content="Good", stars_given=4)
+        TrendingScore.objects.all().delete()
+        call_command("decay_trending", "--rebuild", stdout=StringIO())
+        self.assertEqual(self.ranked(), [self.books[0].pk])
+        self.assertEqual(self.ranked(trending.class_scope("10A")), [self.books[0].pk])
+
+
+# ==================== Page View Counter Tests ====================
+
+
+@override_settings(WRITE_BEHIND_FLUSH_INTERVAL=3600.0, WRITE_BEHIND_FLUSH_EVENTS=1000)
+class PageViewCounterTests(TestCase):
+    """Test cases for the write-behind page-view counters."""
+
+    def setUp(self):
+        cache.clear()
+        flush_all()
+        self.reader = User.objects.create_user(username="viewer", password="testpass123", school_class="7B")
+        self.book = Book.objects.create(title="Viewed", description="d", isbn="9783920000001", why_read="w")
+        self.client.login(username="viewer", password="testpass123")
+
+    def views(self, book):
+        counter = BookViewCounter.objects.filter(book=book).first()
+        return counter.count if counter else 0
+
+    def test_views_are_buffered_until_flushed(self):
+        """Test that views only reach the database when the buffer is flushed."""
+        url = reverse("books:detail", args=[self.book.pk])
+        for _ in range(3):
+            self.client.get(url)
+        self.assertEqual(self.views(self.book), 0)
+        flush_all()
+        self.assertEqual(self.views(self.book), 3)
+        self.assertEqual(
+            list(TrendingScore.objects.filter(book=self.book).values_list("scope", flat=True).order_by("scope")),
+            ["class:7B", "global"],
+        )
+
+    def test_flush_after_enough_events(self):
+        """Test that reaching the event threshold flushes with one counter update."""
+        other = Book.objects.create(title="Other", description="d", isbn="9783920000002", why_read="w")
+        with override_settings(WRITE_BEHIND_FLUSH_EVENTS=3):
+            self.client.get(reverse("books:detail", args=[self.book.pk]))
+            self.client.get(reverse("books:detail", args=[other.pk]))
+            self.client.get(reverse("books:detail", args=[self.book.pk]))
+        self.assertEqual((self.views(self.book), self.views(other)), (2, 1))
+
+    @override_settings(WRITE_BEHIND_FLUSH_EVENTS=1)
+    def test_flush_does_not_pin_the_reader(self):
+        """Test that flushing during a read leaves the client unpinned."""
+        response = self.client.get(reverse("books:detail", args=[self.book.pk]))
+        self.assertEqual(self.views(self.book), 1)
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_deleted_books_and_missing_pages_are_skipped(self):
+        """Test that 404s are not counted and views of deleted books are dropped."""
+        self.client.get(reverse("books:detail", args=[999999]))
+        self.client.get(reverse("books:detail", args=[self.book.pk]))
+        self.book.delete()
+        flush_all()
+        self.assertFalse(BookViewCounter.objects.exists())
+        self.assertFalse(TrendingScore.objects.exists())
+
+    async def test_async_detail_counts_views(self):
+        """Test that the async detail view counts views as well."""
+        request = RequestFactory().get(f"/books/{self.book.pk}/")
+        request.user = AnonymousUser()
+
+        async def auser():
+            return request.user
+
+        request.auser = auser
+        await AsyncBookDetailView.as_view()(request, pk=self.book.pk)
+        await sync_to_async(flush_all)()
+        self.assertEqual((await BookViewCounter.objects.aget(book=self.book)).count, 1)
+
+    def test_profile_views_exclude_own_profile(self):
+        """Test that profile views by others are counted and self-views are not."""
+        other = User.objects.create_user(username="viewed", password="testpass123", school_class="7B")
+        self.client.get(reverse("users:user_profile", args=[other.pk]))
+        self.client.get(reverse("users:user_profile", args=[self.reader.pk]))
+        flush_all()
+        self.assertEqual(ProfileViewCounter.objects.get(user=other).count, 1)
+        self.assertFalse(ProfileViewCounter.objects.filter(user=self.reader).exists())
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(reverse("users:profile")).context["profile_views"], 1)
+
+    def test_idle_counters_are_flushed_once_due(self):
+        """Test that pending counts are flushed after the interval without a new event."""
+        write = mock.Mock()
+        counter = WriteBehindCounter("idle", write)
+        try:
+            counter.add("key")
+            flush_due()
+            write.assert_not_called()
+            with override_settings(WRITE_BEHIND_FLUSH_INTERVAL=0.0):
+                flush_due()
+            write.assert_called_once_with({"key": 1})
+        finally:
+            write_behind_counters.remove(counter)
+
+    def test_failed_flush_does_not_fail_the_request(self):
+        """Test that a database error while flushing is logged and dropped."""
+        counter = WriteBehindCounter("test", mock.Mock(side_effect=RuntimeError("down")))
+        try:
+            counter.add("key")
+            with self.assertLogs("config.write_behind", "ERROR"):
+                self.assertEqual(counter.flush(), 0)
+        finally:
+            write_behind_counters.remove(counter)
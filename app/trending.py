@@ -0,0 +1,206 @@
+"""Time-decayed "trending" rankings maintained as events arrive.
+
+An event (a review, a wishlist add, a page view) of weight ``w`` at time
+``t`` is worth ``w * exp(-λ * (now - t))`` now, with ``λ`` set by
+``TRENDING_HALF_LIFE_HOURS``. Since every score shares the ``exp(-λ * now)``
+factor, each ``TrendingScore`` instead stores ``Σ w * exp(λ * (t - T0))``
+for a fixed landmark ``T0``. An event only adds its own term, and sorting
+by the stored score sorts by the decayed one, so the ranking is an index
+scan on ``(scope, -score)`` and nothing is rescanned per request.
+
+``decay`` is the periodic pass (the ``decay_trending`` command). It drops
+rows whose decayed score has become negligible and, once the landmark is
+``TRENDING_REBASE_DAYS`` old, moves it to now and scales every score down to
+match, so the stored numbers never overflow. Writes read the landmark from
+its row, so no worker keeps weighting events against a retired one. An event
+recorded while a rebase commits can still be weighted against the old
+landmark; that inflates one event by at most the factor the pass applied.
+
+Every event counts in the global scope and in the acting user's school
+class. ``top(scope)`` serves the best books of a scope from the cache,
+recomputing at most every ``TRENDING_CACHE_TIMEOUT`` seconds.
+"""
+
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Q, Value, When
+from django.utils import timezone
+
+from app.models import BookReview, TrendingLandmark, TrendingScore, WishListItem
+
+GLOBAL = "global"
+WEIGHTS = {"review": 5.0, "wishlist": 3.0, "view": 0.5}
+# Scores worth less than this today are dropped by ``decay``.
+MIN_SCORE = 0.01
+# Rows per scores UPDATE.
+CHUNK = 500
+LANDMARK_KEY = "trending:landmark"
+# Seconds a process may rank with a copy of the landmark; writes re-read it.
+LANDMARK_TIMEOUT = 60
+
+
+def decay_rate():
+    return math.log(2) / (settings.TRENDING_HALF_LIFE_HOURS * 3600)
+
+
+def class_scope(school_class):
+    return f"class:{school_class}"
+
+
+def scopes_for(user):
+    scopes = [GLOBAL]
+    if user is not None and getattr(user, "school_class", ""):
+        scopes.append(class_scope(user.school_class))
+    return scopes
+
+
+def landmark(fresh=False):
+    """The landmark scores are relative to, created on first use.
+
+    ``decay`` in another process can move it at any time, and an event
+    weighted against a stale landmark is inflated by the whole rebase, so
+    writers pass ``fresh`` to read the row. Readers only use it to key the
+    cached rankings and accept a copy up to ``LANDMARK_TIMEOUT`` seconds old.
+    """
+    at = None if fresh else cache.get(LANDMARK_KEY)
+    if at is None:
+        row = TrendingLandmark.objects.order_by("pk").first()
+        if row is None:
+            row = TrendingLandmark.objects.create(at=timezone.now())
+        at = row.at
+        cache.set(LANDMARK_KEY, at, LANDMARK_TIMEOUT)
+    return at
+
+
+def weight_at(weight, at, base):
+    """``weight`` at time ``at`` in units of the landmark ``base``."""
+    return weight * math.exp(decay_rate() * (at - base).total_seconds())
+
+
+def add_scores(increments):
+    """Add ``{(scope, book_id): amount}`` to the stored scores.
+
+    Two queries per ``CHUNK`` rows: create the missing rows, then add every
+    amount in one ``UPDATE ... SET score = score + CASE ...``.
+    """
+    items = [(key, amount) for key, amount in increments.items() if amount]
+    for start in range(0, len(items), CHUNK):
+        add_chunk(items[start:start + CHUNK])
+
+
+def add_chunk(items):
+    with transaction.atomic():
+        TrendingScore.objects.bulk_create(
+            [TrendingScore(scope=scope, book_id=book_id) for (scope, book_id), _ in items],
+            ignore_conflicts=True,
+        )
+        matches = [(Q(scope=scope, book_id=book_id), amount) for (scope, book_id), amount in items]
+        condition = Q()
+        for match, _ in matches:
+            condition |= match
+        amounts = Case(*(When(match, then=Value(amount)) for match, amount in matches), output_field=FloatField())
+        TrendingScore.objects.filter(condition).update(score=F("score") + amounts)
+
+
+def record(book_id, kind, user=None, at=None, count=1):
+    """Count ``count`` events of ``kind`` on ``book_id`` by ``user``."""
+    amount = count * weight_at(WEIGHTS[kind], at or timezone.now(), landmark(fresh=True))
+    add_scores({(scope, book_id): amount for scope in scopes_for(user)})
+
+
+def record_many(events):
+    """Count ``(book_id, kind, school_class or "", at, count)`` events at once."""
+    base = landmark(fresh=True)
+    increments = defaultdict(float)
+    for book_id, kind, school_class, at, count in events:
+        amount = count * weight_at(WEIGHTS[kind], at, base)
+        increments[(GLOBAL, book_id)] += amount
+        if school_class:
+            increments[(class_scope(school_class), book_id)] += amount
+    add_scores(increments)
+
+
+def top_key(scope):
+    # A rebuild moves the landmark, which retires every cached ranking.
+    return f"trending:top:{landmark().timestamp()}:{scope}"
+
+
+def top(scope=GLOBAL):
+    """``{"computed_at": ..., "books": [{"id", "title", "cover"}]}`` for ``scope``."""
+    entry = cache.get(top_key(scope))
+    if entry is None:
+        rows = (
+            TrendingScore.objects.filter(scope=scope)
+            .order_by("-score")
+            .values("book_id", "book__title", "book__cover_picture")[: settings.TRENDING_TOP_N]
+        )
+        entry = {
+            "computed_at": timezone.now().isoformat(),
+            "books": [
+                {"id": row["book_id"], "title": row["book__title"], "cover": row["book__cover_picture"]}
+                for row in rows
+            ],
+        }
+        cache.set(top_key(scope), entry, settings.TRENDING_CACHE_TIMEOUT)
+    return entry
+
+
+def top_for(user):
+    """``(scope, entry)`` for ``user``'s class, or the global ranking if the
+    class has none yet.
+    """
+    scopes = scopes_for(user if user is not None and user.is_authenticated else None)
+    for scope in reversed(scopes):
+        entry = top(scope)
+        if entry["books"] or scope == GLOBAL:
+            return scope, entry
+
+
+def decay(now=None):
+    """Drop negligible scores and rebase an old landmark; returns rows dropped."""
+    now = now or timezone.now()
+    with transaction.atomic():
+        row = TrendingLandmark.objects.select_for_update().order_by("pk").first()
+        if row is None:
+            TrendingLandmark.objects.create(at=now)
+            cache.set(LANDMARK_KEY, now, LANDMARK_TIMEOUT)
+            return 0
+        # What a stored score of 1 is worth now.
+        factor = math.exp(-decay_rate() * (now - row.at).total_seconds())
+        dropped, _ = TrendingScore.objects.filter(score__lt=MIN_SCORE / factor).delete()
+        if now - row.at >= timedelta(days=settings.TRENDING_REBASE_DAYS):
+            TrendingScore.objects.update(score=F("score") * factor)
+            row.at = now
+            row.save(update_fields=["at"])
+            transaction.on_commit(lambda: cache.set(LANDMARK_KEY, now, LANDMARK_TIMEOUT))
+    return dropped
+
+
+def rebuild(days=None):
+    """Recompute every score from the reviews and wishlist adds of the last
+    ``days`` days. Page views are not stored per event, so they start over.
+    """
+    now = timezone.now()
+    since = now - timedelta(days=days or settings.TRENDING_REBUILD_DAYS)
+    with transaction.atomic():
+        TrendingScore.objects.all().delete()
+        TrendingLandmark.objects.all().delete()
+        TrendingLandmark.objects.create(at=now)
+        cache.set(LANDMARK_KEY, now, LANDMARK_TIMEOUT)
+        reviews = (
+            BookReview.objects.filter(created_at__gte=since)
+            .values_list("book_id", "user__school_class", "created_at")
+            .iterator(chunk_size=2000)
+        )
+        record_many((book_id, "review", school_class, at, 1) for book_id, school_class, at in reviews)
+        adds = (
+            WishListItem.objects.filter(added_at__gte=since)
+            .values_list("book_id", "user__school_class", "added_at")
+            .iterator(chunk_size=2000)
+        )
+        record_many((book_id, "wishlist", school_class, at, 1) for book_id, school_class, at in adds)
@@ -1,7 +1,22 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
 from django.views.generic import ListView, DetailView
-from django.db.models import Q, Avg, Count
-from app.models import Book, BookAuthor, BookReview, WishListItem
-from django.core.paginator import Paginator
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q, Avg, Count, Exists, Max, OuterRef, Prefetch
+from django.utils.decorators import method_decorator
+from app.conditional import conditional, etag_for
+from app.invalidation import CATALOG, REVIEWS, WISHLISTS, current_versions
+from app import page_cache, trending
+from app.page_cache import cache_page_shell, register_fragment
+from app.page_views import counts_book_views
+from config.paginator import EstimatedCountPaginator
+from config.ratelimit import RateLimitMixin, ratelimit
+from app.cursors import after, decode_cursor, encode_cursor
+from app.models import Author, Book, BookAuthor, BookReview, WishListItem
+from app.wishlist import MAX_BULK, add_books, remove_books
+from django.conf import settings
+from django.core.paginator import InvalidPage, Page
 from app.forms import BookDetailReviewForm
 from django.shortcuts import get_object_or_404, redirect, render
 from django.views import View
@@ -12,33 +27,147 @@ from django.http import Http404
 from users.models import CustomUser
 from django.shortcuts import get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.http import require_POST
 from django.contrib import messages
 from app.models import Book, WishListItem
-from notifications.models import Notification
+from notifications import fanout
+
+
+def search_books(q):
+    """Return books optionally filtered by a search query.
+
+    Supports searching by title, description, isbn and author name. Also
+    orders the queryset by title to make pagination deterministic.
+    """
+    qs = Book.objects.select_related("wishlist_counter").order_by("title")
+    if q:
+        qs = qs.filter(
+            Q(title__icontains=q)
+            | Q(description__icontains=q)
+            | Q(isbn__icontains=q)
+            | Q(bookauthor__author__first_name__icontains=q)
+            | Q(bookauthor__author__last_name__icontains=q)
+        ).distinct()
+    return qs
+
+
+async def alist(queryset):
+    """Evaluate a queryset with the async ORM API."""
+    return [obj async for obj in queryset]
+
+
+# Searching joins five ways with icontains; browsing the catalog is not limited.
+SEARCH_RATE_LIMIT = ratelimit(
+    "books_search", "30/m", when=lambda request: request.GET.get("q", "").strip()
+)
+# Every wishlist change writes rows and a notification.
+WISHLIST_RATE_LIMIT = ratelimit("wishlist", "10/m", key="user", algorithm="token_bucket")
+
+
+def books_etag(request):
+    """The catalog changes only when the CATALOG or WISHLISTS namespace is
+    bumped, the latter moving the "want to read" counters on the cards, or
+    when the trending section changes.
+    """
+    versions = current_versions(CATALOG, WISHLISTS)
+    return etag_for(
+        request, "books", *versions.values(), trending_version(request), request.GET.urlencode()
+    )
+
+
+def book_state(request, pk):
+    """Fetch what a book page's validators depend on, once per request."""
+    if not hasattr(request, "_book_state"):
+        # Reviews and author links touch ``Book.updated_at`` (app/signals.py).
+        queryset = Book.objects.filter(pk=pk).annotate(
+            authors_updated_at=Max("bookauthor__author__updated_at")
+        )
+        fields = ["updated_at", "authors_updated_at", "wishlist_counter__updated_at"]
+        if request.user.is_authenticated:
+            queryset = queryset.annotate(
+                in_wishlist=Exists(
+                    WishListItem.objects.filter(user=request.user, book=OuterRef("pk"))
+                )
+            )
+            fields.append("in_wishlist")
+        request._book_state = queryset.values(*fields).first()
+    return request._book_state
+
+
+def book_etag(request, pk):
+    state = book_state(request, pk)
+    if state is None:
+        return None
+    return etag_for(request, "book", pk, *state.values())
+
+
+def book_last_modified(request, pk):
+    state = book_state(request, pk)
+    if state is None:
+        return None
+    return max(
+        filter(None, [state["updated_at"], state["authors_updated_at"], state["wishlist_counter__updated_at"]])
+    )
+
+
+def wishlist_button_context(request, book_pk):
+    if not request.user.is_authenticated:
+        return {}
+    # Already fetched for the ETag by ``book_etag``.
+    return {"is_in_wishlist": book_state(request, book_pk)["in_wishlist"]}
+
+
+def review_form_context(request, book_pk):
+    return {"review_form": BookDetailReviewForm()}
 
 
-class BooksView(ListView):
+def trending_books(request):
+    """``(scope, ranking)`` shown to ``request.user``, looked up once per request."""
+    if not hasattr(request, "_trending"):
+        request._trending = trending.top_for(request.user)
+    return request._trending
+
+
+def trending_version(request):
+    """Changes whenever the ranking shown to ``request.user`` does."""
+    return ",".join(str(book["id"]) for book in trending_books(request)[1]["books"])
+
+
+def trending_context(request):
+    scope, ranking = trending_books(request)
+    school_class = "" if scope == trending.GLOBAL else scope.removeprefix("class:")
+    return {"trending_books": ranking["books"], "trending_class": school_class}
+
+
+register_fragment("wishlist_button", "books/fragments/wishlist_button.html", wishlist_button_context)
+register_fragment("review_form", "books/fragments/review_form.html", review_form_context)
+register_fragment("trending", "fragments/trending.html", trending_context)
+
+
+def catalog_paginator(queryset, per_page):
+    """Catalog counts are estimated when large and otherwise cached until the
+    catalog changes.
+    """
+    return EstimatedCountPaginator(
+        queryset,
+        per_page,
+        cache_timeout=settings.PAGINATOR_COUNT_CACHE_TIMEOUT,
+        cache_version=page_cache.stamp(CATALOG),
+    )
+
+
+@method_decorator([conditional(books_etag), cache_page_shell(CATALOG)], name="get")
+class BooksView(RateLimitMixin, ListView):
+    rate_limits = [SEARCH_RATE_LIMIT]
     template_name = "books/list.html"
     context_object_name = "books"
     paginate_by = 2
 
     def get_queryset(self):
-        """Return a queryset optionally filtered by a search query.
+        return search_books(self.request.GET.get("q", "").strip())
 
-        Supports searching by title, description, isbn and author name. Also
-        orders the queryset by title to make pagination deterministic.
-        """
-        qs = Book.objects.all().order_by("title")
-        q = self.request.GET.get("q", "").strip()
-        if q:
-            qs = qs.filter(
-                Q(title__icontains=q)
-                | Q(description__icontains=q)
-                | Q(isbn__icontains=q)
-                | Q(bookauthor__author__first_name__icontains=q)
-                | Q(bookauthor__author__last_name__icontains=q)
-            ).distinct()
-        return qs
+    def get_paginator(self, queryset, per_page, **kwargs):
+        return catalog_paginator(queryset, per_page)
 
     def get_context_data(self, **kwargs):
         """Add the search query to context so templates can prefill the search box
@@ -46,9 +175,19 @@ class BooksView(ListView):
         """
         context = super().get_context_data(**kwargs)
         context["search_query"] = self.request.GET.get("q", "").strip()
+        if context["page_obj"] is not None:
+            context["page_range"] = context["paginator"].get_elided_page_range(context["page_obj"].number)
         return context
 
 
+@method_decorator(
+    [
+        counts_book_views,
+        conditional(book_etag, book_last_modified),
+        cache_page_shell(CATALOG, REVIEWS),
+    ],
+    name="get",
+)
 class BookDetailView(DetailView):
     template_name = "books/detail.html"
     model = Book
@@ -56,7 +195,7 @@ class BookDetailView(DetailView):
     form_class = BookDetailReviewForm
 
     def get_queryset(self):
-        return super().get_queryset().annotate(
+        return super().get_queryset().select_related("wishlist_counter").annotate(
             average_rating=Avg("bookreview__stars_given"),
             review_count=Count("bookreview")
         )
@@ -64,11 +203,13 @@ class BookDetailView(DetailView):
     def get_context_data(self, **kwargs):
         """Add related authors and reviews to the context."""
         context = super().get_context_data(**kwargs)
-        book = self.get_object()
+        book = self.object
         context["authors"] = BookAuthor.objects.filter(book=book).select_related(
             "author"
         )
-        context["reviews"] = BookReview.objects.filter(book=book).select_related("user")
+        context["reviews"] = (
+            BookReview.objects.filter(book=book).select_related("user").order_by("-created_at")
+        )
         context["review_form"] = self.form_class()
         
         # Check if book is in user's wishlist
@@ -82,6 +223,179 @@ class BookDetailView(DetailView):
         return context
 
 
+@method_decorator([conditional(books_etag), cache_page_shell(CATALOG)], name="get")
+class AsyncBooksView(RateLimitMixin, View):
+    """Async version of ``BooksView`` for ASGI deployments."""
+
+    rate_limits = BooksView.rate_limits
+    template_name = BooksView.template_name
+    paginate_by = BooksView.paginate_by
+
+    async def get(self, request):
+        search_query = request.GET.get("q", "").strip()
+        queryset = search_books(search_query)
+
+        paginator = await sync_to_async(catalog_paginator)(queryset, self.paginate_by)
+        count = sync_to_async(lambda: paginator.count)
+        page_number = request.GET.get("page") or 1
+        if page_number == "last":
+            # The last page is only known once the count is in.
+            await count()
+            page_number = paginator.num_pages
+        try:
+            page_number = int(page_number)
+        except (TypeError, ValueError):
+            raise Http404("Invalid page.")
+
+        # Fetch the count and the requested page concurrently.
+        bottom = (page_number - 1) * self.paginate_by
+        _, books = await asyncio.gather(
+            count(),
+            alist(queryset[max(bottom, 0):bottom + self.paginate_by]),
+        )
+        try:
+            page = Page(books, paginator.validate_number(page_number), paginator)
+        except InvalidPage:
+            raise Http404("Invalid page.")
+
+        context = {
+            "books": page.object_list,
+            "object_list": page.object_list,
+            "page_obj": page,
+            "paginator": paginator,
+            "is_paginated": paginator.num_pages > 1,
+            "page_range": paginator.get_elided_page_range(page.number),
+            "search_query": search_query,
+        }
+        return await sync_to_async(render)(request, self.template_name, context)
+
+
+@method_decorator(
+    [
+        counts_book_views,
+        conditional(book_etag, book_last_modified),
+        cache_page_shell(CATALOG, REVIEWS),
+    ],
+    name="get",
+)
+class AsyncBookDetailView(View):
+    """Async version of ``BookDetailView`` for ASGI deployments."""
+
+    template_name = BookDetailView.template_name
+
+    async def get(self, request, pk):
+        user = await request.auser()
+
+        async def in_wishlist():
+            if not user.is_authenticated:
+                return False
+            return await WishListItem.objects.filter(user=user, book_id=pk).aexists()
+
+        try:
+            book, authors, reviews, is_in_wishlist = await asyncio.gather(
+                Book.objects.select_related("wishlist_counter").annotate(
+                    average_rating=Avg("bookreview__stars_given"),
+                    review_count=Count("bookreview"),
+                ).aget(pk=pk),
+                alist(BookAuthor.objects.filter(book_id=pk).select_related("author")),
+                alist(
+                    BookReview.objects.filter(book_id=pk)
+                    .select_related("user")
+                    .order_by("-created_at")
+                ),
+                in_wishlist(),
+            )
+        except Book.DoesNotExist:
+            raise Http404("No book found matching the query.")
+
+        context = {
+            "book": book,
+            "object": book,
+            "authors": authors,
+            "reviews": reviews,
+            "review_form": BookDetailReviewForm(),
+            "is_in_wishlist": is_in_wishlist,
+        }
+        return await sync_to_async(render)(request, self.template_name, context)
+
+
+def authors_etag(request, pk=None):
+    """Author pages change with the catalog and with reviews."""
+    versions = current_versions(CATALOG, REVIEWS)
+    return etag_for(request, "authors", pk, *versions.values(), request.GET.urlencode())
+
+
+AUTHOR_ORDERINGS = {
+    "name": (F("last_name").asc(), F("first_name").asc(), F("pk").asc()),
+    "popular": (F("stats__review_count").desc(nulls_last=True), F("pk").asc()),
+}
+
+
+@method_decorator([conditional(authors_etag), cache_page_shell(CATALOG, REVIEWS)], name="get")
+class AuthorsView(ListView):
+    """Author index; ratings and review counts come from ``AuthorStats``."""
+
+    template_name = "authors/list.html"
+    context_object_name = "authors"
+    paginate_by = 24
+    paginator_class = EstimatedCountPaginator
+
+    def get_sort(self):
+        sort = self.request.GET.get("sort")
+        return sort if sort in AUTHOR_ORDERINGS else "name"
+
+    def get_queryset(self):
+        return Author.objects.select_related("stats").order_by(*AUTHOR_ORDERINGS[self.get_sort()])
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["sort"] = self.get_sort()
+        return context
+
+
+@method_decorator([conditional(authors_etag), cache_page_shell(CATALOG, REVIEWS)], name="get")
+class AuthorDetailView(DetailView):
+    """An author's stats and a keyset-paginated bibliography.
+
+    ``?after=<cursor>`` continues the bibliography after the last book shown,
+    so deep pages cost the same as the first.
+    """
+
+    template_name = "authors/detail.html"
+    queryset = Author.objects.select_related("stats")
+    context_object_name = "author"
+    books_per_page = 20
+    bibliography_ordering = ("title", "pk")
+
+    def get_bibliography(self):
+        books = Book.objects.filter(
+            pk__in=BookAuthor.objects.filter(author=self.object).values("book_id")
+        )
+        cursor = self.request.GET.get("after")
+        if cursor:
+            try:
+                values = decode_cursor(cursor, len(self.bibliography_ordering))
+                books = after(books, self.bibliography_ordering, values)
+            except (TypeError, ValueError, ValidationError):
+                raise Http404("Invalid cursor.")
+        books = list(books.order_by(*self.bibliography_ordering)[: self.books_per_page + 1])
+        next_cursor = None
+        if len(books) > self.books_per_page:
+            books = books[: self.books_per_page]
+            next_cursor = encode_cursor([books[-1].title, books[-1].pk])
+        return books, next_cursor
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["books"], context["next_cursor"] = self.get_bibliography()
+        context["is_continued"] = bool(self.request.GET.get("after"))
+        try:
+            context["stats"] = self.object.stats
+        except Author.stats.RelatedObjectDoesNotExist:
+            context["stats"] = None
+        return context
+
+
 class AddBookReviewView(LoginRequiredMixin, View):
     def post(self, request, pk):
         book = get_object_or_404(
@@ -99,6 +413,13 @@ class AddBookReviewView(LoginRequiredMixin, View):
             try:
                 with transaction.atomic():
                     review.save()
+                fanout.send_many(
+                    request.user.friends().values_list("pk", flat=True),
+                    "friend_review",
+                    actor=request.user.username,
+                    subject=book.title,
+                    subject_id=book.pk,
+                )
                 messages.success(request, "Your review has been posted!")
                 return redirect("books:detail", pk=book.pk)
             except IntegrityError:
@@ -110,7 +431,7 @@ class AddBookReviewView(LoginRequiredMixin, View):
         context = {
             "book": book,
             "authors": BookAuthor.objects.filter(book=book).select_related("author"),
-            "reviews": BookReview.objects.filter(book=book).select_related("user"),
+            "reviews": BookReview.objects.filter(book=book).select_related("user").order_by("-created_at"),
             "review_form": form,
         }
         return render(request, "books/detail.html", context)
@@ -142,24 +463,67 @@ class TeachersDashboardView(LoginRequiredMixin, ListView):
         context["class_name"] = teacher_class
         return context
 
+@require_POST
 @login_required
+@WISHLIST_RATE_LIMIT
 def add_to_wishlist(request, book_id):
     book = get_object_or_404(Book, pk=book_id)
-    WishListItem.objects.get_or_create(user=request.user, book=book)
+    _, created = WishListItem.objects.get_or_create(user=request.user, book=book)
     messages.success(request, f'"{book.title}" has been added to your wishlist.')
-    Notification.objects.create(user=request.user, message=f'"{book.title}" has been added to your wishlist.')
+    if created:
+        fanout.send(request.user, "wishlist", subject=book.title)
     return redirect("books:detail", pk=book_id)
 
+
+@require_POST
 @login_required
+@WISHLIST_RATE_LIMIT
 def remove_from_wishlist(request, book_id):
     book = get_object_or_404(Book, pk=book_id)
     WishListItem.objects.filter(user=request.user, book=book).delete()
     messages.info(request, f'"{book.title}" has been removed from your wishlist.')
     return redirect("books:detail", pk=book_id)
 
+
+@require_POST
+@login_required
+@WISHLIST_RATE_LIMIT
+def bulk_wishlist(request):
+    """Add or remove up to ``MAX_BULK`` books (``book`` values) at once."""
+    action = request.POST.get("action")
+    try:
+        book_ids = {int(value) for value in request.POST.getlist("book")}
+    except ValueError:
+        book_ids = None
+    if action not in ("add", "remove") or not book_ids or len(book_ids) > MAX_BULK:
+        messages.error(request, f"Choose between 1 and {MAX_BULK} books to add or remove.")
+        return redirect("books:wishlist")
+    if action == "add":
+        added = add_books(request.user, book_ids)
+        if added:
+            message = f"{len(added)} book{'s' if len(added) != 1 else ''} added to your wishlist."
+            messages.success(request, message)
+            fanout.send(request.user, "wishlist", subject=added[0].title, count=len(added))
+    else:
+        removed = remove_books(request.user, book_ids)
+        messages.info(request, f"{len(removed)} book{'s' if len(removed) != 1 else ''} removed from your wishlist.")
+    return redirect("books:wishlist")
+
+
 class WishlistView(LoginRequiredMixin, ListView):
+    """The user's wishlist, newest first, with each book's authors."""
+
     template_name = "books/wishlist.html"
-    context_object_name = "wishlist_books"
+    context_object_name = "items"
+    paginate_by = 24
+    paginator_class = EstimatedCountPaginator
 
     def get_queryset(self):
-        return Book.objects.filter(wishlist_items__user=self.request.user)
\ No newline at end of file
+        return (
+            WishListItem.objects.filter(user=self.request.user)
+            .select_related("book__wishlist_counter")
+            .prefetch_related(
+                Prefetch("book__bookauthor_set", queryset=BookAuthor.objects.select_related("author"))
+            )
+            .order_by("-added_at", "-pk")
+        )
@@ -0,0 +1,147 @@
+"""Wishlist writes and the per-book "want to read" counters.
+
+``BookWishlistCounter`` holds how many users have each book on their
+wishlist, so list and detail cards show it without a ``COUNT`` per book.
+Saving or deleting a single ``WishListItem`` moves its book's counter
+through the receivers in ``app/signals.py``. ``add_books`` and
+``remove_books`` change many items at once and move every counter they touch
+with one ``UPDATE`` per direction. The same changes move the users' monthly
+wishlist counts in ``users.reading_stats`` and their ``users.leaderboards``
+entries. Inside ``batched_counts()`` the per-item
+receivers collect their changes instead of writing them one by one.
+
+Counters can drift if rows are changed with raw SQL, or by one when two
+bulk adds of the same book by the same user race; ``rebuild`` (or the
+``rebuild_wishlist_counts`` command) recounts them.
+"""
+
+import threading
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models import Count, F
+from django.dispatch import Signal
+from django.utils import timezone
+
+from app import trending
+from app.models import Book, BookWishlistCounter, WishListItem
+from users import leaderboards, reading_stats
+
+# Sent with ``book_ids`` after counters moved, for cache invalidation.
+counts_changed = Signal()
+
+# Books one bulk request may add or remove.
+MAX_BULK = 100
+
+_local = threading.local()
+
+
+def adjust(deltas):
+    """Apply ``{book_id: delta}`` to the counters."""
+    deltas = {book_id: delta for book_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    # Only additions need a row; a book being deleted must not get one back
+    # from the cascade that removes its wishlist items.
+    BookWishlistCounter.objects.bulk_create(
+        [BookWishlistCounter(book_id=book_id) for book_id, delta in deltas.items() if delta > 0],
+        ignore_conflicts=True,
+    )
+    by_delta = defaultdict(list)
+    for book_id, delta in deltas.items():
+        by_delta[delta].append(book_id)
+    now = timezone.now()
+    for delta, book_ids in by_delta.items():
+        BookWishlistCounter.objects.filter(book_id__in=book_ids).update(
+            count=F("count") + delta, updated_at=now
+        )
+    counts_changed.send(sender=BookWishlistCounter, book_ids=set(deltas))
+
+
+def apply_changes(changes):
+    """Apply ``{(book_id, user_id, day added): delta}`` to the book counters,
+    and to the reading stats and leaderboards of the users that are not
+    ``None``.
+    """
+    books, users, boards = Counter(), Counter(), Counter()
+    for (book_id, user_id, day), delta in changes.items():
+        books[book_id] += delta
+        if user_id is not None:
+            users[user_id] += delta
+            boards[user_id, day] += delta
+    adjust(books)
+    reading_stats.wishlist_changed(users)
+    leaderboards.wishlist_changed(boards)
+
+
+def item_changed(item, delta, user_stats=True):
+    """Called by the ``WishListItem`` receivers for every saved or deleted row."""
+    key = (item.book_id, item.user_id if user_stats else None, timezone.localdate(item.added_at))
+    pending = getattr(_local, "pending", None)
+    if pending is None:
+        apply_changes({key: delta})
+    else:
+        pending[key] += delta
+
+
+@contextmanager
+def batched_counts():
+    """Collect the per-item changes and apply them once at the end."""
+    if getattr(_local, "pending", None) is not None:
+        yield
+        return
+    _local.pending = Counter()
+    try:
+        yield
+        pending = _local.pending
+    finally:
+        _local.pending = None
+    apply_changes(pending)
+
+
+def add_books(user, book_ids):
+    """Add the existing books among ``book_ids``; returns the books added."""
+    books = list(Book.objects.filter(pk__in=book_ids).only("pk", "title"))
+    existing = set(
+        WishListItem.objects.filter(user=user, book__in=books).values_list("book_id", flat=True)
+    )
+    added = [book for book in books if book.pk not in existing]
+    with transaction.atomic():
+        # bulk_create sends no post_save, so counters, stats and rankings move here.
+        WishListItem.objects.bulk_create(
+            [WishListItem(user=user, book=book) for book in added], ignore_conflicts=True
+        )
+        now = timezone.now()
+        apply_changes({(book.pk, user.pk, timezone.localdate(now)): 1 for book in added})
+        trending.record_many((book.pk, "wishlist", user.school_class, now, 1) for book in added)
+    return added
+
+
+def remove_books(user, book_ids):
+    """Remove ``book_ids`` from ``user``'s wishlist; returns the books removed."""
+    items = WishListItem.objects.filter(user=user, book_id__in=book_ids)
+    removed = list(Book.objects.filter(pk__in=items.values("book_id")).only("pk", "title"))
+    with transaction.atomic(), batched_counts():
+        items.delete()
+    return removed
+
+
+def rebuild(book_ids=None):
+    """Recount the counters of ``book_ids``, or of every book."""
+    items = WishListItem.objects.all()
+    counters = BookWishlistCounter.objects.all()
+    if book_ids is not None:
+        items = items.filter(book_id__in=book_ids)
+        counters = counters.filter(book_id__in=book_ids)
+    counts = dict(items.values("book_id").annotate(count=Count("id")).order_by().values_list("book_id", "count"))
+    with transaction.atomic():
+        counters.exclude(book_id__in=items.values("book_id")).delete()
+        BookWishlistCounter.objects.bulk_create(
+            [BookWishlistCounter(book_id=book_id, count=count) for book_id, count in counts.items()],
+            update_conflicts=True,
+            unique_fields=["book"],
+            update_fields=["count", "updated_at"],
+            batch_size=1000,
+        )
+    counts_changed.send(sender=BookWishlistCounter, book_ids=set(counts))
@@ -0,0 +1,73 @@
+"""Admin building blocks for tables with millions of rows.
+
+``LargeTableAdminMixin`` replaces the changelist's two ``COUNT(*)`` queries
+with an estimate, and ``PaginatedTabularInline`` shows one page of related
+rows instead of rendering all of them on the parent's change form.
+"""
+
+from django.contrib import admin
+from django.forms.models import BaseInlineFormSet
+from django.http import QueryDict
+
+from config.paginator import EstimatedCountPaginator
+
+
+class LargeTableAdminMixin:
+    """Changelists that never count the whole table exactly."""
+
+    paginator = EstimatedCountPaginator
+    # Skips the second, unfiltered count behind "N results (M total)".
+    show_full_result_count = False
+
+
+class PaginatedInlineFormSet(BaseInlineFormSet):
+    """Edit one page of the related rows; ``get_formset`` sets the page."""
+
+    per_page = 20
+    page_param = "page"
+    page_number = 1
+    # The request's query string, kept in the page links.
+    query = QueryDict()
+
+    def get_queryset(self):
+        if not hasattr(self, "_page"):
+            queryset = super().get_queryset()
+            paginator = EstimatedCountPaginator(queryset, self.per_page)
+            self._page = paginator.get_page(self.page_number)
+            # A subquery keeps the queryset filterable, which the formset needs.
+            self._page_queryset = queryset.filter(pk__in=self._page.object_list.values("pk"))
+        return self._page_queryset
+
+    @property
+    def page(self):
+        self.get_queryset()
+        return self._page
+
+    def page_url(self, number):
+        query = self.query.copy()
+        query[self.page_param] = number
+        return f"?{query.urlencode()}"
+
+    @property
+    def previous_page_url(self):
+        return self.page_url(self.page.previous_page_number())
+
+    @property
+    def next_page_url(self):
+        return self.page_url(self.page.next_page_number())
+
+
+class PaginatedTabularInline(admin.TabularInline):
+    """A tabular inline with ``?<model>_page=N`` pagination."""
+
+    formset = PaginatedInlineFormSet
+    template = "admin/edit_inline/paginated_tabular.html"
+    per_page = 20
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        formset.per_page = self.per_page
+        formset.page_param = f"{self.opts.model_name}_page"
+        formset.page_number = request.GET.get(formset.page_param, 1)
+        formset.query = request.GET
+        return formset
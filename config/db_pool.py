@@ -0,0 +1,56 @@
+"""Connection reuse metrics for every configured database."""
+
+from collections import Counter
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+_opened = Counter()
+
+
+@receiver(connection_created)
+def count_connection(sender, connection, **kwargs):
+    _opened[connection.alias] += 1
+
+
+def pool_stats():
+    """Return pool metrics per database alias for the current process.
+
+    Pooled PostgreSQL connections report checkouts, wait time and saturation
+    from psycopg's pool; other databases report how many physical
+    connections this process has opened so far.
+    """
+    stats = {}
+    for alias in connections:
+        connection = connections[alias]
+        pool = connection.pool if connection.vendor == "postgresql" else None
+        if pool is None:
+            stats[alias] = {
+                "mode": "persistent",
+                "conn_max_age": connection.settings_dict["CONN_MAX_AGE"],
+                "connections_opened": _opened[alias],
+            }
+            continue
+
+        raw = pool.get_stats()
+        size = raw.get("pool_size", 0)
+        in_use = size - raw.get("pool_available", 0)
+        checkouts = raw.get("requests_num", 0)
+        wait_ms = raw.get("requests_wait_ms", 0)
+        stats[alias] = {
+            "mode": "pool",
+            "min_size": pool.min_size,
+            "max_size": pool.max_size,
+            "size": size,
+            "in_use": in_use,
+            "waiting": raw.get("requests_waiting", 0),
+            "checkouts": checkouts,
+            "queued": raw.get("requests_queued", 0),
+            "wait_ms_total": wait_ms,
+            "wait_ms_avg": wait_ms / checkouts if checkouts else 0.0,
+            "errors": raw.get("requests_errors", 0),
+            "connections_opened": raw.get("connections_num", 0),
+            "saturation": in_use / pool.max_size,
+        }
+    return stats
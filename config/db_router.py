@@ -0,0 +1,159 @@
+"""Read-replica routing.
+
+Reads go to a replica from ``DATABASE_REPLICA_URLS`` unless the current
+client wrote recently, the request already wrote, or every replica lags
+more than ``REPLICA_MAX_LAG`` seconds.
+Writes always go to ``default``.
+"""
+
+import math
+import random
+import time
+from contextlib import contextmanager
+
+from asgiref.local import Local
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+PIN_COOKIE = "pin_primary"
+
+_state = Local()
+
+
+def pin_primary():
+    """Send the rest of this request's reads to the primary."""
+    _state.pinned = True
+    _state.wrote = True
+
+
+def reset_pin():
+    _state.pinned = False
+    _state.wrote = False
+
+
+def is_pinned():
+    return getattr(_state, "pinned", False)
+
+
+@contextmanager
+def background_writes():
+    """Writes made inside, on behalf of other requests, do not pin this client."""
+    pinned, wrote = is_pinned(), getattr(_state, "wrote", False)
+    try:
+        yield
+    finally:
+        _state.pinned, _state.wrote = pinned, wrote
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith("replica_")]
+
+
+class ReplicaLagMonitor:
+    """Measure replica lag, caching each reading for a short interval."""
+
+    def __init__(self, check_interval=None, max_lag=None):
+        self._check_interval = check_interval
+        self._max_lag = max_lag
+        self._readings = {}
+
+    @property
+    def check_interval(self):
+        if self._check_interval is not None:
+            return self._check_interval
+        return settings.REPLICA_LAG_CHECK_INTERVAL
+
+    @property
+    def max_lag(self):
+        if self._max_lag is not None:
+            return self._max_lag
+        return settings.REPLICA_MAX_LAG
+
+    def measure(self, alias):
+        """Return the replication delay of ``alias`` in seconds.
+
+        Unreachable replicas report an infinite lag so they are skipped.
+        Backends without streaming replication (SQLite) always report 0.
+        """
+        connection = connections[alias]
+        if connection.vendor != "postgresql":
+            return 0.0
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() "
+                    "THEN 0 ELSE COALESCE(EXTRACT(EPOCH FROM now() - "
+                    "pg_last_xact_replay_timestamp()), 0) END"
+                )
+                return float(cursor.fetchone()[0])
+        except DatabaseError:
+            return math.inf
+
+    def lag(self, alias):
+        now = time.monotonic()
+        reading = self._readings.get(alias)
+        if reading is None or now >= reading[0]:
+            reading = (now + self.check_interval, self.measure(alias))
+            self._readings[alias] = reading
+        return reading[1]
+
+    def healthy(self, aliases):
+        return [alias for alias in aliases if self.lag(alias) <= self.max_lag]
+
+
+lag_monitor = ReplicaLagMonitor()
+
+
+class ReplicaRouter:
+    """Route reads to healthy replicas and writes to the primary."""
+
+    def __init__(self, replicas=None, monitor=None):
+        self.replicas = replica_aliases() if replicas is None else replicas
+        self.monitor = lag_monitor if monitor is None else monitor
+
+    def db_for_read(self, model, **hints):
+        if not self.replicas or is_pinned():
+            return DEFAULT_DB_ALIAS
+        healthy = self.monitor.healthy(self.replicas)
+        if not healthy:
+            return DEFAULT_DB_ALIAS
+        return random.choice(healthy)
+
+    def db_for_write(self, model, **hints):
+        pin_primary()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaPinningMiddleware:
+    """Keep a client on the primary for ``REPLICA_PIN_SECONDS`` after a write.
+
+    The pin is a short-lived cookie, so it follows the browser across workers
+    and nodes and preserves read-your-writes without shared server state.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _state.pinned = PIN_COOKIE in request.COOKIES
+        _state.wrote = False
+        try:
+            response = self.get_response(request)
+            if _state.wrote:
+                response.set_cookie(
+                    PIN_COOKIE,
+                    "1",
+                    max_age=settings.REPLICA_PIN_SECONDS,
+                    httponly=True,
+                    samesite="Lax",
+                )
+            return response
+        finally:
+            reset_pin()
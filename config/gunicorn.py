@@ -0,0 +1,37 @@
+"""Gunicorn launch profile for production (WSGI).
+
+    gunicorn -c python:config.gunicorn config.wsgi:application
+
+or simply ``python manage.py serve``. The application is preloaded and
+warmed in the master, then forked, so workers share its memory
+copy-on-write and never serve a cold first request. Workers are recycled
+after ``WEB_MAX_REQUESTS`` requests, with jitter so they do not all restart
+at once. Several workers need ``REDIS_URL``; without it one worker is started.
+"""
+
+import os
+
+from config.launcher import (  # noqa: F401 (gunicorn hooks)
+    default_threads,
+    default_workers,
+    post_fork,
+    pre_fork,
+    shared_cache_configured,
+    when_ready,
+    worker_exit,
+)
+
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+preload_app = True
+
+# Without a shared cache, workers could not invalidate each other's pages.
+workers = int(os.environ.get("WEB_CONCURRENCY", default_workers() if shared_cache_configured() else 1))
+threads = int(os.environ.get("WEB_THREADS", default_threads()))
+worker_class = "gthread" if threads > 1 else "sync"
+
+max_requests = int(os.environ.get("WEB_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.environ.get("WEB_MAX_REQUESTS_JITTER", max_requests // 10))
+
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
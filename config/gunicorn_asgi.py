@@ -0,0 +1,24 @@
+"""Gunicorn launch profile for the ASGI application with uvicorn workers.
+
+    gunicorn -c python:config.gunicorn_asgi config.asgi:application
+
+or ``python manage.py serve --asgi``. Same preloading, warmup and recycling
+as ``config/gunicorn.py``; each worker runs an event loop, so the async views
+(and long-polling notification clients) hold many connections per process.
+Database connections are closed after each request unless ``DB_POOL_SIZE``
+pools them.
+"""
+
+import os
+
+os.environ.setdefault("ASYNC_VIEWS", "True")
+# Under ASGI every request runs in its own thread, so persistent per-thread
+# connections would pile up; use DB_POOL_SIZE on PostgreSQL to reuse them.
+os.environ.setdefault("DB_CONN_MAX_AGE", "0")
+
+from config.gunicorn import *  # noqa: E402,F401,F403
+
+worker_class = "uvicorn_worker.UvicornWorker"
+threads = 1
+# Long-polling clients keep requests open for up to 30 seconds.
+timeout = 60
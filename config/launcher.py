@@ -0,0 +1,181 @@
+"""Production launcher helpers: worker sizing, warmup and gunicorn hooks.
+
+Used by the gunicorn profiles in ``config/gunicorn.py`` and
+``config/gunicorn_asgi.py``. Nothing here imports Django at module level so
+the profiles can be loaded before settings are configured.
+"""
+
+import gc
+import logging
+import os
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Cache backends that keep entries inside each process.
+PROCESS_LOCAL_CACHES = {"django.core.cache.backends.locmem.LocMemCache"}
+
+CGROUP_MEMORY_LIMITS = (
+    Path("/sys/fs/cgroup/memory.max"),
+    Path("/sys/fs/cgroup/memory/memory.limit_in_bytes"),
+)
+
+
+def cpu_count():
+    """Return the number of CPUs this process may run on."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def available_memory_mb():
+    """Return the memory available to this container or host, in MB."""
+    limits = []
+    for path in CGROUP_MEMORY_LIMITS:
+        try:
+            value = path.read_text().strip()
+        except OSError:
+            continue
+        if value.isdigit():
+            limits.append(int(value) // (1024 * 1024))
+    try:
+        with open("/proc/meminfo") as meminfo:
+            for line in meminfo:
+                if line.startswith("MemAvailable:"):
+                    limits.append(int(line.split()[1]) // 1024)
+                    break
+    except OSError:
+        pass
+    return min(limits) if limits else None
+
+
+def default_workers(cpus=None, memory_mb=None, worker_memory_mb=None):
+    """Size the worker count from CPUs and memory.
+
+    Starts from the usual ``2 * CPUs + 1`` and caps it so that every worker
+    gets ``WEB_WORKER_MEMORY_MB`` (default 150) of the available memory.
+    """
+    cpus = cpus or cpu_count()
+    if memory_mb is None:
+        memory_mb = available_memory_mb()
+    if worker_memory_mb is None:
+        worker_memory_mb = int(os.environ.get("WEB_WORKER_MEMORY_MB", 150))
+    workers = 2 * cpus + 1
+    if memory_mb:
+        workers = min(workers, memory_mb // worker_memory_mb)
+    return max(1, workers)
+
+
+def shared_cache_configured():
+    """Whether ``REDIS_URL`` gives the workers a shared default cache."""
+    from decouple import config
+
+    return bool(config("REDIS_URL", default=""))
+
+
+def check_shared_cache(workers):
+    """Refuse to run several workers on a per-process cache.
+
+    Fragment and page stamps live in the default cache; with a per-process
+    cache a write would only retire the entries of the worker that handled
+    it, and the others would keep serving stale pages.
+    """
+    from django.conf import settings
+
+    if workers > 1 and settings.CACHES["default"]["BACKEND"] in PROCESS_LOCAL_CACHES:
+        raise RuntimeError(
+            f"{workers} workers need a shared cache: set REDIS_URL, or run one worker."
+        )
+
+
+def default_threads(cpus=None):
+    """Threads per worker: a few per worker to overlap database waits."""
+    return 4 if (cpus or cpu_count()) > 1 else 2
+
+
+def warm_up():
+    """Load everything a first request would otherwise pay for.
+
+    Populates the URL resolver, compiles every template into the cached
+    loader, builds the ORM metadata and SQL compilers, and syncs the
+    in-process cache. Run in the master before forking so workers share the
+    result copy-on-write.
+    """
+    from django.apps import apps
+    from django.conf import settings
+    from django.db import connections
+    from django.template import TemplateDoesNotExist, TemplateSyntaxError
+    from django.template.loader import get_template
+    from django.urls import get_resolver
+
+    from app.invalidation import process_cache
+
+    resolver = get_resolver()
+    url_names = len(resolver.reverse_dict)
+    for namespace in resolver.namespace_dict:
+        resolver.namespace_dict[namespace][1].reverse_dict
+
+    template_dirs = [Path(d) for engine in settings.TEMPLATES for d in engine["DIRS"]]
+    template_dirs += [Path(app.path) / "templates" for app in apps.get_app_configs()]
+    templates = 0
+    for directory in template_dirs:
+        for path in directory.rglob("*.html"):
+            try:
+                get_template(path.relative_to(directory).as_posix())
+            except (TemplateDoesNotExist, TemplateSyntaxError):
+                continue
+            templates += 1
+
+    models = apps.get_models()
+    try:
+        for model in models:
+            model._meta.get_fields()
+            str(model._default_manager.all()[:1].query)
+        process_cache.sync(force=True)
+    finally:
+        connections.close_all()
+
+    stats = {"url_names": url_names, "templates": templates, "models": len(models)}
+    logger.info("Warmed up %(url_names)d URL names, %(templates)d templates, %(models)d models", stats)
+    return stats
+
+
+# --- gunicorn hooks ---
+
+
+def when_ready(server):
+    """Warm the preloaded application once, in the master."""
+    check_shared_cache(server.cfg.workers)
+    warm_up()
+    # Move everything allocated so far out of the collector's reach so the
+    # garbage collector does not dirty shared pages in the workers.
+    gc.freeze()
+
+
+def pre_fork(server, worker):
+    """Never share a database socket between processes."""
+    from django.db import connections
+
+    connections.close_all()
+
+
+def post_fork(server, worker):
+    """Threads do not survive the fork; start the worker's own flusher."""
+    from config.write_behind import start_flusher
+
+    start_flusher()
+
+
+def worker_exit(server, worker):
+    """Flush per-process state before a worker is recycled."""
+    from django.db import connections
+
+    from config.query_instrumentation import stats_buffer
+    from config.write_behind import flush_all
+
+    try:
+        stats_buffer.flush()
+        flush_all()
+    finally:
+        connections.close_all()
@@ -0,0 +1,123 @@
+"""Paginators that avoid ``COUNT(*)`` on big tables.
+
+Counting every row of a multi-million-row table costs as much as reading
+it. PostgreSQL's planner already keeps estimates: ``pg_class.reltuples`` for
+a whole table, refreshed by autovacuum, and the row estimate of ``EXPLAIN``
+for a filtered query. They are close enough to size a paginator for an
+unfiltered table or a simple filter, and are only used once they reach
+``PAGINATOR_ESTIMATE_THRESHOLD``; smaller results are counted exactly, so a
+narrow search never shows pages that do not exist. Where no estimate is
+available (e.g. SQLite) an exact count can be cached instead.
+
+``is_estimated`` tells templates which kind of count they got; the
+``result_count`` filter in ``app/templatetags/counts.py`` renders it as
+"about 1.2M results".
+"""
+
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+
+
+def table_estimate(queryset):
+    """The planner's row count for ``queryset``'s table if it is unfiltered."""
+    query = queryset.query
+    if query.where or query.distinct or query.is_sliced or query.combinator:
+        return None
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples FROM pg_class WHERE oid = %s::regclass",
+            [connection.ops.quote_name(queryset.model._meta.db_table)],
+        )
+        row = cursor.fetchone()
+    # -1 means the table was never analyzed.
+    return int(row[0]) if row and row[0] >= 0 else None
+
+
+def plan_estimate(queryset):
+    """The planner's row estimate for a filtered ``queryset``."""
+    query = queryset.query
+    if query.is_sliced or query.combinator:
+        return None
+    if connections[queryset.db].vendor != "postgresql":
+        return None
+    return plan_rows(queryset.order_by().explain(format="json"))
+
+
+def plan_rows(explained):
+    """The top node's row estimate from ``EXPLAIN (FORMAT JSON)`` output.
+
+    PostgreSQL returns ``[{"Plan": ...}]``, but with psycopg 3 Django gets
+    the decoded list back and dumps each element, leaving just the dict.
+    """
+    plan = json.loads(explained)
+    if isinstance(plan, list):
+        plan = plan[0]
+    return int(plan["Plan"]["Plan Rows"])
+
+
+def estimate_count(queryset):
+    """A cheap row count for ``queryset``, or ``None`` if there is none."""
+    if not queryset.query.where:
+        estimate = table_estimate(queryset)
+        if estimate is not None:
+            return estimate
+    return plan_estimate(queryset)
+
+
+def count_cache_key(queryset, version=""):
+    sql, params = queryset.query.sql_with_params()
+    digest = hashlib.md5(f"{queryset.db}:{sql}:{params!r}:{version}".encode()).hexdigest()
+    return f"count:{queryset.model._meta.label_lower}:{digest}"
+
+
+def cached_count(queryset, timeout, version=""):
+    """``queryset.count()``, remembered for ``timeout`` seconds.
+
+    Pass a ``version`` that changes with the data (e.g. an invalidation
+    namespace version) to drop the cached count on writes.
+    """
+    key = count_cache_key(queryset, version)
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, timeout)
+    return count
+
+
+class EstimatedCountPaginator(Paginator):
+    """A paginator whose ``count`` is an estimate for big results.
+
+    Below ``PAGINATOR_ESTIMATE_THRESHOLD`` rows the count is exact. With
+    ``cache_timeout`` the exact count is cached, keyed by the query and
+    ``cache_version``. Past the real end of an overestimated result the
+    last pages are empty rather than missing.
+    """
+
+    is_estimated = False
+
+    def __init__(self, *args, cache_timeout=None, cache_version="", **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache_timeout = cache_timeout
+        self.cache_version = cache_version
+
+    @cached_property
+    def count(self):
+        if not isinstance(self.object_list, QuerySet):
+            return super().count
+        estimate = estimate_count(self.object_list)
+        if estimate is not None and estimate >= settings.PAGINATOR_ESTIMATE_THRESHOLD:
+            self.is_estimated = True
+            return estimate
+        if self.cache_timeout:
+            return cached_count(self.object_list, self.cache_timeout, self.cache_version)
+        return self.object_list.count()
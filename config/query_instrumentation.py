@@ -0,0 +1,158 @@
+"""Per-request SQL instrumentation with N+1 detection.
+
+A sampled request records every query's duration and normalized SQL
+fingerprint. The totals go out in a ``Server-Timing`` header, fingerprints
+repeated ``SQL_N_PLUS_ONE_THRESHOLD`` times or more are logged as N+1
+candidates, and an hourly per-view summary is buffered in the process and
+flushed to ``ViewQueryStats`` for the admin. Unsampled requests only pay for
+one ``random()`` call.
+"""
+
+import logging
+import random
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\((?:[^()]*)\)", re.IGNORECASE)
+_SPACE = re.compile(r"\s+")
+
+
+def fingerprint(sql):
+    """Normalize ``sql`` so queries differing only in values compare equal."""
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("IN (...)", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+class QueryRecorder:
+    """``execute_wrapper`` that records duration and fingerprint per query."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def n_plus_one(self, threshold=None):
+        """Return ``{fingerprint: count}`` for queries repeated ``threshold`` times."""
+        if threshold is None:
+            threshold = settings.SQL_N_PLUS_ONE_THRESHOLD
+        return {sql: n for sql, n in self.fingerprints.items() if n >= threshold}
+
+
+class QueryStatsBuffer:
+    """Accumulate per-view summaries in the process and flush them in batches."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._next_flush = None
+
+    def add(self, view_name, recorder, n_plus_one):
+        window_start = timezone.now().replace(minute=0, second=0, microsecond=0)
+        with self._lock:
+            if self._next_flush is None:
+                self._next_flush = time.monotonic() + settings.SQL_STATS_FLUSH_INTERVAL
+            entry = self._pending.get((view_name, window_start))
+            if entry is None:
+                entry = self._pending[(view_name, window_start)] = {
+                    "requests": 0,
+                    "queries": 0,
+                    "db_time_ms": 0.0,
+                    "max_queries": 0,
+                    "n_plus_one_requests": 0,
+                    "last_n_plus_one": "",
+                }
+            entry["requests"] += 1
+            entry["queries"] += recorder.count
+            entry["db_time_ms"] += recorder.duration * 1000
+            entry["max_queries"] = max(entry["max_queries"], recorder.count)
+            if n_plus_one:
+                entry["n_plus_one_requests"] += 1
+                entry["last_n_plus_one"] = max(n_plus_one, key=n_plus_one.get)
+        if time.monotonic() >= self._next_flush:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered summaries to the primary database."""
+        from app.models import ViewQueryStats
+
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._next_flush = time.monotonic() + settings.SQL_STATS_FLUSH_INTERVAL
+        if not pending:
+            return
+
+        # Explicit ``using`` keeps these writes from pinning the request.
+        stats = ViewQueryStats.objects.using(DEFAULT_DB_ALIAS)
+        for (view_name, window_start), entry in pending.items():
+            stats.get_or_create(view_name=view_name, window_start=window_start)
+            update = {
+                "requests": F("requests") + entry["requests"],
+                "queries": F("queries") + entry["queries"],
+                "db_time_ms": F("db_time_ms") + entry["db_time_ms"],
+                "max_queries": Greatest("max_queries", entry["max_queries"]),
+                "n_plus_one_requests": F("n_plus_one_requests") + entry["n_plus_one_requests"],
+            }
+            if entry["last_n_plus_one"]:
+                update["last_n_plus_one"] = entry["last_n_plus_one"]
+            stats.filter(view_name=view_name, window_start=window_start).update(**update)
+
+        cutoff = timezone.now() - timedelta(days=settings.SQL_STATS_RETENTION_DAYS)
+        stats.filter(window_start__lt=cutoff).delete()
+
+
+stats_buffer = QueryStatsBuffer()
+
+
+class QueryInstrumentationMiddleware:
+    """Instrument a sample of requests, see the module docstring."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.SQL_INSTRUMENTATION_SAMPLE_RATE:
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+
+        match = request.resolver_match
+        view_name = match.view_name if match else "<unresolved>"
+        n_plus_one = recorder.n_plus_one()
+        for sql, count in n_plus_one.items():
+            logger.warning("Possible N+1 in %s: %d x %s", view_name, count, sql)
+
+        timing = f'db;dur={recorder.duration * 1000:.2f};desc="{recorder.count} queries"'
+        if n_plus_one:
+            timing += f', nplusone;desc="{len(n_plus_one)} repeated queries"'
+        response["Server-Timing"] = timing
+        stats_buffer.add(view_name, recorder, n_plus_one)
+        return response
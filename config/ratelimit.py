@@ -0,0 +1,344 @@
+"""Per-view rate limits.
+
+A ``RateLimit`` names a budget such as ``"30/m"`` and whom it applies to
+(the user, the client IP, or the user falling back to the IP), and is put on
+a view with the ``ratelimit`` decorator or ``RateLimitMixin``. Two
+algorithms are available:
+
+- ``sliding_window`` weights the previous fixed window's count by how much of
+  it still overlaps the last ``period``, which smooths the burst a plain
+  fixed window allows at its boundary. It costs one ``incr`` and one ``get``.
+- ``token_bucket`` refills ``limit`` tokens per ``period`` up to ``limit`` and
+  spends one per request, allowing short bursts on top of a steady rate.
+
+Counters live in the shared cache so every worker enforces the same budget.
+Async views count through the cache's async methods (``aincr``, ``aget``...),
+so a check never blocks the event loop on a cache round trip.
+If the cache cannot be reached, each process keeps counting in its own
+memory rather than letting everything through or failing the request. Token
+buckets are read and written without a lock, so workers racing on the same
+key may let a request or two more through; that is the price of not taking
+a lock on every request.
+"""
+
+import functools
+import logging
+import math
+import re
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+
+UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+RATE = re.compile(r"^(\d+)/(\d*)([smhd])$")
+
+
+def parse_rate(rate):
+    """``"30/m"`` -> ``(30, 60)``; ``"100/15m"`` -> ``(100, 900)``."""
+    match = RATE.match(rate)
+    if match is None:
+        raise ValueError(f"Invalid rate {rate!r}; expected e.g. '30/m' or '100/15m'.")
+    limit, multiplier, unit = match.groups()
+    return int(limit), int(multiplier or 1) * UNITS[unit]
+
+
+class LocalStore:
+    """In-process stand-in for the cache methods the limiter uses."""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def _live(self, key, now):
+        entry = self._data.get(key)
+        if entry is not None and entry[1] <= now:
+            del self._data[key]
+            return None
+        return entry
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._live(key, time.monotonic())
+            return default if entry is None else entry[0]
+
+    def set(self, key, value, timeout):
+        with self._lock:
+            now = time.monotonic()
+            if len(self._data) > 10000:
+                for stale in [k for k, (_, expires) in self._data.items() if expires <= now]:
+                    del self._data[stale]
+            self._data[key] = (value, now + timeout)
+
+    def incr(self, key, timeout):
+        with self._lock:
+            now = time.monotonic()
+            entry = self._live(key, now)
+            value = 1 if entry is None else entry[0] + 1
+            self._data[key] = (value, entry[1] if entry else now + timeout)
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    # Everything is in memory, so the async forms need not leave the loop.
+    async def aget(self, key, default=None):
+        return self.get(key, default)
+
+    async def aset(self, key, value, timeout):
+        self.set(key, value, timeout)
+
+    async def aincr(self, key, timeout):
+        return self.incr(key, timeout)
+
+
+class CacheStore:
+    """The shared Django cache, with an ``incr`` that creates the key."""
+
+    def get(self, key, default=None):
+        return cache.get(key, default)
+
+    def set(self, key, value, timeout):
+        cache.set(key, value, timeout)
+
+    def incr(self, key, timeout):
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # ``add`` loses to a worker that created the key meanwhile.
+            if cache.add(key, 1, timeout):
+                return 1
+            return cache.incr(key)
+
+    async def aget(self, key, default=None):
+        return await cache.aget(key, default)
+
+    async def aset(self, key, value, timeout):
+        await cache.aset(key, value, timeout)
+
+    async def aincr(self, key, timeout):
+        try:
+            return await cache.aincr(key)
+        except ValueError:
+            if await cache.aadd(key, 1, timeout):
+                return 1
+            return await cache.aincr(key)
+
+
+shared_store = CacheStore()
+local_store = LocalStore()
+
+
+def sliding_window(store, key, limit, period, now):
+    """Return seconds to wait, or 0 if the request is allowed."""
+    window = int(now // period)
+    current = store.incr(f"{key}:{window}", period * 2)
+    previous = store.get(f"{key}:{window - 1}", 0)
+    return window_wait(previous, current, limit, period, now)
+
+
+async def asliding_window(store, key, limit, period, now):
+    window = int(now // period)
+    current = await store.aincr(f"{key}:{window}", period * 2)
+    previous = await store.aget(f"{key}:{window - 1}", 0)
+    return window_wait(previous, current, limit, period, now)
+
+
+def window_wait(previous, current, limit, period, now):
+    elapsed = (now % period) / period
+    if previous * (1 - elapsed) + current <= limit:
+        return 0
+    return math.ceil(period * (1 - elapsed))
+
+
+def token_bucket(store, key, limit, period, now):
+    """Return seconds to wait, or 0 if the request is allowed."""
+    state, wait = spend_token(store.get(key), limit, period, now)
+    store.set(key, state, period)
+    return wait
+
+
+async def atoken_bucket(store, key, limit, period, now):
+    state, wait = spend_token(await store.aget(key), limit, period, now)
+    await store.aset(key, state, period)
+    return wait
+
+
+def spend_token(state, limit, period, now):
+    """Return the bucket's new ``(tokens, now)`` and the seconds to wait."""
+    tokens, last = state or (limit, now)
+    tokens = min(limit, tokens + (now - last) * limit / period)
+    if tokens >= 1:
+        return (tokens - 1, now), 0
+    return (tokens, now), math.ceil((1 - tokens) * period / limit)
+
+
+# name -> (sync, async) form.
+ALGORITHMS = {
+    "sliding_window": (sliding_window, asliding_window),
+    "token_bucket": (token_bucket, atoken_bucket),
+}
+
+
+def client_ip(request):
+    """The client's address, seen through ``RATELIMIT_TRUSTED_PROXIES`` proxies.
+
+    Each trusted proxy appends the address it got the request from to
+    ``X-Forwarded-For``, so the client is the entry that many places from the
+    end; anything before it was sent by the client and cannot be trusted.
+    """
+    proxies = settings.RATELIMIT_TRUSTED_PROXIES
+    if proxies:
+        forwarded = [hop.strip() for hop in request.META.get("HTTP_X_FORWARDED_FOR", "").split(",") if hop.strip()]
+        if len(forwarded) >= proxies:
+            return forwarded[-proxies]
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def identify(request, key):
+    if key == "ip":
+        return f"ip:{client_ip(request)}"
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return f"user:{user.pk}"
+    if key == "user":
+        return None
+    return f"ip:{client_ip(request)}"
+
+
+class RateLimit:
+    """A named budget of ``rate`` requests per ``key`` ("user", "ip" or
+    "user_or_ip").
+
+    ``methods`` restricts it to some HTTP methods and ``when(request)`` to
+    some requests, e.g. only searches.
+    """
+
+    def __init__(self, name, rate, key="user_or_ip", algorithm="sliding_window", methods=None, when=None):
+        if key not in ("user", "ip", "user_or_ip"):
+            raise ValueError(f"Unknown rate limit key {key!r}.")
+        self.name = name
+        self.limit, self.period = parse_rate(rate)
+        self.key = key
+        self.algorithm, self.aalgorithm = ALGORITHMS[algorithm]
+        self.methods = methods
+        self.when = when
+
+    def applies(self, request):
+        if not settings.RATELIMIT_ENABLED:
+            return False
+        if self.methods and request.method not in self.methods:
+            return False
+        return self.when is None or bool(self.when(request))
+
+    def counter_key(self, request):
+        ident = identify(request, self.key)
+        return None if ident is None else f"rl:{self.name}:{ident}"
+
+    def retry_after(self, request):
+        """Seconds the client must wait, or 0 if the request may go ahead."""
+        if not self.applies(request):
+            return 0
+        key = self.counter_key(request)
+        if key is None:
+            return 0
+        now = time.time()
+        try:
+            return self.algorithm(shared_store, key, self.limit, self.period, now)
+        except Exception:
+            logger.warning("Rate limit cache unavailable; counting in-process", exc_info=True)
+            return self.algorithm(local_store, key, self.limit, self.period, now)
+
+    async def aretry_after(self, request):
+        """``retry_after`` for async views.
+
+        ``request.user`` is loaded lazily with a sync query, which must not
+        run in the event loop, so the user is resolved with ``auser()`` first.
+        """
+        if not self.applies(request):
+            return 0
+        if self.key != "ip" and hasattr(request, "auser"):
+            request.user = await request.auser()
+        key = self.counter_key(request)
+        if key is None:
+            return 0
+        now = time.time()
+        try:
+            return await self.aalgorithm(shared_store, key, self.limit, self.period, now)
+        except Exception:
+            logger.warning("Rate limit cache unavailable; counting in-process", exc_info=True)
+            return await self.aalgorithm(local_store, key, self.limit, self.period, now)
+
+    def check(self, request):
+        """Return a 429 response if the request is over the limit."""
+        return self.too_many(self.retry_after(request))
+
+    async def acheck(self, request):
+        """``check`` for async views."""
+        return self.too_many(await self.aretry_after(request))
+
+    @staticmethod
+    def too_many(wait):
+        if not wait:
+            return None
+        response = HttpResponse(
+            f"Too many requests. Try again in {wait} seconds.\n",
+            status=429,
+            content_type="text/plain; charset=utf-8",
+        )
+        response["Retry-After"] = str(wait)
+        return response
+
+    def __call__(self, view):
+        if iscoroutinefunction(view):
+
+            @functools.wraps(view)
+            async def inner(request, *args, **kwargs):
+                response = await self.acheck(request)
+                if response is not None:
+                    return response
+                return await view(request, *args, **kwargs)
+
+        else:
+
+            @functools.wraps(view)
+            def inner(request, *args, **kwargs):
+                response = self.check(request)
+                if response is not None:
+                    return response
+                return view(request, *args, **kwargs)
+
+        return inner
+
+
+def ratelimit(name, rate, **options):
+    """Decorator form of ``RateLimit``: ``@ratelimit("search", "30/m")``."""
+    return RateLimit(name, rate, **options)
+
+
+class RateLimitMixin:
+    """Apply the ``rate_limits`` declared on a class-based view."""
+
+    rate_limits = ()
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.view_is_async:
+            return self.adispatch(request, *args, **kwargs)
+        for limit in self.rate_limits:
+            response = limit.check(request)
+            if response is not None:
+                return response
+        return super().dispatch(request, *args, **kwargs)
+
+    async def adispatch(self, request, *args, **kwargs):
+        for limit in self.rate_limits:
+            response = await limit.acheck(request)
+            if response is not None:
+                return response
+        return await super().dispatch(request, *args, **kwargs)
@@ -13,7 +13,9 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 import os
 from pathlib import Path
 import dj_database_url
-from decouple import config
+from decouple import Csv, config
+
+BASE_DIR = Path(__file__).resolve().parent.parent
 
 DATABASE_URL = config('DATABASE_URL', default=None)
 
@@ -29,7 +31,44 @@ else:
         }
     }
 
-BASE_DIR = Path(__file__).resolve().parent.parent
+# Read replicas, e.g. DATABASE_REPLICA_URLS=postgres://replica1/db,postgres://replica2/db
+# Two SQLite files work too for local testing.
+DATABASE_REPLICA_URLS = config("DATABASE_REPLICA_URLS", default="", cast=Csv())
+
+for index, replica_url in enumerate(DATABASE_REPLICA_URLS):
+    DATABASES[f"replica_{index}"] = dj_database_url.parse(replica_url)
+    DATABASES[f"replica_{index}"]["TEST"] = {"MIRROR": "default"}
+
+DATABASE_ROUTERS = ["config.db_router.ReplicaRouter"]
+
+# Seconds a client keeps reading from the primary after it wrote.
+REPLICA_PIN_SECONDS = config("REPLICA_PIN_SECONDS", default=5, cast=int)
+# Replicas lagging more than this many seconds stop receiving reads.
+REPLICA_MAX_LAG = config("REPLICA_MAX_LAG", default=2.0, cast=float)
+REPLICA_LAG_CHECK_INTERVAL = config("REPLICA_LAG_CHECK_INTERVAL", default=5.0, cast=float)
+
+# Connection reuse. DB_POOL_SIZE > 0 gives each process a psycopg connection
+# pool of that size on PostgreSQL; otherwise connections persist for
+# DB_CONN_MAX_AGE seconds and are health-checked before being reused.
+DB_POOL_SIZE = config("DB_POOL_SIZE", default=0, cast=int)
+DB_POOL_MIN_SIZE = config("DB_POOL_MIN_SIZE", default=2, cast=int)
+DB_POOL_TIMEOUT = config("DB_POOL_TIMEOUT", default=10.0, cast=float)
+DB_CONN_MAX_AGE = config("DB_CONN_MAX_AGE", default=60, cast=int)
+
+for database in DATABASES.values():
+    if DB_POOL_SIZE and database["ENGINE"] == "django.db.backends.postgresql":
+        from psycopg_pool import ConnectionPool
+
+        database["CONN_MAX_AGE"] = 0
+        database.setdefault("OPTIONS", {})["pool"] = {
+            "min_size": min(DB_POOL_MIN_SIZE, DB_POOL_SIZE),
+            "max_size": DB_POOL_SIZE,
+            "timeout": DB_POOL_TIMEOUT,
+            "check": ConnectionPool.check_connection,
+        }
+    else:
+        database["CONN_MAX_AGE"] = DB_CONN_MAX_AGE
+        database["CONN_HEALTH_CHECKS"] = True
 
 
 SECRET_KEY = os.environ.get(
@@ -65,6 +104,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "config.db_router.ReplicaPinningMiddleware",
+    "config.query_instrumentation.QueryInstrumentationMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -74,6 +115,15 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# SQL instrumentation (config/query_instrumentation.py). Every request is
+# sampled in development; keep production overhead well below 1%.
+SQL_INSTRUMENTATION_SAMPLE_RATE = config(
+    "SQL_INSTRUMENTATION_SAMPLE_RATE", default=1.0 if DEBUG else 0.01, cast=float
+)
+SQL_N_PLUS_ONE_THRESHOLD = config("SQL_N_PLUS_ONE_THRESHOLD", default=5, cast=int)
+SQL_STATS_FLUSH_INTERVAL = config("SQL_STATS_FLUSH_INTERVAL", default=30.0, cast=float)
+SQL_STATS_RETENTION_DAYS = config("SQL_STATS_RETENTION_DAYS", default=7, cast=int)
+
 ROOT_URLCONF = "config.urls"
 
 TEMPLATES = [
@@ -93,6 +143,10 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "config.wsgi.application"
 
+# Serve the hottest read views (catalog, book detail, feed, unread count)
+# with their async versions. Enabled by the ASGI launch profile.
+ASYNC_VIEWS = config("ASYNC_VIEWS", default=False, cast=bool)
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -144,6 +198,84 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 STATICFILES_DIRS = [BASE_DIR / "static"]
 STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 
+# Workers poll the cache namespace table at most this often (seconds) to
+# drop in-process cache entries invalidated by other workers.
+CACHE_INVALIDATION_POLL_INTERVAL = config(
+    "CACHE_INVALIDATION_POLL_INTERVAL", default=2.0, cast=float
+)
+
+# Shared cache for fragments and other cross-worker data. Without REDIS_URL
+# every process keeps its own in-memory cache, which is fine for development
+# or a single worker; the gunicorn profiles refuse several workers without it.
+REDIS_URL = config("REDIS_URL", default="")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        }
+    }
+
+# Rendered template fragments (app/fragments.py) expire after this many
+# seconds even if nothing they depend on changes.
+FRAGMENT_CACHE_TIMEOUT = config("FRAGMENT_CACHE_TIMEOUT", default=24 * 3600, cast=int)
+
+# Shared page shells of the public pages (app/page_cache.py) expire after
+# PAGE_CACHE_TIMEOUT seconds; proxies may serve them to anonymous visitors
+# for PAGE_CACHE_PROXY_MAX_AGE seconds, since signals cannot purge a proxy.
+PAGE_CACHE_TIMEOUT = config("PAGE_CACHE_TIMEOUT", default=300, cast=int)
+PAGE_CACHE_PROXY_MAX_AGE = config("PAGE_CACHE_PROXY_MAX_AGE", default=60, cast=int)
+
+# Trending rankings (app/trending.py): an event's weight halves every
+# TRENDING_HALF_LIFE_HOURS. The top TRENDING_TOP_N books per scope are cached
+# for TRENDING_CACHE_TIMEOUT seconds; `decay_trending` rebases scores once
+# they are TRENDING_REBASE_DAYS old and `--rebuild` replays that many days.
+TRENDING_HALF_LIFE_HOURS = config("TRENDING_HALF_LIFE_HOURS", default=72, cast=float)
+TRENDING_TOP_N = config("TRENDING_TOP_N", default=10, cast=int)
+TRENDING_CACHE_TIMEOUT = config("TRENDING_CACHE_TIMEOUT", default=300, cast=int)
+TRENDING_REBASE_DAYS = config("TRENDING_REBASE_DAYS", default=30, cast=int)
+TRENDING_REBUILD_DAYS = config("TRENDING_REBUILD_DAYS", default=30, cast=int)
+
+# Student leaderboards (users/leaderboards.py) are kept for these windows:
+# any of "week", "month", "year" and "all". Ranking by average stars needs
+# LEADERBOARD_MIN_REVIEWS reviews in the window.
+LEADERBOARD_WINDOWS = config("LEADERBOARD_WINDOWS", default="week,month,all", cast=Csv())
+LEADERBOARD_SIZE = config("LEADERBOARD_SIZE", default=20, cast=int)
+LEADERBOARD_MIN_REVIEWS = config("LEADERBOARD_MIN_REVIEWS", default=3, cast=int)
+
+# Notifications (notifications/fanout.py): an unread notification absorbs
+# events of the same group for NOTIFICATION_COALESCE_SECONDS after its latest
+# one; fan-out writes NOTIFICATION_FANOUT_CHUNK recipients per batch.
+NOTIFICATION_COALESCE_SECONDS = config("NOTIFICATION_COALESCE_SECONDS", default=3600, cast=int)
+NOTIFICATION_FANOUT_CHUNK = config("NOTIFICATION_FANOUT_CHUNK", default=500, cast=int)
+
+# Page-view counters (config/write_behind.py) are buffered in each worker and
+# written every WRITE_BEHIND_FLUSH_INTERVAL seconds or WRITE_BEHIND_FLUSH_EVENTS
+# views, whichever comes first; a killed worker loses at most that much.
+WRITE_BEHIND_FLUSH_INTERVAL = config("WRITE_BEHIND_FLUSH_INTERVAL", default=5.0, cast=float)
+WRITE_BEHIND_FLUSH_EVENTS = config("WRITE_BEHIND_FLUSH_EVENTS", default=500, cast=int)
+
+# Paginators in config/paginator.py use the planner's row estimate instead of
+# COUNT(*) once a result holds at least this many rows.
+PAGINATOR_ESTIMATE_THRESHOLD = config("PAGINATOR_ESTIMATE_THRESHOLD", default=10000, cast=int)
+# Where a paginator caches exact counts below that, they are kept this long.
+PAGINATOR_COUNT_CACHE_TIMEOUT = config("PAGINATOR_COUNT_CACHE_TIMEOUT", default=300, cast=int)
+
+# Per-view rate limits (config/ratelimit.py) count in the shared cache and
+# answer 429 with Retry-After once a client is over budget.
+RATELIMIT_ENABLED = config("RATELIMIT_ENABLED", default=True, cast=bool)
+# Proxies or load balancers in front of the app that append to
+# X-Forwarded-For. With 0 the client is REMOTE_ADDR; behind a proxy that would
+# put every anonymous visitor in one "ip" budget.
+RATELIMIT_TRUSTED_PROXIES = config("RATELIMIT_TRUSTED_PROXIES", default=0, cast=int)
+
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
 
@@ -1,18 +1,21 @@
 # config/urls.py
 from django.contrib import admin
 from django.urls import path, include
-from .view import home_page, landing_page
+from .view import async_home_page, db_pool_stats, home_page, landing_page
 from django.conf import settings
 from django.conf.urls.static import static
 from django.views.generic.base import RedirectView
 
 urlpatterns = [
     path("", landing_page, name="landing_page"),
-    path("home/", home_page, name="home_page"),
+    path("home/", async_home_page if settings.ASYNC_VIEWS else home_page, name="home_page"),
+    path("admin/db-pool/", db_pool_stats, name="db_pool_stats"),
     path("admin/", admin.site.urls),
     path("users/", include("users.urls"), name="users"),
     path("books/", include("app.urls"), name="books"),
+    path("authors/", include("app.author_urls")),
     path("notifications/", include("notifications.urls")),
+    path("api/v1/", include("app.api_urls")),
     path('favicon.ico', RedirectView.as_view(url='/static/favicon.ico', permanent=True)),
 ]
 
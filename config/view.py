@@ -1,8 +1,17 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import render
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
 from app.models import BookReview
+from app.conditional import conditional, etag_for
+from app.page_cache import cache_page_shell
+from app.views import alist, trending_version
+from config.db_pool import pool_stats
 # Create your views here.
 
 
+@conditional(lambda request: etag_for(request, "landing", trending_version(request)))
+@cache_page_shell()
 def landing_page(request):
     return render(request, "landing.html")
 
@@ -12,3 +21,16 @@ def home_page(request):
         BookReview.objects.select_related("book", "user").all().order_by("-created_at")
     )
     return render(request, "home.html", {"book_reviews": book_reviews})
+
+
+async def async_home_page(request):
+    """Async version of ``home_page`` for ASGI deployments."""
+    book_reviews = await alist(
+        BookReview.objects.select_related("book", "user").order_by("-created_at")
+    )
+    return await sync_to_async(render)(request, "home.html", {"book_reviews": book_reviews})
+
+
+@staff_member_required
+def db_pool_stats(request):
+    return JsonResponse(pool_stats())
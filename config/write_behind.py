@@ -0,0 +1,158 @@
+"""Write-behind counters: increments buffered in the process, written in batches.
+
+A ``WriteBehindCounter`` adds up increments per key in memory and hands the
+totals to its ``write`` function once ``WRITE_BEHIND_FLUSH_INTERVAL``
+seconds have passed since the last flush, or once
+``WRITE_BEHIND_FLUSH_EVENTS`` increments are pending, whichever comes first.
+A hot page then costs one ``UPDATE`` per flush instead of one per request.
+``add`` only reports that a flush is due, so async callers can run the
+write in a thread.
+
+Serving processes also run ``start_flusher``: a daemon thread that flushes
+due counters every ``WRITE_BEHIND_FLUSH_INTERVAL`` seconds, so an idle worker
+does not hold its counts until the next event arrives.
+
+Every counter is flushed by the gunicorn ``worker_exit`` hook and, in any
+process serving ``config.wsgi`` or ``config.asgi``, at interpreter exit. A
+worker that is killed loses at most its unflushed window. Pending counts are
+not seen by other workers until they are flushed.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from config.db_router import background_writes
+
+logger = logging.getLogger(__name__)
+
+# Every counter created in this process, for ``flush_all``.
+counters = []
+
+# Rows per counters UPDATE.
+CHUNK = 500
+
+# The process the flusher thread runs in; threads do not survive a fork.
+_flusher_pid = None
+_flusher_lock = threading.Lock()
+
+
+class WriteBehindCounter:
+    """Accumulate per-key increments and pass them to ``write`` in batches."""
+
+    def __init__(self, name, write):
+        self.name = name
+        self.write = write
+        self._lock = threading.Lock()
+        self._pending = Counter()
+        self._events = 0
+        self._flushed_at = time.monotonic()
+        counters.append(self)
+
+    def add(self, key, amount=1):
+        """Count ``amount`` for ``key``; returns whether a flush is due."""
+        with self._lock:
+            self._pending[key] += amount
+            self._events += 1
+            return self._due()
+
+    def due(self):
+        """Whether increments are pending and a flush is due."""
+        with self._lock:
+            return bool(self._pending) and self._due()
+
+    def _due(self):
+        return (
+            self._events >= settings.WRITE_BEHIND_FLUSH_EVENTS
+            or time.monotonic() - self._flushed_at >= settings.WRITE_BEHIND_FLUSH_INTERVAL
+        )
+
+    def flush(self):
+        """Write the buffered increments; returns how many keys were written."""
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+            self._events = 0
+            self._flushed_at = time.monotonic()
+        if not pending:
+            return 0
+        try:
+            # The increments belong to many requests, not the one flushing.
+            with background_writes():
+                self.write(pending)
+        except Exception:
+            # Counts are best effort; a failed flush must not fail the request.
+            logger.exception("Dropped %d %s increments", sum(pending.values()), self.name)
+            return 0
+        return len(pending)
+
+
+def flush_all():
+    for counter in counters:
+        counter.flush()
+
+
+def flush_due():
+    """Flush the counters whose flush is due; returns how many keys were written."""
+    return sum(counter.flush() for counter in counters if counter.due())
+
+
+def start_flusher():
+    """Start the flusher thread of this process, unless it is running."""
+    global _flusher_pid
+    with _flusher_lock:
+        if _flusher_pid == os.getpid():
+            return
+        _flusher_pid = os.getpid()
+    threading.Thread(target=_flush_periodically, name="write-behind-flusher", daemon=True).start()
+
+
+def _flush_periodically():
+    while True:
+        time.sleep(settings.WRITE_BEHIND_FLUSH_INTERVAL)
+        try:
+            flush_due()
+        finally:
+            # The thread would otherwise keep its own connection open.
+            connections.close_all()
+
+
+def increment(model, amounts, field="count"):
+    """Add ``{pk: amount}`` to ``model.field`` for the rows that can exist.
+
+    ``model`` is a counter keyed by a one-to-one primary key, with an
+    ``updated_at`` timestamp. Missing rows are created first, skipping keys
+    whose target has been deleted since. Then every amount is added with one
+    ``UPDATE ... SET field = field + CASE ...`` per ``CHUNK`` rows, on the
+    primary database. Returns the keys whose target still exists.
+    """
+    target = model._meta.pk.remote_field.model
+    items = [(pk, amount) for pk, amount in amounts.items() if amount]
+    written = set()
+    for start in range(0, len(items), CHUNK):
+        chunk = dict(items[start:start + CHUNK])
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            existing = set(
+                target._default_manager.using(DEFAULT_DB_ALIAS).filter(pk__in=chunk).values_list("pk", flat=True)
+            )
+            model.objects.using(DEFAULT_DB_ALIAS).bulk_create(
+                [model(pk=pk) for pk in existing], ignore_conflicts=True
+            )
+            model.objects.using(DEFAULT_DB_ALIAS).filter(pk__in=chunk).update(
+                **{
+                    field: F(field)
+                    + Case(
+                        *(When(pk=pk, then=Value(amount)) for pk, amount in chunk.items()),
+                        output_field=model._meta.get_field(field),
+                    ),
+                    "updated_at": timezone.now(),
+                }
+            )
+        written |= existing
+    return written
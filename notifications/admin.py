@@ -1,3 +1,13 @@
 from django.contrib import admin
 
-# Register your models here.
+from config.admin_tools import LargeTableAdminMixin
+from notifications.models import Notification
+
+
+@admin.register(Notification)
+class NotificationAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ("user", "message", "count", "is_read", "created_at")
+    list_filter = ("is_read", "kind")
+    list_select_related = ("user",)
+    autocomplete_fields = ("user",)
+    search_fields = ("user__username",)
@@ -0,0 +1,112 @@
+"""Sending notifications: batched fan-out and coalescing of bursts.
+
+``send_many`` gives one event to many users. A recipient who still has an
+unread notification of the same group from the last
+``NOTIFICATION_COALESCE_SECONDS`` gets that row updated into a summary
+("5 friends reviewed ...") and moved to the top of their list; everyone else
+gets a new row. Each chunk of ``NOTIFICATION_FANOUT_CHUNK`` recipients costs
+three queries however large it is, and a burst of activity leaves one row per
+recipient instead of one per event.
+
+Two sends racing for the same recipient can both create a row; the next send
+in the window merges into one of them.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, CharField, F, Value, When
+from django.utils import timezone
+
+from notifications.models import Notification
+
+# kind -> (one event, several events); formatted with actor, subject and count.
+KINDS = {
+    "friend_request": (
+        "{actor} sent you a friend request.",
+        "{count} people sent you friend requests.",
+    ),
+    "friend_accepted": (
+        "{actor} accepted your friend request.",
+        "{count} people accepted your friend requests.",
+    ),
+    "friend_review": (
+        '{actor} reviewed "{subject}".',
+        '{count} friends reviewed "{subject}".',
+    ),
+    "wishlist": (
+        '"{subject}" has been added to your wishlist.',
+        "{count} books have been added to your wishlist.",
+    ),
+}
+
+MESSAGE_LENGTH = Notification._meta.get_field("message").max_length
+
+
+def render(kind, count, actor="", subject=""):
+    one, many = KINDS[kind]
+    text = (one if count == 1 else many).format(actor=actor, subject=subject, count=count)
+    return text[:MESSAGE_LENGTH]
+
+
+def group_key(kind, subject_id=None):
+    """Notifications of ``kind`` about the same subject merge with each other."""
+    return kind if subject_id is None else f"{kind}:{subject_id}"
+
+
+def send(user, kind, actor="", subject="", subject_id=None, count=1):
+    """Notify ``user`` of ``count`` events of ``kind``."""
+    send_many([user.pk], kind, actor=actor, subject=subject, subject_id=subject_id, count=count)
+
+
+def send_many(user_ids, kind, actor="", subject="", subject_id=None, count=1):
+    """Notify every user in ``user_ids``; returns how many were notified."""
+    user_ids = list(dict.fromkeys(user_ids))
+    key = group_key(kind, subject_id)
+    chunk_size = settings.NOTIFICATION_FANOUT_CHUNK
+    for start in range(0, len(user_ids), chunk_size):
+        send_chunk(user_ids[start:start + chunk_size], kind, key, actor, subject, count)
+    return len(user_ids)
+
+
+def send_chunk(user_ids, kind, key, actor, subject, count):
+    now = timezone.now()
+    window_start = now - timedelta(seconds=settings.NOTIFICATION_COALESCE_SECONDS)
+    with transaction.atomic():
+        recent = Notification.objects.filter(
+            user_id__in=user_ids, group_key=key, is_read=False, created_at__gte=window_start
+        )
+        by_count = defaultdict(list)
+        merged = set()
+        for pk, user_id, previous in recent.values_list("pk", "user_id", "count").order_by():
+            by_count[previous].append(pk)
+            merged.add(user_id)
+        if by_count:
+            # Rows are grouped by their count, so the CASE has one branch per
+            # distinct count rather than one per recipient.
+            Notification.objects.filter(pk__in=[pk for pks in by_count.values() for pk in pks]).update(
+                count=F("count") + count,
+                message=Case(
+                    *(
+                        When(count=previous, then=Value(render(kind, previous + count, actor, subject)))
+                        for previous in by_count
+                    ),
+                    output_field=CharField(),
+                ),
+                created_at=now,
+            )
+        Notification.objects.bulk_create(
+            [
+                Notification(
+                    user_id=user_id,
+                    kind=kind,
+                    group_key=key,
+                    count=count,
+                    message=render(kind, count, actor, subject),
+                )
+                for user_id in user_ids
+                if user_id not in merged
+            ]
+        )
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0002_notification_notification_user_read_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='count',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='group_key',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='kind',
+            field=models.CharField(blank=True, max_length=30),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['group_key', 'user', 'is_read'], name='notification_group_idx'),
+        ),
+    ]
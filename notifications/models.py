@@ -7,9 +7,19 @@ class Notification(models.Model):
     message = models.CharField(max_length=255)
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Set by notifications/fanout.py: unread notifications with the same
+    # group_key are merged, and count says how many events one stands for.
+    kind = models.CharField(max_length=30, blank=True)
+    group_key = models.CharField(max_length=100, blank=True)
+    count = models.PositiveIntegerField(default=1)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'is_read'], name='notification_user_read_idx'),
+            models.Index(fields=['user', '-created_at'], name='notification_user_created_idx'),
+            models.Index(fields=['group_key', 'user', 'is_read'], name='notification_group_idx'),
+        ]
         
     def __str__(self):
         return self.message
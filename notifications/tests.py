@@ -1,3 +1,123 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from notifications import fanout
+from notifications.models import Notification
+from notifications.views import async_unread_notifications_count
+
+User = get_user_model()
+
+
+class AsyncUnreadCountTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="reader", password="testpass123")
+        Notification.objects.create(user=self.user, message="Hello")
+        Notification.objects.create(user=self.user, message="Read", is_read=True)
+
+    def get(self, path):
+        request = RequestFactory().get(path)
+        request.user = self.user
+
+        async def auser():
+            return self.user
+
+        request.auser = auser
+        return async_unread_notifications_count(request)
+
+    async def test_unread_count(self):
+        response = await self.get("/notifications/api/unread-count/")
+        self.assertEqual(response.status_code, 200)
+        self.assertJSONEqual(response.content, {"count": 1})
+
+    async def test_long_poll_returns_immediately_when_count_changed(self):
+        response = await self.get("/notifications/api/unread-count/?wait=30&since=0")
+        self.assertJSONEqual(response.content, {"count": 1})
+
+
+class FanoutTests(TestCase):
+    def setUp(self):
+        self.users = [User.objects.create_user(username=f"friend{i}", password="testpass123") for i in range(5)]
+        self.user_ids = [user.pk for user in self.users]
+
+    def test_burst_coalesces_into_one_row_per_recipient(self):
+        for actor in ("ann", "bob", "cid"):
+            fanout.send_many(self.user_ids, "friend_review", actor=actor, subject="Dune", subject_id=1)
+        self.assertEqual(Notification.objects.count(), 5)
+        notification = Notification.objects.get(user=self.users[0])
+        self.assertEqual(notification.count, 3)
+        self.assertEqual(notification.message, '3 friends reviewed "Dune".')
+
+    def test_other_subjects_and_read_rows_are_not_merged(self):
+        fanout.send_many(self.user_ids[:1], "friend_review", actor="ann", subject="Dune", subject_id=1)
+        fanout.send_many(self.user_ids[:1], "friend_review", actor="bob", subject="Emma", subject_id=2)
+        Notification.objects.update(is_read=True)
+        fanout.send_many(self.user_ids[:1], "friend_review", actor="cid", subject="Dune", subject_id=1)
+        self.assertEqual(
+            sorted(Notification.objects.values_list("message", flat=True)),
+            ['ann reviewed "Dune".', 'bob reviewed "Emma".', 'cid reviewed "Dune".'],
+        )
+
+    @override_settings(NOTIFICATION_COALESCE_SECONDS=60)
+    def test_rows_older_than_the_window_are_not_merged(self):
+        fanout.send(self.users[0], "friend_request", actor="ann")
+        Notification.objects.update(created_at=timezone.now() - timedelta(minutes=2))
+        fanout.send(self.users[0], "friend_request", actor="bob")
+        self.assertEqual(Notification.objects.filter(user=self.users[0]).count(), 2)
+
+    def test_mixed_counts_are_summed(self):
+        fanout.send(self.users[0], "wishlist", subject="Dune")
+        fanout.send_many(self.user_ids[:2], "wishlist", subject="Emma", count=3)
+        self.assertEqual(
+            dict(Notification.objects.values_list("user_id", "message")),
+            {
+                self.user_ids[0]: "4 books have been added to your wishlist.",
+                self.user_ids[1]: "3 books have been added to your wishlist.",
+            },
+        )
+
+    def test_fanout_costs_the_same_for_any_number_of_recipients(self):
+        fanout.send(self.users[0], "friend_review", actor="ann", subject="Dune", subject_id=1)
+        # Savepoint, lookup, update, insert, release.
+        with self.assertNumQueries(5):
+            fanout.send_many(self.user_ids, "friend_review", actor="bob", subject="Dune", subject_id=1)
+        self.assertEqual(Notification.objects.count(), 5)
+
+    @override_settings(NOTIFICATION_FANOUT_CHUNK=2)
+    def test_recipients_are_written_in_chunks(self):
+        with self.assertNumQueries(3 * 4):
+            fanout.send_many(self.user_ids, "friend_request", actor="ann")
+        self.assertEqual(Notification.objects.filter(count=1).count(), 5)
+
+    def test_friends_are_notified_of_a_review(self):
+        from app.models import Book
+        from users.models import FriendshipRequest
+
+        reader = User.objects.create_user(username="reader", password="testpass123")
+        for friend in self.users[:3]:
+            FriendshipRequest.objects.create(from_user=reader, to_user=friend).accept()
+        book = Book.objects.create(title="Dune", description="Spice", isbn="9780441013593")
+        self.client.force_login(reader)
+        self.client.post(reverse("books:add_review", args=[book.pk]), {"stars_given": 5, "content": "Great"})
+        self.assertEqual(
+            set(Notification.objects.filter(kind="friend_review").values_list("user_id", flat=True)),
+            set(self.user_ids[:3]),
+        )
+
+    def test_accepting_a_request_notifies_the_sender(self):
+        from users.models import FriendshipRequest
+
+        self.client.force_login(self.users[0])
+        self.client.post(reverse("users:send_friend_request", args=[self.users[1].pk]))
+        self.assertEqual(
+            Notification.objects.get(user=self.users[1]).message, "friend0 sent you a friend request."
+        )
+        request = FriendshipRequest.objects.get()
+        self.client.force_login(self.users[1])
+        self.client.post(reverse("users:respond_friend_request", args=[request.pk, "accept"]))
+        self.assertEqual(
+            Notification.objects.get(user=self.users[0]).message, "friend1 accepted your friend request."
+        )
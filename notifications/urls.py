@@ -1,4 +1,5 @@
 # notifications/urls.py
+from django.conf import settings
 from django.urls import path
 from . import views
 
@@ -7,5 +8,9 @@ app_name = 'notifications'
 urlpatterns = [
     path('', views.notifications_list, name='notifications_list'),
     path('mark-all-read/', views.mark_all_as_read, name='mark_all_as_read'),
-    path('api/unread-count/', views.unread_notifications_count, name='unread_notifications_count')
+    path(
+        'api/unread-count/',
+        views.async_unread_notifications_count if settings.ASYNC_VIEWS else views.unread_notifications_count,
+        name='unread_notifications_count',
+    ),
 ]
\ No newline at end of file
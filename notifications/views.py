@@ -1,14 +1,21 @@
 # notifications/views.py
+import asyncio
+import time
+
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from .models import Notification
 from django.http import JsonResponse
+from config.paginator import EstimatedCountPaginator
+
+NOTIFICATIONS_PER_PAGE = 20
 
 
 @login_required
 def notifications_list(request):
     notifications = Notification.objects.filter(user=request.user).order_by('-created_at')
-    return render(request, "notifications/list.html", {"notifications": notifications})
+    page = EstimatedCountPaginator(notifications, NOTIFICATIONS_PER_PAGE).get_page(request.GET.get("page"))
+    return render(request, "notifications/list.html", {"notifications": page, "page_obj": page})
 
 @login_required
 def mark_all_as_read(request):
@@ -20,3 +27,33 @@ def mark_all_as_read(request):
 def unread_notifications_count(request):
     count = Notification.objects.filter(user=request.user, is_read=False).count()
     return JsonResponse({"count": count})
+
+
+# Long-poll settings for the async unread counter.
+LONG_POLL_MAX_WAIT = 30
+LONG_POLL_INTERVAL = 2
+
+
+@login_required
+async def async_unread_notifications_count(request):
+    """Async version of ``unread_notifications_count`` for ASGI deployments.
+
+    With ``?wait=<seconds>&since=<count>`` the request is held open until the
+    unread count differs from ``since`` or the wait expires, so clients can
+    long-poll without tying up a worker thread.
+    """
+    user = await request.auser()
+    unread = Notification.objects.filter(user=user, is_read=False)
+    count = await unread.acount()
+
+    try:
+        wait = min(float(request.GET.get("wait", 0)), LONG_POLL_MAX_WAIT)
+        since = int(request.GET["since"]) if "since" in request.GET else None
+    except ValueError:
+        wait, since = 0, None
+
+    deadline = time.monotonic() + wait
+    while since is not None and count == since and time.monotonic() < deadline:
+        await asyncio.sleep(min(LONG_POLL_INTERVAL, max(deadline - time.monotonic(), 0)))
+        count = await unread.acount()
+    return JsonResponse({"count": count})
@@ -2,16 +2,17 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth import get_user_model
 from django.utils.html import format_html
+
+from config.admin_tools import LargeTableAdminMixin
 from users.models import FriendshipRequest
 
 User = get_user_model()
 
 
 @admin.register(User)
-class CustomUserAdmin(UserAdmin):
+class CustomUserAdmin(LargeTableAdminMixin, UserAdmin):
     """Admin for CustomUser that exposes profile picture upload and preview."""
-    list_display = ("username", "email", "role", "is_active", "is_staff")
-    
+
     fieldsets = tuple(
         list(UserAdmin.fieldsets)
         + [
@@ -35,7 +36,7 @@ class CustomUserAdmin(UserAdmin):
             except Exception:
                 return ""
             return format_html(
-                '<img src="{}" style="height:40px;border-radius:50%;" />', url
+                '<img src="{}" loading="lazy" style="height:40px;border-radius:50%;" />', url
             )
         return ""
 
@@ -43,7 +44,9 @@ class CustomUserAdmin(UserAdmin):
 
 
 @admin.register(FriendshipRequest)
-class FriendshipRequestAdmin(admin.ModelAdmin):
+class FriendshipRequestAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ("from_user", "to_user", "status", "created_at")
+    list_select_related = ("from_user", "to_user")
+    autocomplete_fields = ("from_user", "to_user")
     list_filter = ("status", "created_at")
     search_fields = ("from_user__username", "to_user__username")
@@ -0,0 +1,215 @@
+"""Class and grade reading leaderboards, kept up to date as students read.
+
+Every student has a ``LeaderboardEntry`` per period of each window in
+``LEADERBOARD_WINDOWS`` ("week", "month", "year" or "all") they were active
+in. Writing or deleting a review moves the entries of the periods its
+``created_at`` falls into with ``F()`` updates. Wishlist changes do the same
+for the periods of the item's ``added_at``. A board is then one range scan
+of an index on ``(period, school_class or grade, -metric)``, however many
+students the school has.
+
+Entries copy the student's class and grade; ``user_saved`` moves them when
+the class changes and drops them if the user stops being a student.
+``rebuild`` (the ``rebuild_leaderboards`` command) recomputes them from the
+reviews and wishlists.
+"""
+
+import re
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Case, Count, DateField, F, FloatField, Sum, When
+from django.db.models.functions import Cast, TruncMonth, TruncWeek, TruncYear
+from django.utils import timezone
+
+from app.models import BookReview, WishListItem
+from users.models import LeaderboardEntry
+
+STUDENT = "student"
+ALL_TIME = "all"
+# First day of the period of each window containing a date.
+WINDOWS = {
+    "week": lambda day: day - timedelta(days=day.weekday()),
+    "month": lambda day: day.replace(day=1),
+    "year": lambda day: day.replace(month=1, day=1),
+    ALL_TIME: None,
+}
+TRUNCATE = {"week": TruncWeek, "month": TruncMonth, "year": TruncYear}
+# Metric -> the field a board is ordered by.
+METRICS = {"reviews": "reviews", "wishlisted": "wishlisted", "stars": "average_stars"}
+SCOPES = {"class": "school_class", "grade": "grade"}
+REBUILD_CHUNK = 500
+
+
+def grade_of(school_class):
+    """The leading number of a class: "10A" -> "10"; "" if there is none."""
+    match = re.match(r"\d+", school_class or "")
+    return match.group() if match else ""
+
+
+def period_key(window, day):
+    if window == ALL_TIME:
+        return ALL_TIME
+    return f"{window}:{WINDOWS[window](day).isoformat()}"
+
+
+def periods_on(day):
+    return [period_key(window, day) for window in settings.LEADERBOARD_WINDOWS]
+
+
+def periods_at(at):
+    return periods_on(timezone.localdate(at))
+
+
+def apply(user_ids, periods, reviews=0, wishlisted=0, stars=0):
+    """Add to the entries of the students among ``user_ids`` in ``periods``.
+
+    Only increments create missing entries, so a user being deleted does not
+    get them back from the cascade that removes their reviews.
+    """
+    deltas = {"reviews": reviews, "wishlisted": wishlisted, "stars_sum": stars}
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    if any(delta > 0 for delta in deltas.values()):
+        students = get_user_model().objects.filter(pk__in=user_ids, role=STUDENT)
+        LeaderboardEntry.objects.bulk_create(
+            [
+                LeaderboardEntry(
+                    user_id=user_id, period=period, school_class=school_class, grade=grade_of(school_class)
+                )
+                for user_id, school_class in students.values_list("pk", "school_class")
+                for period in periods
+            ],
+            ignore_conflicts=True,
+        )
+    update = {field: F(field) + delta for field, delta in deltas.items()}
+    if reviews or stars:
+        # Every right-hand side sees the row before the update.
+        average = Cast(F("stars_sum") + stars, FloatField()) / (F("reviews") + reviews)
+        update["average_stars"] = Case(
+            When(reviews__gt=-reviews, then=average),
+            default=None,
+            output_field=FloatField(),
+        )
+    LeaderboardEntry.objects.filter(user_id__in=user_ids, period__in=periods).update(**update)
+
+
+def review_saved(review, previous):
+    """``previous`` is the review's stored ``user_id``, ``stars_given`` and
+    ``created_at`` before the save, or ``None`` if it was just created.
+    """
+    periods = periods_at(review.created_at)
+    if previous is not None:
+        if previous["user_id"] == review.user_id and periods_at(previous["created_at"]) == periods:
+            apply([review.user_id], periods, stars=review.stars_given - previous["stars_given"])
+            return
+        apply([previous["user_id"]], periods_at(previous["created_at"]), reviews=-1, stars=-previous["stars_given"])
+    apply([review.user_id], periods, reviews=1, stars=review.stars_given)
+
+
+def review_deleted(review):
+    apply([review.user_id], periods_at(review.created_at), reviews=-1, stars=-review.stars_given)
+
+
+def wishlist_changed(changes):
+    """Apply ``{(user_id, day added): delta}``; a removal takes the book off
+    the boards of the periods it was added in.
+    """
+    groups = defaultdict(list)
+    for (user_id, day), delta in changes.items():
+        if delta:
+            groups[tuple(periods_on(day)), delta].append(user_id)
+    for (periods, delta), user_ids in groups.items():
+        apply(user_ids, periods, wishlisted=delta)
+
+
+def user_saved(user):
+    """Keep the entries on the boards of ``user``'s current class and grade."""
+    entries = LeaderboardEntry.objects.filter(user=user)
+    if user.role != STUDENT:
+        entries.delete()
+        return
+    entries.exclude(school_class=user.school_class).update(
+        school_class=user.school_class, grade=grade_of(user.school_class)
+    )
+
+
+def board(scope, value, metric, window, today=None, size=None):
+    """The top ``size`` entries of a class or grade board, with their users."""
+    entries = board_entries(scope, value, metric, window, today)
+    field = METRICS[metric]
+    return list(entries.select_related("user").order_by(f"-{field}", "user_id")[: size or settings.LEADERBOARD_SIZE])
+
+
+def board_entries(scope, value, metric, window, today=None):
+    entries = LeaderboardEntry.objects.filter(
+        period=period_key(window, today or timezone.localdate()), **{SCOPES[scope]: value}
+    )
+    if metric == "stars":
+        # One five-star review should not top the board.
+        return entries.filter(reviews__gte=settings.LEADERBOARD_MIN_REVIEWS)
+    return entries.filter(**{f"{METRICS[metric]}__gt": 0})
+
+
+def position(user, scope, value, metric, window, today=None):
+    """``user``'s place on a board, or ``None`` if they are not on it."""
+    entries = board_entries(scope, value, metric, window, today)
+    field = METRICS[metric]
+    mine = entries.filter(user=user).values_list(field, flat=True).first()
+    if mine is None:
+        return None
+    return entries.filter(**{f"{field}__gt": mine}).count() + 1
+
+
+def rebuild(user_ids=None, chunk_size=REBUILD_CHUNK):
+    """Recompute the entries of ``user_ids``, or of every student, one
+    transaction per ``chunk_size`` users; returns the number of users.
+    """
+    if user_ids is None:
+        user_ids = get_user_model().objects.values_list("pk", flat=True).order_by("pk").iterator()
+    user_ids = list(user_ids)
+    for start in range(0, len(user_ids), chunk_size):
+        rebuild_chunk(user_ids[start:start + chunk_size])
+    return len(user_ids)
+
+
+def rebuild_chunk(user_ids):
+    students = dict(
+        get_user_model().objects.filter(pk__in=user_ids, role=STUDENT).values_list("pk", "school_class")
+    )
+    entries = {}
+
+    def entry(user_id, period):
+        if (user_id, period) not in entries:
+            school_class = students[user_id]
+            entries[user_id, period] = LeaderboardEntry(
+                user_id=user_id, period=period, school_class=school_class, grade=grade_of(school_class)
+            )
+        return entries[user_id, period]
+
+    for window in settings.LEADERBOARD_WINDOWS:
+        if window == ALL_TIME:
+            reviews, adds = BookReview.objects.all(), WishListItem.objects.all()
+            period = ("user_id",)
+        else:
+            reviews = BookReview.objects.annotate(start=TRUNCATE[window]("created_at", output_field=DateField()))
+            adds = WishListItem.objects.annotate(start=TRUNCATE[window]("added_at", output_field=DateField()))
+            period = ("user_id", "start")
+        for row in (
+            reviews.filter(user_id__in=students)
+            .values(*period)
+            .annotate(count=Count("id"), stars=Sum("stars_given"))
+            .order_by()
+        ):
+            item = entry(row["user_id"], period_key(window, row.get("start")))
+            item.reviews, item.stars_sum = row["count"], row["stars"]
+            item.average_stars = row["stars"] / row["count"]
+        for row in adds.filter(user_id__in=students).values(*period).annotate(count=Count("id")).order_by():
+            entry(row["user_id"], period_key(window, row.get("start"))).wishlisted = row["count"]
+    with transaction.atomic():
+        LeaderboardEntry.objects.filter(user_id__in=user_ids).delete()
+        LeaderboardEntry.objects.bulk_create(entries.values(), batch_size=1000)
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from users import reading_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Compute the monthly reading statistics shown on profiles from every "
+        "review and wishlist item, a chunk of users at a time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("user_ids", nargs="*", type=int, help="Only these users (default: all).")
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=reading_stats.REBUILD_CHUNK,
+            help="Users recomputed per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        users = reading_stats.rebuild(options["user_ids"] or None, chunk_size=options["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(f"Reading statistics recomputed for {users} users."))
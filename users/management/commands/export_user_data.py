@@ -0,0 +1,32 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from users.export import export_filename, write_export
+
+
+class Command(BaseCommand):
+    help = (
+        "Write the data export archive of a user to a file, for exports too "
+        "large to stream to a browser or run from a scheduled job."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("username")
+        parser.add_argument("--output", help="Defaults to <username>-export.zip; '-' writes to stdout.")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            user = User.objects.get(username=options["username"])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {options['username']!r}.")
+
+        output = options["output"] or export_filename(user)
+        if output == "-":
+            write_export(user, sys.stdout.buffer)
+            return
+        with open(output, "wb") as file:
+            size = write_export(user, file)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {size} bytes to {output}."))
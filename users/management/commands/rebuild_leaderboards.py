@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from users import leaderboards
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the student leaderboard entries from every review and "
+        "wishlist item, a chunk of users at a time, e.g. after changing "
+        "LEADERBOARD_WINDOWS or editing reviews with bulk SQL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("user_ids", nargs="*", type=int, help="Only these users (default: all).")
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=leaderboards.REBUILD_CHUNK,
+            help="Users recomputed per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        users = leaderboards.rebuild(options["user_ids"] or None, chunk_size=options["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(f"Leaderboards recomputed for {users} users."))
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.8 on 2026-10-19 10:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0008_customuser_school_class'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['role', 'school_class'], name='user_role_class_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='friendshiprequest',
+            index=models.Index(fields=['to_user', 'status', '-created_at'], name='friendreq_to_status_idx'),
+        ),
+    ]
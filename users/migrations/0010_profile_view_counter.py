@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0009_customuser_user_role_class_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileViewCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='view_counter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('count', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:37
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0011_reading_month'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(max_length=20)),
+                ('school_class', models.CharField(max_length=20)),
+                ('grade', models.CharField(max_length=20)),
+                ('reviews', models.IntegerField(default=0)),
+                ('wishlisted', models.IntegerField(default=0)),
+                ('stars_sum', models.IntegerField(default=0)),
+                ('average_stars', models.FloatField(null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['period', 'school_class', '-reviews'], name='board_class_reviews_idx'), models.Index(fields=['period', 'school_class', '-wishlisted'], name='board_class_wishlisted_idx'), models.Index(fields=['period', 'school_class', '-average_stars'], name='board_class_stars_idx'), models.Index(fields=['period', 'grade', '-reviews'], name='board_grade_reviews_idx'), models.Index(fields=['period', 'grade', '-wishlisted'], name='board_grade_wishlisted_idx'), models.Index(fields=['period', 'grade', '-average_stars'], name='board_grade_stars_idx')],
+                'unique_together': {('user', 'period')},
+            },
+        ),
+    ]
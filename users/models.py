@@ -33,6 +33,9 @@ class FriendshipRequest(models.Model):
     class Meta:
         unique_together = ("from_user", "to_user")
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["to_user", "status", "-created_at"], name="friendreq_to_status_idx"),
+        ]
 
     def accept(self):
         self.status = self.STATUS_ACCEPTED
@@ -67,6 +70,11 @@ class CustomUser(AbstractUser):
         default="profile_pics/default_pic.jpeg",
     )
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(fields=["role", "school_class"], name="user_role_class_idx"),
+        ]
+
     def __str__(self):
         return f"{self.username} ({self.get_role_display()}, {self.school_class})"
 
@@ -83,8 +91,10 @@ class CustomUser(AbstractUser):
         received = FriendshipRequest.objects.filter(
             to_user=self, status=FriendshipRequest.STATUS_ACCEPTED
         ).values_list("from_user", flat=True)
-        user_ids = list(sent) + list(received)
-        return CustomUser.objects.filter(id__in=user_ids)
+        # Subqueries keep this a single query however many friends there are.
+        return CustomUser.objects.filter(
+            models.Q(id__in=sent) | models.Q(id__in=received)
+        )
 
     def is_friend_with(self, other_user):
         return FriendshipRequest.objects.filter(
@@ -94,3 +104,85 @@ class CustomUser(AbstractUser):
             ),
             status=FriendshipRequest.STATUS_ACCEPTED,
         ).exists()
+
+
+class ProfileViewCounter(models.Model):
+    """How often a user's profile has been viewed by others, written behind by
+    ``users.page_views``.
+    """
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="view_counter",
+    )
+    count = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.count}"
+
+
+class ReadingMonth(models.Model):
+    """One user's reading activity in one calendar month, kept by
+    ``users.reading_stats``.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="reading_months"
+    )
+    # First day of the month.
+    month = models.DateField()
+    reviews = models.IntegerField(default=0)
+    stars_1 = models.IntegerField(default=0)
+    stars_2 = models.IntegerField(default=0)
+    stars_3 = models.IntegerField(default=0)
+    stars_4 = models.IntegerField(default=0)
+    stars_5 = models.IntegerField(default=0)
+    wishlist_added = models.IntegerField(default=0)
+    wishlist_removed = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # Also the index profile pages read a user's months through.
+        unique_together = ("user", "month")
+
+    def __str__(self):
+        return f"{self.user_id} {self.month:%Y-%m}: {self.reviews}"
+
+
+class LeaderboardEntry(models.Model):
+    """A student's activity in one leaderboard period, kept by
+    ``users.leaderboards``.
+
+    ``school_class`` and ``grade`` are copied from the user so that a board
+    is one range scan of an index below.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="leaderboard_entries"
+    )
+    # "all", or a window and the first day of its period, e.g. "week:2026-10-12".
+    period = models.CharField(max_length=20)
+    school_class = models.CharField(max_length=20)
+    grade = models.CharField(max_length=20)
+    reviews = models.IntegerField(default=0)
+    wishlisted = models.IntegerField(default=0)
+    stars_sum = models.IntegerField(default=0)
+    # stars_sum / reviews, stored so that it can be indexed.
+    average_stars = models.FloatField(null=True)
+
+    class Meta:
+        unique_together = ("user", "period")
+        indexes = [
+            models.Index(fields=["period", "school_class", "-reviews"], name="board_class_reviews_idx"),
+            models.Index(fields=["period", "school_class", "-wishlisted"], name="board_class_wishlisted_idx"),
+            models.Index(fields=["period", "school_class", "-average_stars"], name="board_class_stars_idx"),
+            models.Index(fields=["period", "grade", "-reviews"], name="board_grade_reviews_idx"),
+            models.Index(fields=["period", "grade", "-wishlisted"], name="board_grade_wishlisted_idx"),
+            models.Index(fields=["period", "grade", "-average_stars"], name="board_grade_stars_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.period}: {self.reviews}"
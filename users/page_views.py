@@ -0,0 +1,15 @@
+"""Profile page views, counted through a write-behind buffer.
+
+Views of a user's profile by other users add up in ``profile_views`` and are
+flushed to ``ProfileViewCounter``; see ``config.write_behind``.
+"""
+
+from config.write_behind import WriteBehindCounter, increment
+from users.models import ProfileViewCounter
+
+profile_views = WriteBehindCounter("profile view", lambda pending: increment(ProfileViewCounter, pending))
+
+
+def count_profile_view(request, user_id):
+    if request.user.pk != user_id and profile_views.add(user_id):
+        profile_views.flush()
@@ -0,0 +1,197 @@
+"""Per-user reading statistics kept in monthly rollups.
+
+``ReadingMonth`` holds how many reviews a user wrote in a month, split by
+stars, and how many books they added to and removed from their wishlist.
+Writing or deleting a review or wishlist item moves one row with an ``F()``
+update, so profile pages read a user's months instead of aggregating every
+review they ever wrote. ``rebuild`` (the ``backfill_reading_stats`` command)
+recomputes the rows from the reviews and wishlists, a chunk of users at a
+time. It cannot know about past wishlist removals, so it counts the current
+wishlist as added.
+"""
+
+from collections import defaultdict
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, DateField, F
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from app.models import BookReview, WishListItem
+from users.models import ReadingMonth
+
+STARS = range(1, 6)
+REBUILD_CHUNK = 500
+# Months shown in the reviews-per-month chart.
+CHART_MONTHS = 12
+
+COUNTED_FIELDS = ["reviews", *(f"stars_{stars}" for stars in STARS), "wishlist_added", "wishlist_removed"]
+
+
+def month_of(at):
+    return timezone.localdate(at).replace(day=1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def apply(user_ids, month, **deltas):
+    """Add ``deltas`` to the ``month`` rows of ``user_ids``.
+
+    Only increments create missing rows; a user being deleted must not get
+    one back from the cascade that removes their reviews.
+    """
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    if any(delta > 0 for delta in deltas.values()):
+        ReadingMonth.objects.bulk_create(
+            [ReadingMonth(user_id=user_id, month=month) for user_id in user_ids], ignore_conflicts=True
+        )
+    ReadingMonth.objects.filter(user_id__in=user_ids, month=month).update(
+        **{field: F(field) + delta for field, delta in deltas.items()}, updated_at=timezone.now()
+    )
+
+
+def review_saved(review, previous):
+    """``previous`` is the review's stored ``user_id``, ``stars_given`` and
+    ``created_at`` before the save, or ``None`` if it was just created.
+    """
+    if previous is not None:
+        if (previous["user_id"], previous["stars_given"], month_of(previous["created_at"])) == (
+            review.user_id,
+            review.stars_given,
+            month_of(review.created_at),
+        ):
+            return
+        apply([previous["user_id"]], month_of(previous["created_at"]), **review_deltas(previous["stars_given"], -1))
+    apply([review.user_id], month_of(review.created_at), **review_deltas(review.stars_given, 1))
+
+
+def review_deleted(review):
+    apply([review.user_id], month_of(review.created_at), **review_deltas(review.stars_given, -1))
+
+
+def review_deltas(stars, delta):
+    return {"reviews": delta, f"stars_{stars}": delta}
+
+
+def wishlist_changed(deltas):
+    """Apply ``{user_id: net change}`` to this month's wishlist counts."""
+    month = month_of(timezone.now())
+    by_delta = defaultdict(list)
+    for user_id, delta in deltas.items():
+        if delta:
+            by_delta[delta].append(user_id)
+    for delta, user_ids in by_delta.items():
+        field = "wishlist_added" if delta > 0 else "wishlist_removed"
+        apply(user_ids, month, **{field: abs(delta)})
+
+
+def rebuild(user_ids=None, chunk_size=REBUILD_CHUNK):
+    """Recompute the months of ``user_ids``, or of every user, one transaction
+    per ``chunk_size`` users; returns the number of users.
+    """
+    if user_ids is None:
+        user_ids = get_user_model().objects.values_list("pk", flat=True).order_by("pk").iterator()
+    user_ids = list(user_ids)
+    for start in range(0, len(user_ids), chunk_size):
+        rebuild_chunk(user_ids[start:start + chunk_size])
+    return len(user_ids)
+
+
+def rebuild_chunk(user_ids):
+    months = {}
+
+    def row(user_id, month):
+        if (user_id, month) not in months:
+            months[user_id, month] = ReadingMonth(user_id=user_id, month=month)
+        return months[user_id, month]
+
+    reviews = (
+        BookReview.objects.filter(user_id__in=user_ids)
+        .annotate(month=TruncMonth("created_at", output_field=DateField()))
+        .values("user_id", "month", "stars_given")
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+    for review in reviews:
+        month = row(review["user_id"], review["month"])
+        month.reviews += review["count"]
+        setattr(month, f"stars_{review['stars_given']}", review["count"])
+    adds = (
+        WishListItem.objects.filter(user_id__in=user_ids)
+        .annotate(month=TruncMonth("added_at", output_field=DateField()))
+        .values("user_id", "month")
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+    for item in adds:
+        row(item["user_id"], item["month"]).wishlist_added = item["count"]
+    with transaction.atomic():
+        ReadingMonth.objects.filter(user_id__in=user_ids).delete()
+        ReadingMonth.objects.bulk_create(months.values(), batch_size=1000)
+
+
+def summary(user, today=None):
+    """Everything the profile pages show about ``user``'s reading."""
+    this_month = month_of(today or timezone.now())
+    months = {
+        row["month"]: row
+        for row in ReadingMonth.objects.filter(user=user).values("month", *COUNTED_FIELDS)
+    }
+    totals = {field: sum(row[field] for row in months.values()) for field in COUNTED_FIELDS}
+    reviews = totals["reviews"]
+    stars_total = sum(stars * totals[f"stars_{stars}"] for stars in STARS)
+
+    chart = []
+    for offset in range(CHART_MONTHS - 1, -1, -1):
+        month = add_months(this_month, -offset)
+        chart.append({"month": month, "reviews": months.get(month, {}).get("reviews", 0)})
+    peak = max(entry["reviews"] for entry in chart) or 1
+    for entry in chart:
+        entry["percent"] = round(100 * entry["reviews"] / peak)
+
+    current, longest = streaks({month for month, row in months.items() if row["reviews"]}, this_month)
+    return {
+        "reviews": reviews,
+        "average_stars": stars_total / reviews if reviews else None,
+        "rating_distribution": [
+            {
+                "stars": stars,
+                "count": totals[f"stars_{stars}"],
+                "percent": round(100 * totals[f"stars_{stars}"] / reviews) if reviews else 0,
+            }
+            for stars in reversed(STARS)
+        ],
+        "reviews_by_month": chart,
+        "wishlist_size": totals["wishlist_added"] - totals["wishlist_removed"],
+        "friends": user.friends().count(),
+        "current_streak": current,
+        "longest_streak": longest,
+    }
+
+
+def streaks(active_months, this_month):
+    """``(current, longest)`` runs of consecutive months with a review.
+
+    The current streak still counts while this month has no review yet.
+    """
+    longest = 0
+    for month in active_months:
+        if add_months(month, -1) in active_months:
+            continue
+        length = 1
+        while add_months(month, length) in active_months:
+            length += 1
+        longest = max(longest, length)
+    current = 0
+    month = this_month if this_month in active_months else add_months(this_month, -1)
+    while month in active_months:
+        current += 1
+        month = add_months(month, -1)
+    return current, longest
@@ -1,7 +1,21 @@
+import datetime
+import io
+import json
+import tempfile
+import zipfile
+from unittest import mock
+
+from django.core.management import call_command
 from django.test import TestCase
 from django.urls import reverse
 from django.contrib.auth import get_user_model, get_user
 
+from django.utils import timezone
+
+from users import leaderboards, reading_stats
+from users.export import export_chunks
+from users.models import LeaderboardEntry, ReadingMonth
+
 User = get_user_model()
 
 
@@ -73,3 +87,236 @@ class ProfileTestCase(TestCase):
         self.assertEqual(user.last_name, "User")
         self.assertEqual(user.email, "updateduser@example.com")
         self.assertRedirects(response, reverse("users:profile"))
+
+
+class DataExportTestCase(TestCase):
+    def setUp(self) -> None:
+        from app.models import Book, BookReview, WishListItem
+        from notifications.models import Notification
+        from users.models import FriendshipRequest
+
+        self.user = User.objects.create_user(username="exporter", password="testpassword")
+        self.friend = User.objects.create_user(username="friend", password="testpassword")
+        book = Book.objects.create(title="Exported", description="d", isbn="9783400000001", why_read="w")
+        BookReview.objects.create(user=self.user, book=book, content="Mine", stars_given=5)
+        BookReview.objects.create(user=self.friend, book=book, content="Theirs", stars_given=2)
+        WishListItem.objects.create(user=self.user, book=book)
+        FriendshipRequest.objects.create(from_user=self.friend, to_user=self.user)
+        for i in range(3):
+            Notification.objects.create(user=self.user, message=f"Note {i}")
+
+    def read_archive(self, data):
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            return {
+                name: [json.loads(line) for line in archive.read(name).splitlines()]
+                for name in archive.namelist()
+            }
+
+    def test_export_streams_zip_of_own_data(self):
+        self.client.login(username="exporter", password="testpassword")
+        response = self.client.get(reverse("users:data_export"))
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/zip")
+        self.assertIn("exporter-export.zip", response["Content-Disposition"])
+
+        files = self.read_archive(b"".join(response.streaming_content))
+        self.assertEqual(files["profile.jsonl"][0]["username"], "exporter")
+        self.assertNotIn("password", files["profile.jsonl"][0])
+        self.assertEqual([row["content"] for row in files["reviews.jsonl"]], ["Mine"])
+        self.assertEqual(files["wishlist.jsonl"][0]["book__title"], "Exported")
+        self.assertEqual(files["friendships.jsonl"][0]["from_user__username"], "friend")
+        self.assertEqual(len(files["notifications.jsonl"]), 3)
+
+    def test_export_flushes_in_chunks(self):
+        with mock.patch("users.export.FLUSH_ROWS", 1):
+            chunks = list(export_chunks(self.user))
+        self.assertGreater(len(chunks), 5)
+        self.assertEqual(len(self.read_archive(b"".join(chunks))["notifications.jsonl"]), 3)
+
+    def test_export_requires_login(self):
+        response = self.client.get(reverse("users:data_export"))
+        self.assertEqual(response.status_code, 302)
+
+    def test_export_command_writes_file(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = f"{directory.name}/export.zip"
+        call_command("export_user_data", "exporter", output=path, stdout=io.StringIO())
+        with open(path, "rb") as file:
+            self.assertIn("reviews.jsonl", self.read_archive(file.read()))
+
+
+class ReadingStatsTestCase(TestCase):
+    def setUp(self) -> None:
+        from app.models import Book
+
+        self.user = User.objects.create_user(username="reader", password="testpassword")
+        self.books = [
+            Book.objects.create(title=f"Read {i}", description="d", isbn=f"978341000000{i}", why_read="w")
+            for i in range(4)
+        ]
+
+    def review(self, book, stars, months_ago=0):
+        from app.models import BookReview
+
+        at = timezone.now().replace(day=15) - datetime.timedelta(days=31 * months_ago)
+        return BookReview.objects.create(user=self.user, book=book, content="c", stars_given=stars, created_at=at)
+
+    def months(self):
+        return {
+            row.month: (row.reviews, row.stars_4, row.stars_5)
+            for row in ReadingMonth.objects.filter(user=self.user)
+        }
+
+    def test_reviews_move_their_month(self):
+        review = self.review(self.books[0], 5)
+        self.review(self.books[1], 4, months_ago=1)
+        this_month = reading_stats.month_of(timezone.now())
+        self.assertEqual(self.months()[this_month], (1, 0, 1))
+        review.stars_given = 4
+        review.save()
+        self.assertEqual(self.months()[this_month], (1, 1, 0))
+        review.delete()
+        self.assertEqual(self.months()[this_month], (0, 0, 0))
+
+    def test_summary_streaks_and_wishlist(self):
+        from app.models import WishListItem
+        from app.wishlist import add_books, remove_books
+
+        for months_ago, book in zip((0, 1, 3), self.books):
+            self.review(book, 5 - months_ago, months_ago=months_ago)
+        add_books(self.user, [book.pk for book in self.books])
+        remove_books(self.user, [self.books[0].pk])
+        WishListItem.objects.get(user=self.user, book=self.books[1]).delete()
+        stats = reading_stats.summary(self.user)
+        self.assertEqual(stats["reviews"], 3)
+        self.assertEqual(stats["wishlist_size"], 2)
+        self.assertEqual([row["count"] for row in stats["rating_distribution"]], [1, 1, 0, 1, 0])
+        self.assertEqual([entry["reviews"] for entry in stats["reviews_by_month"][-4:]], [1, 0, 1, 1])
+        self.assertEqual((stats["current_streak"], stats["longest_streak"]), (2, 2))
+
+    def test_streaks(self):
+        month = datetime.date(2026, 5, 1)
+        active = {
+            datetime.date(2026, 4, 1),
+            datetime.date(2026, 3, 1),
+            datetime.date(2025, 12, 1),
+            datetime.date(2025, 11, 1),
+            datetime.date(2025, 10, 1),
+            datetime.date(2025, 9, 1),
+        }
+        self.assertEqual(reading_stats.streaks(active, month), (2, 4))
+        self.assertEqual(reading_stats.streaks(active | {month}, month), (3, 4))
+        self.assertEqual(reading_stats.streaks(set(), month), (0, 0))
+
+    def test_deleting_user_removes_stats(self):
+        from app.models import WishListItem
+
+        self.review(self.books[0], 3)
+        WishListItem.objects.create(user=self.user, book=self.books[0])
+        self.user.delete()
+        self.assertFalse(ReadingMonth.objects.exists())
+
+    def test_backfill_command_and_profiles(self):
+        for months_ago, book in enumerate(self.books[:3]):
+            self.review(book, 5, months_ago=months_ago)
+        ReadingMonth.objects.all().delete()
+        call_command("backfill_reading_stats", "--chunk-size", "1", stdout=io.StringIO())
+        self.assertEqual(sorted(reviews for reviews, _, _ in self.months().values()), [1, 1, 1])
+
+        viewer = User.objects.create_user(username="viewer", password="testpassword")
+        self.client.force_login(viewer)
+        response = self.client.get(reverse("users:user_profile", args=[self.user.pk]))
+        self.assertEqual(response.context["reading"]["current_streak"], 3)
+        self.assertContains(response, "Reading Statistics")
+
+
+class LeaderboardTestCase(TestCase):
+    def setUp(self) -> None:
+        from app.models import Book
+
+        self.students = [
+            User.objects.create_user(username=f"student{i}", password="testpassword", school_class=school_class)
+            for i, school_class in enumerate(["10A", "10A", "10B", "9A"])
+        ]
+        self.teacher = User.objects.create_user(
+            username="teacher", password="testpassword", role="teacher", school_class="10A"
+        )
+        self.books = [
+            Book.objects.create(title=f"Ranked {i}", description="d", isbn=f"978342000000{i}", why_read="w")
+            for i in range(4)
+        ]
+
+    def review(self, user, book, stars=5, **kwargs):
+        from app.models import BookReview
+
+        return BookReview.objects.create(user=user, book=book, content="c", stars_given=stars, **kwargs)
+
+    def ranked(self, scope, value, metric="reviews", window="week"):
+        return [entry.user.username for entry in leaderboards.board(scope, value, metric, window)]
+
+    def test_reviews_rank_class_and_grade(self):
+        first, second, other_class, other_grade = self.students
+        for book in self.books[:2]:
+            self.review(second, book)
+        self.review(first, self.books[0])
+        self.review(other_class, self.books[0])
+        self.review(other_grade, self.books[0])
+        self.review(self.teacher, self.books[1])
+        self.assertEqual(self.ranked("class", "10A"), ["student1", "student0"])
+        self.assertEqual(self.ranked("grade", "10"), ["student1", "student0", "student2"])
+        with self.assertNumQueries(1):
+            leaderboards.board("grade", "10", "reviews", "month")
+        self.assertEqual(leaderboards.position(first, "grade", "10", "reviews", "all"), 2)
+
+    def test_windows_and_average_stars(self):
+        student = self.students[0]
+        old = timezone.now() - datetime.timedelta(days=400)
+        self.review(student, self.books[0], stars=2, created_at=old)
+        for book in self.books[1:]:
+            self.review(student, book, stars=4)
+        entry = LeaderboardEntry.objects.get(user=student, period="all")
+        self.assertEqual((entry.reviews, entry.stars_sum, entry.average_stars), (4, 14, 3.5))
+        this_week = leaderboards.period_key("week", timezone.localdate())
+        self.assertEqual(LeaderboardEntry.objects.get(user=student, period=this_week).reviews, 3)
+        self.assertEqual(self.ranked("class", "10A", "stars", "week"), ["student0"])
+        review = student.bookreview_set.get(book=self.books[1])
+        review.stars_given = 1
+        review.save()
+        review.delete()
+        entry.refresh_from_db()
+        self.assertEqual((entry.reviews, entry.stars_sum), (3, 10))
+        self.assertAlmostEqual(entry.average_stars, 10 / 3)
+        self.assertEqual(self.ranked("class", "10A", "stars", "week"), [])
+
+    def test_wishlist_and_class_change(self):
+        from app.models import WishListItem
+        from app.wishlist import add_books, remove_books
+
+        student = self.students[3]
+        add_books(student, [book.pk for book in self.books])
+        remove_books(student, [self.books[0].pk])
+        WishListItem.objects.get(user=student, book=self.books[1]).delete()
+        self.assertEqual(LeaderboardEntry.objects.get(user=student, period="all").wishlisted, 2)
+        student.school_class = "10B"
+        student.save()
+        self.assertEqual(self.ranked("class", "10B", "wishlisted"), ["student3"])
+        self.assertEqual(self.ranked("grade", "9", "wishlisted"), [])
+
+    def test_rebuild_command_and_view(self):
+        from app.models import WishListItem
+
+        self.review(self.students[0], self.books[0])
+        WishListItem.objects.create(user=self.students[0], book=self.books[1])
+        expected = set(LeaderboardEntry.objects.values_list("period", "reviews", "wishlisted", "average_stars"))
+        LeaderboardEntry.objects.all().delete()
+        call_command("rebuild_leaderboards", "--chunk-size", "2", stdout=io.StringIO())
+        self.assertEqual(
+            set(LeaderboardEntry.objects.values_list("period", "reviews", "wishlisted", "average_stars")), expected
+        )
+
+        self.client.force_login(self.students[1])
+        response = self.client.get(reverse("users:leaderboard"), {"scope": "grade", "metric": "reviews"})
+        self.assertEqual([entry.user for entry in response.context["entries"]], [self.students[0]])
+        self.assertIsNone(response.context["position"])
+        self.assertContains(response, "Grade 10 Leaderboard")
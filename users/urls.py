@@ -16,6 +16,7 @@ urlpatterns = [
     path("logout/", LogoutView.as_view(), name="logout"),
     path("profile/", ProfileView.as_view(), name="profile"),
     path("profile/update/", ProfileUpdateView.as_view(), name="profile_update"),
+    path("profile/export/", users_views.DataExportView.as_view(), name="data_export"),
     # Friend system
     path("friends/", users_views.FriendsListView.as_view(), name="friends_list"),
     path(
@@ -34,6 +35,7 @@ urlpatterns = [
         name="respond_friend_request",
     ),
     path("people/", users_views.PeopleListView.as_view(), name="people"),
+    path("leaderboard/", users_views.LeaderboardView.as_view(), name="leaderboard"),
     path("user/<int:pk>/", users_views.UserProfileView.as_view(), name="user_profile"),
     path("teacher/dashboard/", TeachersDashboardView.as_view(), name="teachers_dashboard"),
 ]
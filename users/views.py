@@ -1,5 +1,6 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views import View
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from users.forms import UserCreateForm, UserUpdateForm
 from django.contrib.auth.forms import AuthenticationForm
@@ -7,6 +8,14 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
 from django.contrib.auth import login, logout
 from django.urls import reverse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_cache_control
+from users.export import aexport_chunks, export_chunks, export_filename
+from users.models import ProfileViewCounter
+from users.page_views import count_profile_view
+from users import leaderboards, reading_stats
+from notifications import fanout
 
 User = get_user_model()
 
@@ -57,7 +66,13 @@ class LogoutView(LoginRequiredMixin, View):
 # ---Profile Section---
 class ProfileView(LoginRequiredMixin, View):
     def get(self, request):
-        return render(request, "users/profile.html", {"user": request.user})
+        # Views still buffered in the workers show up after their next flush.
+        profile_views = ProfileViewCounter.objects.filter(user=request.user).values_list("count", flat=True).first()
+        return render(request, "users/profile.html", {
+            "user": request.user,
+            "profile_views": profile_views or 0,
+            "reading": reading_stats.summary(request.user),
+        })
 
 
 class ProfileUpdateView(LoginRequiredMixin, View):
@@ -79,6 +94,20 @@ class ProfileUpdateView(LoginRequiredMixin, View):
             )
 
 
+class DataExportView(LoginRequiredMixin, View):
+    """Download everything stored about the logged-in user as a ZIP."""
+
+    def get(self, request):
+        if isinstance(request, ASGIRequest):
+            chunks = aexport_chunks(request.user)
+        else:
+            chunks = export_chunks(request.user)
+        response = StreamingHttpResponse(chunks, content_type="application/zip")
+        response["Content-Disposition"] = f'attachment; filename="{export_filename(request.user)}"'
+        patch_cache_control(response, private=True, no_store=True)
+        return response
+
+
 # ---------------- Friend System Views ----------------
 class SendFriendRequestView(LoginRequiredMixin, View):
     def post(self, request, pk):
@@ -112,6 +141,7 @@ class SendFriendRequestView(LoginRequiredMixin, View):
 
         # Make new request
         FriendshipRequest.objects.create(from_user=request.user, to_user=to_user)
+        fanout.send(to_user, "friend_request", actor=request.user.username)
         messages.success(request, "Friend request sent.")
         return redirect("users:friends_list")
 
@@ -127,6 +157,7 @@ class RespondFriendRequestView(LoginRequiredMixin, View):
 
         if action == "accept":
             fr.accept()
+            fanout.send(fr.from_user, "friend_accepted", actor=request.user.username)
             messages.success(
                 request, f"You are now friends with {fr.from_user.username}."
             )
@@ -148,10 +179,10 @@ class FriendRequestsListView(LoginRequiredMixin, View):
 
         received = FriendshipRequest.objects.filter(
             to_user=request.user, status=FriendshipRequest.STATUS_PENDING
-        )
+        ).select_related("from_user")
         sent = FriendshipRequest.objects.filter(
             from_user=request.user, status=FriendshipRequest.STATUS_PENDING
-        )
+        ).select_related("to_user")
         return render(
             request, "users/friend_requests.html", {"received": received, "sent": sent}
         )
@@ -175,9 +206,13 @@ class PeopleListView(LoginRequiredMixin, View):
         sent = FriendshipRequest.objects.filter(from_user=request.user)
         received = FriendshipRequest.objects.filter(to_user=request.user)
 
-        sent_map = {fr.to_user.pk: fr for fr in sent}
-        received_map = {fr.from_user.pk: fr for fr in received}
-        friends_ids = set(request.user.friends().values_list('id', flat=True))
+        sent_map = {fr.to_user_id: fr for fr in sent}
+        received_map = {fr.from_user_id: fr for fr in received}
+        friends_ids = {
+            user_id
+            for user_id, fr in [*sent_map.items(), *received_map.items()]
+            if fr.status == FriendshipRequest.STATUS_ACCEPTED
+        }
 
         people = []
         for u in users_qs:
@@ -197,12 +232,36 @@ class PeopleListView(LoginRequiredMixin, View):
         })
 
 
+class LeaderboardView(LoginRequiredMixin, View):
+    """Class and grade leaderboards, read from ``LeaderboardEntry``."""
+
+    def get(self, request):
+        windows = settings.LEADERBOARD_WINDOWS
+        window = request.GET.get("window") if request.GET.get("window") in windows else windows[0]
+        metric = request.GET.get("metric") if request.GET.get("metric") in leaderboards.METRICS else "reviews"
+        scope = request.GET.get("scope") if request.GET.get("scope") in leaderboards.SCOPES else "class"
+        school_class = request.GET.get("class", "").strip() or request.user.school_class
+        value = school_class if scope == "class" else leaderboards.grade_of(school_class)
+        return render(request, "users/leaderboard.html", {
+            "entries": leaderboards.board(scope, value, metric, window),
+            "position": leaderboards.position(request.user, scope, value, metric, window),
+            "scope": scope,
+            "metric": metric,
+            "window": window,
+            "windows": windows,
+            "school_class": school_class,
+            "board_name": f"Class {school_class}" if scope == "class" else f"Grade {value}",
+            "min_reviews": settings.LEADERBOARD_MIN_REVIEWS,
+        })
+
+
 class UserProfileView(LoginRequiredMixin, View):
     """View another user's profile and show friendship actions."""
     def get(self, request, pk):
         from users.models import FriendshipRequest
 
         target = get_object_or_404(get_user_model(), pk=pk)
+        count_profile_view(request, target.pk)
         # Determine relationship
         fr_sent = FriendshipRequest.objects.filter(from_user=request.user, to_user=target).first()
         fr_received = FriendshipRequest.objects.filter(from_user=target, to_user=request.user).first()
@@ -213,4 +272,5 @@ class UserProfileView(LoginRequiredMixin, View):
             'fr_sent': fr_sent,
             'fr_received': fr_received,
             'is_friend': is_friend,
+            'reading': reading_stats.summary(target),
         })